@@ -0,0 +1,95 @@
+"""
+Import-Zeit der Skripte in 0_scripts messen.
+
+Jedes Modul wird mehrmals in einem frischen Python-Prozess importiert (Kaltstart wie in Colab oder in einem Batch-Worker).
+Festgehalten werden die Median-Zeit des Imports und welche schweren Pakete dabei geladen wurden. Mit lazy_import sollte
+beim Import keines davon geladen werden, erst beim ersten Aufruf einer Funktion, die es braucht.
+
+Aufruf:
+    python 0_scripts/benchmark/bench_import.py
+    python 0_scripts/benchmark/bench_import.py --repeat 7 --modules my_py_dataviz_functions
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Alle Hilfsmodule, damit neu dazukommende Module automatisch mitgemessen werden, dazu der Batch-Runner
+MODULES = sorted(os.path.splitext(os.path.basename(p))[0] for p in glob.glob(os.path.join(SCRIPTS_DIR, 'my_py_*_functions.py')))
+MODULES.append('my_py_batch_runner')
+
+HEAVY = ['numpy', 'pandas', 'pyarrow', 'requests', 'IPython', 'altair', 'plotly', 'seaborn', 'matplotlib']
+
+# Wird im Kindprozess ausgeführt: Import timen und die geladenen schweren Pakete melden
+_CHILD = """
+import json, sys, time
+sys.path.insert(0, {scripts_dir!r})
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPTS_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def measure(module, repeat=5):
+    """
+    Diese Funktion misst die Import-Zeit eines Moduls im Kaltstart.
+
+    Parameter (zwingend):
+    - module (str): Name des Moduls, z.B. 'my_py_dataviz_functions'.
+
+    Optionale Parameter:
+    - repeat (int): Anzahl Messungen, jeweils in einem neuen Prozess. Default: 5
+
+    Rückgabe:
+    - result (dict): median_ms, min_ms und die beim Import geladenen schweren Pakete.
+    """
+    code = _CHILD.format(scripts_dir=SCRIPTS_DIR, module=module, heavy=HEAVY)
+    runs = []
+    loaded = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        runs.append(result['seconds'] * 1000)
+        loaded = result['loaded']
+    return {'median_ms': round(statistics.median(runs), 1), 'min_ms': round(min(runs), 1), 'loaded': loaded}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Misst die Import-Zeit der Module in 0_scripts.')
+    parser.add_argument('--modules', nargs='*', default=MODULES, help='Zu messende Module')
+    parser.add_argument('--repeat', type=int, default=5, help='Anzahl Messungen pro Modul')
+    parser.add_argument('--out', default=None, help='JSON-File für die Resultate. Default: results/import_<datum>_<commit>.json')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for module in args.modules:
+        results[module] = measure(module, repeat=args.repeat)
+        print(f"{module:<32} {results[module]['median_ms']:>8.1f} ms   {', '.join(results[module]['loaded']) or '-'}")
+
+    commit = git_commit()
+    out = args.out or os.path.join(RESULTS_DIR, f"import_{datetime.date.today().strftime('%Y-%m-%d')}_{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump({'commit': commit, 'python': sys.version.split()[0], 'repeat': args.repeat, 'modules': results}, f, indent=1)
+    print(f"\nResultate gespeichert: {out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
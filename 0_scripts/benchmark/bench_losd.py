@@ -0,0 +1,278 @@
+"""
+Benchmark für Laden, Datentypen, Aggregation und Grafiken auf den Files in losd/saved_data.
+
+Die gespeicherten Datensätze dienen als Offline-Fixtures. Zusätzlich werden synthetisch vergrösserte Versionen (10x, 100x Zeilen)
+erzeugt, indem die Gebiete mit neuen RAUM-Codes vervielfacht werden. Alle Versionen werden über einen lokalen HTTP-Ersatz
+für CKAN/LD (losd_standin.py) ausgeliefert, load_data läuft also unverändert, nur ohne Netzwerk.
+
+Pro Fixture und Faktor werden die Phasen mehrmals gemessen (Median der Zeit) und einmal mit tracemalloc (Peak-Speicher).
+Die Resultate landen als JSON in benchmark/results/, mit --compare wird die Veränderung gegenüber einem früheren Lauf angezeigt.
+
+Aufruf:
+    python 0_scripts/benchmark/bench_losd.py
+    python 0_scripts/benchmark/bench_losd.py --scales 1 10 --repeat 5 --compare 0_scripts/benchmark/results/losd_2026-10-01_abc1234.json
+"""
+import argparse
+import contextlib
+import datetime
+import glob
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import losd_standin
+from bench_import import RESULTS_DIR, git_commit
+import my_py_batch_runner as mypy_br
+import my_py_cube_functions as mypy_cube
+import my_py_datacheck_functions as mypy_dc
+import my_py_dataloading_functions as mypy_dl
+import my_py_dataviz_functions as mypy_dv
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+FIXTURE_DIR = os.path.join(BENCH_DIR, '..', '..', 'losd', 'saved_data')
+
+# Spalten, die erst in den Notebooks berechnet werden und in den LD-Views nicht enthalten sind
+DERIVED = ['StichtagDatJahr', 'StichtagDatJahr_str', 'Jahr', 'RAUM_my_sort']
+
+
+def read_fixture(path):
+    """
+    Diese Funktion liest ein File aus losd/saved_data und entfernt die abgeleiteten Spalten, so dass es einem LD-Download entspricht.
+
+    Parameter (zwingend):
+    - path (str): Pfad zum CSV, z.B. 'losd/saved_data/bev324od3240_2024-06-26.csv'.
+
+    Rückgabe:
+    - fixture (dict): package_name, dataset_name, measures und data (DataFrame mit Strings, wie im CSV).
+    """
+    package_name = os.path.basename(path).split('_')[0]
+    data = pd.read_csv(path, dtype=str, keep_default_na=False)
+    data = data.drop(columns=[c for c in DERIVED if c in data.columns])
+    measures = [c for c in data.columns
+                if not c.endswith(('_LANG', '_CODE')) and pd.to_numeric(data[c], errors='coerce').notna().mean() > 0.9]
+    return {'package_name': package_name, 'dataset_name': package_name + '.csv', 'measures': measures, 'data': data}
+
+
+def scale_fixture(data, factor):
+    """
+    Diese Funktion vervielfacht einen Datensatz. Jede Kopie erhält eigene Gebiete (RAUM_LANG mit Suffix, RAUM_CODE mit
+    vorangestellter Kopie-Nummer), die Gruppierungen wachsen also mit. Die letzten drei Zeichen des RAUM_CODE bleiben erhalten.
+
+    Parameter (zwingend):
+    - data (DataFrame): Der Datensatz aus read_fixture.
+    - factor (int): Anzahl Kopien, z.B. 10.
+
+    Rückgabe:
+    - data (DataFrame): Der vergrösserte Datensatz.
+    """
+    if factor == 1:
+        return data
+    copies = [data]
+    for k in range(1, factor):
+        copy = data.copy()
+        if 'RAUM_CODE' in copy.columns:
+            copy['RAUM_CODE'] = copy['RAUM_CODE'].str[:1] + f'{k:02d}' + copy['RAUM_CODE'].str[1:]
+        if 'RAUM_LANG' in copy.columns:
+            copy['RAUM_LANG'] = copy['RAUM_LANG'] + f' #{k}'
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def _standard_groupbys(data, measure, dims):
+    # Die Gruppierungen, die in allen Testnotebooks vorkommen
+    results = [
+        data.groupby(['Jahr'], observed=True).agg(sum=(measure, 'sum')),
+        data.groupby(['StichtagDatJahr', 'Jahr'], observed=True).agg(sum=(measure, 'sum')),
+    ]
+    if 'RAUM_CODE' in data.columns:
+        results.append(data.groupby(['RAUM_my_sort', 'RAUM_LANG', 'RAUM_CODE'], observed=True).agg(sum=(measure, 'sum')))
+        results.append(data.groupby(['StichtagDatJahr', 'RAUM_LANG', 'RAUM_CODE'], observed=True).agg(sum=(measure, 'sum')))
+    for dim in dims:
+        results.append(data.groupby(['StichtagDatJahr', dim], observed=True).agg(sum=(measure, 'sum')))
+    return results
+
+
+def _cube_rollups(data, measure, dims):
+    # Gleiche Aggregate wie _standard_groupbys, aber über build_cube/rollup
+    extra = ['RAUM_my_sort', 'RAUM_LANG', 'RAUM_CODE'] if 'RAUM_CODE' in data.columns else []
+    cube = mypy_cube.build_cube(data, list(dict.fromkeys(['Jahr'] + extra + dims)), [measure])
+    results = [mypy_cube.rollup(cube, ['Jahr']), mypy_cube.rollup(cube, ['StichtagDatJahr', 'Jahr'])]
+    if extra:
+        results.append(mypy_cube.rollup(cube, extra))
+        results.append(mypy_cube.rollup(cube, ['StichtagDatJahr', 'RAUM_LANG', 'RAUM_CODE']))
+    for dim in dims:
+        results.append(mypy_cube.rollup(cube, ['StichtagDatJahr', dim]))
+    return results
+
+
+def _chart_altair(data, measure):
+    # Mehrlinien-Grafik pro Gebiet inkl. Serialisierung der Spezifikation (passiert in Colab bei der Anzeige)
+    category = 'RAUM_LANG' if 'RAUM_LANG' in data.columns else None
+    by = ['StichtagDatJahr'] + ([category] if category else [])
+    agg = data.groupby(by, observed=True).agg(sum=(measure, 'sum')).reset_index()
+    chart = mypy_dv.plot_altair_multiline_highlight(
+        data=agg, x='StichtagDatJahr:T', y='sum:Q', category=f'{category}:N' if category else '',
+        myTitle=measure, x_beschriftung='Jahr')
+    return chart.to_dict()
+
+
+def _chart_facetgrid(data, measure, fast=False):
+    # FacetGrid nach Kreis (bzw. nach der ersten Dimension), wie in den Notebooks; fast=True misst den schnellen Modus
+    col = 'KREISEZH_LANG' if 'KREISEZH_LANG' in data.columns else mypy_br._chart_dims(data, {})[0]
+    agg = data.groupby(['StichtagDatJahr', col], observed=True).agg(sum=(measure, 'sum')).reset_index()
+    fg = mypy_dv.plot_sns_facetgrid(agg, col=col, hue=col, col_wrap=4, height=2,
+                                    x='StichtagDatJahr', y='sum', grafiktyp=sns.lineplot, fast=fast)
+    fg.figure.canvas.draw()
+    plt.close(fg.figure)
+    return fg
+
+
+def _run_phase(func, repeat):
+    # Zeit: Median über repeat Läufe ohne tracemalloc. Speicher: ein separater Lauf mit tracemalloc
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func()
+            times.append(time.perf_counter() - start)
+        # Die Funktionen in 0_scripts geben bei einem Fehler None zurück, das darf nicht als schnelle Messung durchgehen
+        if result is None or (isinstance(result, list) and any(r is None for r in result)):
+            raise RuntimeError(f'{func.__name__} hat kein Resultat geliefert')
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, {'median_s': round(statistics.median(times), 4), 'min_s': round(min(times), 4),
+                    'peak_mb': round(peak / 1024 / 1024, 2)}
+
+
+def bench_fixture(fixture, factor, root, base_url, repeat=3, charts=True):
+    """
+    Diese Funktion misst alle Phasen für eine Fixture in einem Vergrösserungsfaktor.
+
+    Parameter (zwingend):
+    - fixture (dict): Rückgabe von read_fixture.
+    - factor (int): Vergrösserungsfaktor, z.B. 10.
+    - root (str): Verzeichnis des lokalen Servers.
+    - base_url (str): URL des lokalen Servers.
+
+    Optionale Parameter:
+    - repeat (int): Anzahl Messungen pro Phase. Default: 3
+    - charts (bool): Grafiken mitmessen? Default: True
+
+    Rückgabe:
+    - records (list): Ein dict pro Phase mit fixture, scale, rows, phase, median_s, min_s und peak_mb.
+    """
+    package_name = f"{fixture['package_name']}x{factor}" if factor > 1 else fixture['package_name']
+    dataset_name = package_name + '.csv'
+    measure = fixture['measures'][0]
+    raw = scale_fixture(fixture['data'], factor)
+    paths = losd_standin.write_fixture(root, package_name, dataset_name, raw)
+    load = dict(status='int', data_source='ld', package_name=package_name, dataset_name=dataset_name,
+                datums_attr=['ZEIT_LANG'], ld_integ_url=f'{base_url}/statistics/view/', timeout=60)
+
+    phases = {}
+    data, phases['load_ld'] = _run_phase(lambda: mypy_dl.load_data(**load), repeat)
+    _, phases['load_ld_stream'] = _run_phase(lambda: mypy_dl.load_data(stream=True, **load), repeat)
+    _, phases['parse_csv'] = _run_phase(lambda: pd.read_csv(paths['ckan'], parse_dates=['ZEIT_LANG']), repeat)
+    _, phases['parse_csv_arrow'] = _run_phase(
+        lambda: mypy_dl._read_csv_arrow(paths['ckan'], ',', 'utf-8', ['', '.', '...', 'NA', 'NULL'], ['ZEIT_LANG'], 'category', None),
+        repeat)
+    data = mypy_br._derive_columns(data, 'ZEIT_LANG')
+    data, phases['dtypes'] = _run_phase(lambda: mypy_dl.optimize_losd_dtypes(data), repeat)
+    dims = mypy_br._chart_dims(data, {'max_categories': 50})
+    _, phases['groupbys'] = _run_phase(lambda: _standard_groupbys(data, measure, dims), repeat)
+    _, phases['cube_rollups'] = _run_phase(lambda: _cube_rollups(data, measure, dims), repeat)
+    # Laden und Aggregieren in Chunks, Speicher proportional zu den Zellen statt zu den Zeilen
+    _, phases['cube_chunked'] = _run_phase(lambda: mypy_cube.build_cube_chunked(
+        mypy_dl.load_data(chunksize=50000, **load), list(dict.fromkeys(['Jahr'] + dims)), [measure],
+        prepare=lambda chunk: mypy_br._derive_columns(chunk, 'ZEIT_LANG'), workers=2), repeat)
+    # Plausibilitätsprüfung der Zeitreihen pro Gebiet und Dimension auf dem Cube
+    keys = list(dict.fromkeys((['RAUM_CODE'] if 'RAUM_CODE' in data.columns else []) + dims))
+    cube = data.groupby(keys + ['StichtagDatJahr'], observed=True).agg(**{measure: (measure, 'sum')}).reset_index()
+    _, phases['check_timeseries'] = _run_phase(lambda: mypy_dc.check_timeseries(cube, keys, [measure]), repeat)
+    if charts:
+        _, phases['chart_altair'] = _run_phase(lambda: _chart_altair(data, measure), repeat)
+        _, phases['chart_facetgrid'] = _run_phase(lambda: _chart_facetgrid(data, measure), repeat)
+        _, phases['chart_facetgrid_fast'] = _run_phase(lambda: _chart_facetgrid(data, measure, fast=True), repeat)
+
+    return [dict(fixture=fixture['package_name'], scale=factor, rows=len(raw), phase=phase, **values)
+            for phase, values in phases.items()]
+
+
+def _print_table(records, baseline=None):
+    # Tabelle der Resultate, mit Baseline zusätzlich die Veränderung der Zeit in Prozent
+    index = {(r['fixture'], r['scale'], r['phase']): r for r in (baseline or [])}
+    print(f"{'fixture':<16}{'scale':>6}{'rows':>10}  {'phase':<22}{'median_s':>10}{'peak_mb':>10}{'vs_base':>10}")
+    for r in records:
+        base = index.get((r['fixture'], r['scale'], r['phase']))
+        change = f"{(r['median_s'] / base['median_s'] - 1) * 100:+.0f}%" if base and base['median_s'] > 0 else ''
+        print(f"{r['fixture']:<16}{r['scale']:>6}{r['rows']:>10,}  {r['phase']:<22}{r['median_s']:>10.4f}{r['peak_mb']:>10.2f}{change:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark für Laden, Aggregation und Grafiken auf den LOSD-Fixtures.')
+    parser.add_argument('--fixtures', nargs='*', default=None, help='Nur diese Fixtures (Package-Namen). Default: alle in losd/saved_data')
+    parser.add_argument('--scales', nargs='*', type=int, default=[1, 10, 100], help='Vergrösserungsfaktoren')
+    parser.add_argument('--repeat', type=int, default=3, help='Anzahl Messungen pro Phase')
+    parser.add_argument('--no-charts', action='store_true', help='Grafiken nicht mitmessen')
+    parser.add_argument('--out', default=None, help='JSON-File für die Resultate. Default: results/losd_<datum>_<commit>.json')
+    parser.add_argument('--compare', default=None, help='Früheres Resultat-File, gegenüber dem die Veränderung angezeigt wird')
+    args = parser.parse_args(argv)
+
+    import altair as alt
+    alt.data_transformers.disable_max_rows()
+
+    fixtures = [read_fixture(p) for p in sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.csv')))]
+    if args.fixtures:
+        fixtures = [f for f in fixtures if f['package_name'] in args.fixtures]
+
+    records = []
+    with tempfile.TemporaryDirectory(prefix='losd_bench_') as root:
+        server, base_url = losd_standin.start(root)
+        try:
+            for fixture in fixtures:
+                for factor in args.scales:
+                    records.extend(bench_fixture(fixture, factor, root, base_url, repeat=args.repeat, charts=not args.no_charts))
+                    print(f"bench: {fixture['package_name']} x{factor} gemessen", file=sys.stderr)
+        finally:
+            server.shutdown()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['records']
+    _print_table(records, baseline)
+
+    commit = git_commit()
+    out = args.out or os.path.join(RESULTS_DIR, f"losd_{datetime.date.today().strftime('%Y-%m-%d')}_{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    environment = {'python': sys.version.split()[0], 'pandas': pd.__version__, 'numpy': np.__version__,
+                   'machine': platform.machine(), 'cpu_count': os.cpu_count()}
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump({'commit': commit, 'date': datetime.datetime.now().isoformat(timespec='seconds'), 'repeat': args.repeat,
+                   'environment': environment, 'records': records}, f, indent=1)
+    print(f"\nResultate gespeichert: {out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Lokaler HTTP-Ersatz für CKAN und LD, damit load_data ohne Netzwerk gegen Files auf der Festplatte laufen kann.
+
+Die Files werden mit der gleichen URL-Struktur abgelegt, wie load_data sie zusammensetzt:
+    <root>/dataset/<package_name>/download/<dataset_name>       (CKAN, ckan_integ_url/ckan_prod_url = <base_url>/dataset/)
+    <root>/statistics/view/<PACKAGE_NAME>/observation           (LD, ld_integ_url/ld_prod_url = <base_url>/statistics/view/)
+Der Server liefert Last-Modified und beantwortet If-Modified-Since mit 304, der Download-Cache kann also mitgetestet werden.
+Optional (siehe start) komprimiert er mit gzip, beantwortet Range-Requests, drosselt die Übertragung und bricht Verbindungen ab,
+damit sich Downloads über langsame oder instabile Verbindungen (VPN, Colab) offline nachstellen lassen.
+"""
+import email.utils
+import functools
+import gzip
+import http.server
+import os
+import re
+import threading
+import time
+
+
+class _Handler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if not self.server.options['extended']:
+            return super().do_GET()
+        self._serve(body=True)
+
+    def do_HEAD(self):
+        if not self.server.options['extended']:
+            return super().do_HEAD()
+        self._serve(body=False)
+
+    def _serve(self, body):
+        options = self.server.options
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404, "File not found")
+            return
+        st = os.stat(path)
+        etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        last_modified = self.date_time_string(st.st_mtime)
+        since = self.headers.get('If-Modified-Since')
+        if self.headers.get('If-None-Match') == etag or (
+                since and email.utils.parsedate_to_datetime(since).timestamp() >= int(st.st_mtime)):
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        encoding = 'gzip' if options['gzip'] and 'gzip' in self.headers.get('Accept-Encoding', '') else None
+        content = self.server.content(path, etag, encoding)
+        start, end, status = 0, len(content) - 1, 200
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if options['ranges'] and match and self.headers.get('If-Range', etag) in (etag, last_modified):
+            start = int(match.group(1))
+            end = min(int(match.group(2)), end) if match.group(2) else end
+            if start > end:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(content)}')
+                self.end_headers()
+                return
+            status = 206
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/csv; charset=utf-8')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Last-Modified', last_modified)
+        self.send_header('ETag', etag)
+        if options['ranges']:
+            self.send_header('Accept-Ranges', 'bytes')
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(content)}')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        if not body:
+            return
+
+        # In Paketen schreiben: gedrosselt auf rate_kbps und beim ersten Request pro File nach drop_after Bytes abgebrochen
+        drop_at = None
+        if options['drop_after'] and self.server.drop_once(path):
+            drop_at = start + options['drop_after']
+        position = start
+        packet = 64 * 1024
+        try:
+            while position <= end:
+                size = min(packet, end + 1 - position)
+                if drop_at is not None and position + size > drop_at:
+                    self.wfile.write(content[position:drop_at])
+                    self.close_connection = True
+                    return
+                self.wfile.write(content[position:position + size])
+                position += size
+                if options['rate_kbps']:
+                    time.sleep(size / 1024 / options['rate_kbps'])
+        except (BrokenPipeError, ConnectionResetError):
+            # Der Client hat die Antwort nicht fertig gelesen, z.B. nach den Headern auf parallele Teil-Downloads gewechselt
+            self.close_connection = True
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler, options):
+        super().__init__(address, handler)
+        self.options = options
+        self._lock = threading.Lock()
+        self._contents = {}
+        self._dropped = set()
+
+    def content(self, path, etag, encoding):
+        # Die (komprimierten) Bytes pro Version des Files nur einmal erzeugen, gzip mit mtime=0 ergibt für Range-Requests stabile Offsets
+        key = (path, etag, encoding)
+        with self._lock:
+            if key not in self._contents:
+                with open(path, 'rb') as f:
+                    raw = f.read()
+                self._contents[key] = gzip.compress(raw, compresslevel=6, mtime=0) if encoding == 'gzip' else raw
+            return self._contents[key]
+
+    def drop_once(self, path):
+        with self._lock:
+            if path in self._dropped:
+                return False
+            self._dropped.add(path)
+            return True
+
+
+def write_fixture(root, package_name, dataset_name, data, **kwargs):
+    """
+    Diese Funktion legt einen Datensatz als CSV unter dem CKAN- und dem LD-Pfad des Servers ab.
+
+    Parameter (zwingend):
+    - root (str): Wurzelverzeichnis des Servers.
+    - package_name (str): Name des Packages, z.B. 'bev324od3240'.
+    - dataset_name (str): Name der Ressource, z.B. 'bev324od3240.csv'.
+    - data (DataFrame): Der Datensatz.
+
+    Optionale Parameter:
+    - encoding (str): Encoding des CSV. Default: 'utf-8'
+
+    Rückgabe:
+    - paths (dict): Pfade der geschriebenen Files unter 'ckan' und 'ld'.
+    """
+    encoding = kwargs.get('encoding', 'utf-8')
+
+    ckan_path = os.path.join(root, 'dataset', package_name.lower(), 'download', dataset_name)
+    ld_path = os.path.join(root, 'statistics', 'view', package_name.upper(), 'observation')
+    os.makedirs(os.path.dirname(ckan_path), exist_ok=True)
+    os.makedirs(os.path.dirname(ld_path), exist_ok=True)
+    data.to_csv(ckan_path, index=False, encoding=encoding)
+    with open(ckan_path, 'rb') as src, open(ld_path, 'wb') as dst:
+        dst.write(src.read())
+    return {'ckan': ckan_path, 'ld': ld_path}
+
+
+def start(root, **kwargs):
+    """
+    Diese Funktion startet den Server in einem Hintergrund-Thread auf einem freien Port von 127.0.0.1.
+
+    Parameter (zwingend):
+    - root (str): Verzeichnis mit den Files (siehe write_fixture).
+
+    Optionale Parameter:
+    - gzip (bool): Antworten mit Content-Encoding gzip, wenn der Client es anbietet. Default: False
+    - ranges (bool): Range-Requests (mit If-Range) beantworten und Accept-Ranges/ETag senden. Default: False
+    - rate_kbps (num): Übertragung auf so viele KB pro Sekunde und Verbindung drosseln. Default: None
+    - drop_after (int): Die erste Antwort pro File nach so vielen Bytes abbrechen. Default: None
+
+    Rückgabe:
+    - server (ThreadingHTTPServer): Der laufende Server, beenden mit server.shutdown().
+    - base_url (str): z.B. 'http://127.0.0.1:54321'
+    """
+    options = {
+        'gzip': kwargs.get('gzip', False),
+        'ranges': kwargs.get('ranges', False),
+        'rate_kbps': kwargs.get('rate_kbps', None),
+        'drop_after': kwargs.get('drop_after', None),
+    }
+    options['extended'] = any(options.values())
+    server = _Server(('127.0.0.1', 0), functools.partial(_Handler, directory=root), options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
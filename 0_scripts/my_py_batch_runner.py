@@ -0,0 +1,229 @@
+"""
+Headless Batch-Runner für die LOSD-Testnotebooks.
+
+Führt für eine Liste von Datensätzen aus einem Config-File (JSON) die gleiche Prüfung aus wie die Notebooks in losd/:
+load_data -> abgeleitete Spalten -> profile -> Aggregate -> Grafiken -> Snapshot (und optional ein Abgleich mit SASA).
+Unabhängige Datensätze laufen parallel in einem Prozess-Pool und teilen sich den Download-Cache.
+
+Aufruf:
+    python 0_scripts/my_py_batch_runner.py losd/batch_config.json
+    python 0_scripts/my_py_batch_runner.py losd/batch_config.json --only bev324od3240 --max-workers 2 --report report.json
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from my_py_import_functions import lazy_import
+import my_py_datacheck_functions as mypy_dc
+import my_py_dataloading_functions as mypy_dl
+import my_py_dataviz_functions as mypy_dv
+import my_py_export_functions as mypy_ex
+import my_py_raum_functions as mypy_raum
+import my_py_snapshot_functions as mypy_snap
+
+pd = lazy_import('pandas')
+
+
+def _derive_columns(data, zeit):
+    # Gleiche abgeleitete Spalten wie in den Notebooks, über die verschiedenen Zeitwerte statt pro Zeile berechnet
+    data = mypy_dl.derive_zeit_columns(data, zeit)
+    if 'RAUM_CODE' in data.columns:
+        data['RAUM_my_sort'] = mypy_raum.raum_sort(data['RAUM_CODE'])
+    return data
+
+
+def _chart_dims(data, spec):
+    # Default: alle LOSD-Dimensionen (ausser der Zeit) mit überschaubar vielen Ausprägungen
+    if 'chart_dims' in spec:
+        return spec['chart_dims']
+    dims = []
+    for col in data.columns:
+        if col.endswith('_LANG') and col != 'ZEIT_LANG' and data[col].nunique() <= spec.get('max_categories', 50):
+            dims.append(col)
+    return dims
+
+
+def _warm_imports(charts):
+    # Schwere Module im Hauptprozess laden: Bei fork übernehmen die Worker sie, statt sie je einzeln zu importieren
+    pd.DataFrame
+    mypy_dl.requests.Session
+    mypy_snap.feather.write_feather
+    if charts:
+        mypy_dv.alt.Chart
+
+
+def run_dataset(spec, settings):
+    """
+    Diese Funktion führt die Prüfung für einen Datensatz aus und liefert eine Zeile für den Summary-Report.
+
+    Parameter (zwingend):
+    - spec (dict): Eintrag aus 'datasets' im Config-File, mit
+        - name (str): Name des Datensatzes, wird auch für Grafik- und Snapshot-Namen verwendet, z.B. 'bau502od5022'
+        - load (dict): Parameter für load_data (status, data_source, package_name, dataset_name, datums_attr, ...)
+        - measures (list): Kennzahlen, z.B. ['WHG']
+        - zeit (str, optional): Datumsspalte. Default: erstes Element von load['datums_attr']
+        - chart_dims (list, optional): Dimensionen für die Grafiken. Default: alle *_LANG-Spalten mit max. 50 Ausprägungen
+        - reference (dict, optional): load_data-Parameter eines Vergleichsdatensatzes (z.B. SASA) mit
+          reconcile_keys und reconcile_measures (siehe reconcile)
+    - settings (dict): Gemeinsame Einstellungen (cache_dir, out_dir, store_dir, timeout, datum, charts, snapshot).
+
+    Rückgabe:
+    - summary (dict): Kennzahlen der Prüfung.
+    """
+    start = time.time()
+    name = spec['name']
+    summary = {'name': name, 'status': 'ok'}
+    try:
+        load = dict(spec['load'])
+        load.setdefault('cache', True)
+        load.setdefault('cache_dir', settings.get('cache_dir'))
+        load.setdefault('timeout', settings.get('timeout', 120))
+        zeit = spec.get('zeit', load.get('datums_attr', ['StichtagDatJahr'])[0])
+        measures = spec['measures']
+        datum = settings['datum']
+
+        data = mypy_dl.load_data(**load)
+        if data is None:
+            raise RuntimeError('load_data hat keine Daten geliefert')
+        data = _derive_columns(data, zeit)
+
+        report = mypy_dl.profile(data, sample=settings.get('profile_sample'))
+        summary.update({
+            'rows': report['rows'],
+            'columns': report['columns'],
+            'memory_mb': round(report['memory_bytes'] / 1024 / 1024, 1),
+            'duplicates': report['n_duplicates'],
+            'null_cells': int(report['info']['null'].sum()),
+            'min_jahr': int(data['Jahr'].min()),
+            'max_jahr': int(data['Jahr'].max()),
+        })
+
+        dims = _chart_dims(data, spec)
+        # Direkte groupbys: für die wenigen Aggregate pro Datensatz sind sie schneller als build_cube über alle Dimensionen
+        sums = {f'sum_{m}': (m, 'sum') for m in measures}
+        last = data.groupby('Jahr', observed=True).agg(**sums).iloc[-1]
+        for m in measures:
+            summary[f'sum_{m}_{summary["max_jahr"]}'] = float(last[f'sum_{m}'])
+
+        if settings.get('charts', True):
+            charts = {}
+            total = data.groupby('StichtagDatJahr', observed=True).agg(**sums).reset_index()
+            by_dim = {dim: data.groupby(['StichtagDatJahr', dim], observed=True).agg(**sums).reset_index() for dim in dims}
+            for m in measures:
+                charts[f'{name}_alt1_total_{m.lower()}_{datum}.png'] = mypy_dv.plot_altair_multiline_highlight(
+                    data=total, x='StichtagDatJahr:T', y=f'sum_{m}:Q', myTitle=f'{name}: {m} total', x_beschriftung='Jahr',
+                    slim_data=True)
+                for dim in dims:
+                    agg = by_dim[dim]
+                    charts[f'{name}_alt_{dim.lower()}_{m.lower()}_zeit_{datum}.png'] = mypy_dv.plot_altair_multiline_highlight(
+                        data=agg, x='StichtagDatJahr:T', y=f'sum_{m}:Q', category=f'{dim}:N',
+                        myTitle=f'{name}: {m} nach {dim}', x_beschriftung='Jahr', category_beschriftung=dim, slim_data=True)
+            status = mypy_ex.export_charts(charts, settings['out_dir'], max_workers=1) or {}
+            summary['charts_rendered'] = sum(1 for v in status.values() if v == 'rendered')
+            summary['charts_skipped'] = sum(1 for v in status.values() if v == 'skipped')
+
+        if settings.get('snapshot', True):
+            entry = mypy_snap.save_snapshot(data, name, datum=datum, store_dir=settings.get('store_dir'))
+            summary['snapshot'] = entry['file'] if entry else None
+            if 'RAUM_CODE' in data.columns:
+                store_dir = settings.get('store_dir') or mypy_snap.default_store_dir()
+                mypy_raum.update_raum_index(data, index_path=os.path.join(store_dir, 'raum_index.arrow'))
+
+        if 'reference' in spec:
+            reference = dict(spec['reference'])
+            reconcile_keys = reference.pop('reconcile_keys')
+            reconcile_measures = reference.pop('reconcile_measures')
+            reference.setdefault('cache', True)
+            reference.setdefault('cache_dir', settings.get('cache_dir'))
+            reference.setdefault('timeout', settings.get('timeout', 120))
+            ref_data = mypy_dl.load_data(**reference)
+            result = mypy_dc.reconcile(ref_data, data, keys=reconcile_keys, measures=reconcile_measures)
+            summary['reconcile_ok'] = result['ok'] if result else None
+            if result:
+                summary['reconcile_missing'] = result['n_missing']
+                summary['reconcile_extra'] = result['n_extra']
+                summary['reconcile_diff_cells'] = int(result['measures']['n_diff'].sum())
+
+    except Exception as e:
+        summary['status'] = 'error'
+        summary['error'] = str(e)
+
+    summary['seconds'] = round(time.time() - start, 2)
+    return summary
+
+
+def run_batch(config, **kwargs):
+    """
+    Diese Funktion führt run_dataset für alle Datensätze eines Configs in einem Prozess-Pool aus.
+
+    Parameter (zwingend):
+    - config (dict): Inhalt des Config-Files mit 'datasets' (Liste) und optionalen gemeinsamen Einstellungen
+      (cache_dir, out_dir, store_dir, timeout, max_workers, charts, snapshot, profile_sample).
+
+    Optionale Parameter:
+    - only (list): Nur diese Datensätze (Namen) ausführen. Default: alle
+    - max_workers (int): Anzahl Prozesse. Default: config['max_workers'] bzw. Anzahl CPU-Kerne
+
+    Rückgabe:
+    - report (DataFrame): Eine Zeile pro Datensatz.
+    """
+    only = kwargs.get('only', None)
+    max_workers = kwargs.get('max_workers', None) or config.get('max_workers') or os.cpu_count()
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    settings = {
+        'cache_dir': config.get('cache_dir'),
+        'out_dir': config.get('out_dir', os.path.join(base_dir, '..', 'losd', 'grafiken_testing')),
+        'store_dir': config.get('store_dir'),
+        'timeout': config.get('timeout', 120),
+        'datum': config.get('datum', datetime.date.today().strftime("%Y-%m-%d")),
+        'charts': config.get('charts', True),
+        'snapshot': config.get('snapshot', True),
+        'profile_sample': config.get('profile_sample'),
+    }
+    specs = [s for s in config['datasets'] if not only or s['name'] in only]
+    _warm_imports(settings['charts'])
+
+    with ProcessPoolExecutor(max_workers=max(1, min(max_workers, len(specs)))) as executor:
+        summaries = list(executor.map(run_dataset, specs, [settings] * len(specs)))
+
+    return pd.DataFrame(summaries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Führt die LOSD-Prüfungen für alle Datensätze eines Config-Files aus.')
+    parser.add_argument('config', help='Pfad zum Config-File (JSON)')
+    parser.add_argument('--only', nargs='*', help='Nur diese Datensätze (Namen) ausführen')
+    parser.add_argument('--max-workers', type=int, default=None, help='Anzahl paralleler Prozesse')
+    parser.add_argument('--report', default=None, help='Summary-Report zusätzlich als JSON speichern')
+    parser.add_argument('--no-charts', action='store_true', help='Keine Grafiken erstellen')
+    parser.add_argument('--no-snapshot', action='store_true', help='Keine Snapshots speichern')
+    args = parser.parse_args(argv)
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    if args.no_charts:
+        config['charts'] = False
+    if args.no_snapshot:
+        config['snapshot'] = False
+
+    start = time.time()
+    report = run_batch(config, only=args.only, max_workers=args.max_workers)
+
+    with pd.option_context('display.max_columns', None, 'display.width', 200):
+        print()
+        print(report.to_string(index=False))
+    print(f"\n{len(report)} Datensätze in {time.time() - start:.1f}s geprüft, {int((report['status'] != 'ok').sum())} mit Fehlern")
+
+    if args.report:
+        report.to_json(args.report, orient='records', indent=1, force_ascii=False)
+
+    return 0 if (report['status'] == 'ok').all() else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
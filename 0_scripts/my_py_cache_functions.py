@@ -0,0 +1,307 @@
+import contextlib
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from my_py_import_functions import lazy_import
+import my_py_trace_functions as mypy_trace
+
+requests = lazy_import('requests')
+
+try:
+    import fcntl
+except ImportError:  # Windows: Lock über ein exklusiv angelegtes File
+    fcntl = None
+
+
+def default_cache_dir():
+    """
+    Diese Funktion liefert das Standardverzeichnis des Download-Caches.
+    Falls die Umgebungsvariable LOSD_CACHE_DIR gesetzt ist, wird diese verwendet, sonst ~/.cache/losd_colab.
+
+    Rückgabe:
+    - cache_dir (str): Pfad zum Cache-Verzeichnis.
+    """
+    return os.environ.get('LOSD_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'losd_colab'))
+
+
+@contextlib.contextmanager
+def file_lock(path, **kwargs):
+    """
+    Diese Funktion sperrt ein File für andere Prozesse, solange der with-Block läuft, z.B. für das Lesen, Ergänzen und Schreiben
+    eines Manifests, in das mehrere Worker des Batch-Runners gleichzeitig schreiben. Gesperrt wird über ein Lock-File <path>.lock.
+
+    Parameter (zwingend):
+    - path (str): Das File, das geschützt werden soll.
+
+    Optionale Parameter:
+    - stale_s (num): Nur ohne fcntl: ein Lock-File, das älter ist, stammt von einem abgestürzten Prozess und wird entfernt. Default: 300
+
+    Beispiel:
+    with file_lock(manifest_path):
+        manifest = _read_manifest(...)
+        ...
+    """
+    stale_s = kwargs.get('stale_s', 300)
+    lock_path = path + '.lock'
+    os.makedirs(os.path.dirname(os.path.abspath(lock_path)), exist_ok=True)
+    if fcntl is not None:
+        with open(lock_path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if os.path.getmtime(lock_path) < time.time() - stale_s:
+                    _remove(lock_path)
+            except OSError:
+                pass
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        _remove(lock_path)
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _index_path(cache_dir, url):
+    # Der Index ist nach der URL adressiert, die Objekte nach ihrem Inhalt
+    return os.path.join(cache_dir, 'index', _sha256(url) + '.json')
+
+
+def _object_path(cache_dir, content_hash):
+    return os.path.join(cache_dir, 'objects', content_hash[:2], content_hash + '.gz')
+
+
+def _read_entry(index_path):
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _remove(path):
+    # Ein paralleler Prozess kann das File bereits gelöscht haben
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _write_json_atomic(path, data):
+    # Schreiben via temporäres File + os.replace, damit parallele Prozesse nie ein halbes File lesen
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def cached_download(url, **kwargs):
+    """
+    Diese Funktion lädt eine Datei über HTTP herunter und legt die Rohbytes komprimiert (gzip) in einem lokalen Cache ab.
+    Ist die URL bereits im Cache, wird mit ETag/Last-Modified ein bedingter GET geschickt. Antwortet der Server mit 304,
+    wird nichts übertragen und das vorhandene Objekt wiederverwendet.
+    Die Objekte sind inhaltsadressiert (sha256 der Rohbytes), identische Downloads von verschiedenen URLs werden also nur einmal gespeichert.
+
+    Parameter (zwingend):
+    - url (str): Die URL der Datei, z.B. der aufgelöste Pfad fp aus load_data.
+
+    Optionale Parameter:
+    - cache_dir (str): Cache-Verzeichnis. Default: default_cache_dir()
+    - session (requests.Session): Session, über welche der Download laufen soll. Default: None (requests.get)
+    - verify (bool): SSL-Zertifikate prüfen? Default: False
+    - timeout (num): Timeout in Sekunden. Default: None
+    - cache_max_mb (num): Maximale Grösse des Caches in MB, ältere Einträge werden verdrängt. Default: 500
+    - cache_max_age_days (num): Einträge, die so viele Tage nicht mehr verwendet wurden, werden gelöscht. Default: 30
+
+    Rückgabe:
+    - object_path (str): Pfad zum gzip-komprimierten Objekt im Cache.
+    """
+    cache_dir = kwargs.get('cache_dir', None) or default_cache_dir()
+    session = kwargs.get('session', None)
+    verify = kwargs.get('verify', False)
+    timeout = kwargs.get('timeout', None)
+    cache_max_mb = kwargs.get('cache_max_mb', 500)
+    cache_max_age_days = kwargs.get('cache_max_age_days', 30)
+
+    index_path = _index_path(cache_dir, url)
+    entry = _read_entry(index_path)
+    headers = {}
+    if entry is not None and os.path.exists(_object_path(cache_dir, entry['content_hash'])):
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+    else:
+        entry = None
+
+    getter = session if session is not None else requests
+    now = time.time()
+    response = getter.get(url, headers=headers, verify=verify, timeout=timeout, stream=True)
+    mypy_trace.record('http_headers', response.elapsed.total_seconds(), status=response.status_code)
+    if response.status_code == 304:
+        response.close()
+        # Ein paralleles cache_evict kann das Objekt seit der Prüfung oben gelöscht haben
+        if entry is not None and os.path.exists(_object_path(cache_dir, entry['content_hash'])):
+            entry['accessed'] = now
+            _write_json_atomic(index_path, entry)
+            print("cache: 304 Not Modified, verwende lokale Kopie")
+            return _object_path(cache_dir, entry['content_hash'])
+        if headers:
+            print("cache: 304 Not Modified, aber keine lokale Kopie mehr vorhanden, lade ohne bedingten GET")
+            response = getter.get(url, headers={}, verify=verify, timeout=timeout, stream=True)
+            mypy_trace.record('http_headers', response.elapsed.total_seconds(), status=response.status_code)
+        if response.status_code == 304:
+            response.close()
+            raise requests.HTTPError(f"304 Not Modified ohne bedingten GET und ohne lokale Kopie: {url}", response=response)
+
+    with response as r:
+        r.raise_for_status()
+
+        # Rohbytes direkt beim Empfangen komprimieren und hashen, ohne die ganze Datei im Speicher zu halten
+        tmp_dir = os.path.join(cache_dir, 'objects')
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=tmp_dir, suffix='.part')
+        sha = hashlib.sha256()
+        size = 0
+        try:
+            with mypy_trace.phase('download') as p, os.fdopen(fd, 'wb') as raw, \
+                    gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0) as gz:
+                for chunk in r.iter_content(chunk_size=1 << 20):
+                    sha.update(chunk)
+                    gz.write(chunk)
+                    size += len(chunk)
+                p.set(bytes=size)
+            content_hash = sha.hexdigest()
+            object_path = _object_path(cache_dir, content_hash)
+            if os.path.exists(object_path):
+                os.remove(tmp)
+                # mtime erneuern: ein paralleler cache_evict sieht das Objekt so als neu an, bis der Index-Eintrag geschrieben ist
+                os.utime(object_path)
+            else:
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                os.replace(tmp, object_path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        entry = {
+            'url': url,
+            'etag': r.headers.get('ETag'),
+            'last_modified': r.headers.get('Last-Modified'),
+            'content_hash': content_hash,
+            'size': size,
+            'stored': now,
+            'accessed': now,
+        }
+    _write_json_atomic(index_path, entry)
+    print(f"cache: {size:,.0f} Bytes heruntergeladen und im Cache abgelegt")
+
+    # Das eben geladene Objekt nie verdrängen, auch wenn es allein grösser als cache_max_mb ist
+    cache_evict(cache_dir=cache_dir, cache_max_mb=cache_max_mb, cache_max_age_days=cache_max_age_days, keep=[content_hash])
+    return object_path
+
+
+def cache_evict(**kwargs):
+    """
+    Diese Funktion räumt den Download-Cache auf. Zuerst werden Einträge gelöscht, die zu lange nicht verwendet wurden,
+    danach die am längsten nicht verwendeten Einträge, bis die Maximalgrösse eingehalten ist.
+    Objekte, auf die kein Eintrag mehr zeigt, werden entfernt, sofern sie älter als grace_s sind. Ein anderer Prozess, der gerade ein Objekt
+    ablegt und seinen Index-Eintrag noch nicht geschrieben hat, verliert es dadurch nicht.
+
+    Optionale Parameter:
+    - cache_dir (str): Cache-Verzeichnis. Default: default_cache_dir()
+    - cache_max_mb (num): Maximale Grösse des Caches in MB. Default: 500
+    - cache_max_age_days (num): Maximales Alter seit der letzten Verwendung in Tagen. Default: 30
+    - keep (list): Content-Hashes, deren Objekte und Einträge nicht gelöscht werden, z.B. das eben geladene Objekt. Default: []
+    - grace_s (num): Objekte ohne Eintrag werden erst gelöscht, wenn sie so viele Sekunden alt sind. Default: 600
+
+    Rückgabe:
+    - removed (int): Anzahl gelöschter Einträge.
+    """
+    cache_dir = kwargs.get('cache_dir', None) or default_cache_dir()
+    cache_max_mb = kwargs.get('cache_max_mb', 500)
+    cache_max_age_days = kwargs.get('cache_max_age_days', 30)
+    keep_hashes = set(kwargs.get('keep', None) or [])
+    grace_s = kwargs.get('grace_s', 600)
+
+    index_dir = os.path.join(cache_dir, 'index')
+    objects_dir = os.path.join(cache_dir, 'objects')
+    if not os.path.isdir(index_dir):
+        return 0
+
+    entries = []
+    for name in os.listdir(index_dir):
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(index_dir, name)
+        entry = _read_entry(path)
+        if entry is not None:
+            entries.append((path, entry))
+
+    removed = 0
+    now = time.time()
+    min_accessed = now - cache_max_age_days * 86400
+    keep = []
+    for path, entry in entries:
+        if entry.get('accessed', 0) < min_accessed and entry.get('content_hash') not in keep_hashes:
+            _remove(path)
+            removed += 1
+        else:
+            keep.append((path, entry))
+
+    # Grösse über die eindeutigen Objekte berechnen, danach die ältesten Einträge verdrängen
+    def object_size(content_hash):
+        try:
+            return os.path.getsize(_object_path(cache_dir, content_hash))
+        except OSError:
+            return 0
+
+    keep.sort(key=lambda pe: pe[1].get('accessed', 0))
+    sizes = {e['content_hash']: object_size(e['content_hash']) for _, e in keep}
+    total = sum(sizes.values())
+    refcount = {}
+    for _, e in keep:
+        refcount[e['content_hash']] = refcount.get(e['content_hash'], 0) + 1
+    evictable = [pe for pe in keep if pe[1]['content_hash'] not in keep_hashes]
+    while evictable and total > cache_max_mb * 1024 * 1024:
+        path, entry = evictable.pop(0)
+        keep.remove((path, entry))
+        _remove(path)
+        removed += 1
+        refcount[entry['content_hash']] -= 1
+        if refcount[entry['content_hash']] == 0:
+            total -= sizes[entry['content_hash']]
+
+    referenced = {e['content_hash'] for _, e in keep} | keep_hashes
+    if os.path.isdir(objects_dir):
+        for sub in os.listdir(objects_dir):
+            sub_dir = os.path.join(objects_dir, sub)
+            if not os.path.isdir(sub_dir):
+                continue
+            for name in os.listdir(sub_dir):
+                if name.endswith('.gz') and name[:-3] not in referenced:
+                    object_path = os.path.join(sub_dir, name)
+                    try:
+                        if os.path.getmtime(object_path) < now - grace_s:
+                            os.remove(object_path)
+                    except OSError:
+                        pass
+    return removed
@@ -0,0 +1,292 @@
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from my_py_import_functions import lazy_import
+
+pd = lazy_import('pandas')
+
+
+# Teilaggregate, aus denen sich alle gröberen Aggregate ohne Rückgriff auf die Rohdaten ableiten lassen
+_PARTIALS = {'sum': 'sum', 'count': 'sum', 'min': 'min', 'max': 'max'}
+
+
+def _slice_bounds(date_from, date_to):
+    # '2023' -> 2023-01-01 bis 2023-12-31 23:59:59, wie bei data.loc['2023'] auf einem DatetimeIndex
+    start = pd.Period(str(date_from)).start_time if date_from is not None else None
+    end = pd.Period(str(date_to)).end_time if date_to is not None else None
+    return start, end
+
+
+def _partials_from(data, by, measures):
+    # Teilaggregate direkt aus den Rohdaten
+    named = {}
+    for m in measures:
+        for agg in _PARTIALS:
+            named[f'{agg}_{m}'] = (m, agg)
+    return data.groupby(by, observed=True, dropna=False, sort=False).agg(**named).reset_index()
+
+
+def _rollup_partials(partials, by, measures):
+    # Gröbere Teilaggregate aus feineren: Summen und Anzahlen addieren, Minima/Maxima erneut bilden
+    named = {}
+    for m in measures:
+        for agg, combine in _PARTIALS.items():
+            named[f'{agg}_{m}'] = (f'{agg}_{m}', combine)
+    if not by:
+        return partials.agg({col: func for col, (_, func) in named.items()}).to_frame().T
+    return partials.groupby(by, observed=True, dropna=False, sort=False).agg(**named).reset_index()
+
+
+def build_cube(data, dims, measures, **kwargs):
+    """
+    Diese Funktion berechnet einmal das feinste Aggregat eines Datensatzes über alle angegebenen Dimensionen.
+    Alle gröberen Aggregate (z.B. nach Jahr, nach RAUM oder nach KREISEZH und StichtagDatJahr) werden danach mit rollup()
+    aus diesem Aggregat bzw. aus einem bereits berechneten feineren Aggregat abgeleitet, ohne die Rohdaten erneut zu lesen.
+
+    Parameter (zwingend):
+    - data (DataFrame): Der Datensatz (data2betested), die Datumsspalte darf auch der Index sein.
+    - dims (list): Alle Dimensionen, nach denen später gruppiert werden soll, z.B. ['StichtagDatJahr', 'Jahr', 'RAUM_LANG', 'RAUM_CODE', 'KREISEZH_LANG', 'KREISEZH_CODE'].
+    - measures (list): Kennzahlen, z.B. ['WHG'].
+
+    Optionale Parameter:
+    - datum (str): Datumsspalte, über welche in rollup() Zeitabschnitte ausgewählt werden können. Default: 'StichtagDatJahr'
+    - cache_size (int): Maximale Anzahl zwischengespeicherter Aggregate, 0 speichert ausser dem feinsten Aggregat nichts. Default: 64
+
+    Rückgabe:
+    - cube (dict): Der Cube, wird an rollup() übergeben.
+    """
+    try:
+        datum = kwargs.get('datum', 'StichtagDatJahr')
+        cache_size = kwargs.get('cache_size', 64)
+
+        dims = list(dims)
+        measures = list(measures)
+        if datum not in data.columns and datum in (data.index.names or []):
+            data = data.reset_index()
+        if datum in data.columns and datum not in dims:
+            dims.append(datum)
+
+        base = _partials_from(data, dims, measures)
+        cube = {
+            'dims': dims,
+            'measures': measures,
+            'datum': datum,
+            'rows': int(len(data)),
+            'cache': OrderedDict([((frozenset(dims), None, None), base)]),
+            'cache_size': cache_size,
+        }
+        print(f"cube: {len(data):,.0f} Zeilen zu {len(base):,.0f} Zellen über {len(dims)} Dimensionen aggregiert")
+        return cube
+
+    except Exception as e:
+        print(f'Es ist ein Fehler aufgetreten: {str(e)}')
+        print("Error: %s" % e, file=sys.stderr)
+        print(file=sys.stderr)
+
+
+def build_cube_chunked(chunks, dims, measures, **kwargs):
+    """
+    Diese Funktion berechnet den gleichen Cube wie build_cube(), liest den Datensatz aber in Chunks, z.B. aus
+    load_data(..., chunksize=500000). Pro Chunk werden Summen, Anzahlen, Minima und Maxima nach den Dimensionen gebildet
+    und laufend mit dem bisherigen Resultat zusammengeführt. Der Speicherbedarf hängt also von der Anzahl Zellen
+    (Kombinationen der Dimensionen) ab, nicht von der Anzahl Zeilen. Aggregate daraus liefert wie gewohnt rollup().
+
+        chunks = mypy_dl.load_data('prod', 'ld', 'bev331od3310', '', datums_attr=['StichtagDatJahr'], chunksize=500000)
+        cube = mypy_cube.build_cube_chunked(chunks, ['StichtagDatJahr', 'RAUM_LANG', 'SEX_LANG'], ['AnzBestWir'], workers=4)
+        mypy_cube.rollup(cube, ['StichtagDatJahr', 'SEX_LANG'])
+
+    Parameter (zwingend):
+    - chunks (iterable): DataFrames mit den gleichen Spalten, z.B. die Rückgabe von load_data mit chunksize.
+    - dims (list): Alle Dimensionen, nach denen später gruppiert werden soll.
+    - measures (list): Kennzahlen, z.B. ['AnzBestWir'].
+
+    Optionale Parameter:
+    - datum (str): Datumsspalte, über welche in rollup() Zeitabschnitte ausgewählt werden können. Default: 'StichtagDatJahr'
+    - prepare (function): Wird vor der Aggregation auf jeden Chunk angewendet, z.B. um abgeleitete Spalten wie Jahr zu bilden. Default: None
+    - workers (int): Anzahl Threads, welche die Chunks parallel aggregieren. Das Einlesen der Chunks bleibt sequenziell. Default: 1
+    - merge_every (int): Nach so vielen Chunks werden die Teilresultate zusammengeführt. Default: 8
+    - cache_size (int): Maximale Anzahl zwischengespeicherter Aggregate, 0 speichert ausser dem feinsten Aggregat nichts. Default: 64
+
+    Rückgabe:
+    - cube (dict): Der Cube, wird an rollup() übergeben.
+    """
+    try:
+        datum = kwargs.get('datum', 'StichtagDatJahr')
+        prepare = kwargs.get('prepare', None)
+        workers = kwargs.get('workers', 1)
+        merge_every = kwargs.get('merge_every', 8)
+        cache_size = kwargs.get('cache_size', 64)
+
+        dims = list(dims)
+        measures = list(measures)
+        if datum not in dims:
+            dims.append(datum)
+        state = {'rows': 0, 'chunks': 0, 'datum': True}
+
+        def aggregate(chunk):
+            if prepare is not None:
+                chunk = prepare(chunk)
+            if datum not in chunk.columns and datum in (chunk.index.names or []):
+                chunk = chunk.reset_index()
+            if datum not in chunk.columns:
+                # Ohne Datumsspalte wie in build_cube: nur nach den übrigen Dimensionen
+                state['datum'] = False
+                return _partials_from(chunk, [d for d in dims if d != datum], measures), len(chunk)
+            return _partials_from(chunk, dims, measures), len(chunk)
+
+        running = None
+        pending = []
+
+        def fold(result):
+            nonlocal running, pending
+            partials, rows = result
+            state['rows'] += rows
+            state['chunks'] += 1
+            pending.append(partials)
+            if len(pending) >= merge_every:
+                running = _merge_partials([running] + pending, measures)
+                pending = []
+
+        if workers > 1:
+            # Höchstens 2 * workers Chunks gleichzeitig im Speicher
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = []
+                for chunk in chunks:
+                    futures.append(pool.submit(aggregate, chunk))
+                    if len(futures) >= 2 * workers:
+                        fold(futures.pop(0).result())
+                for future in futures:
+                    fold(future.result())
+        else:
+            for chunk in chunks:
+                fold(aggregate(chunk))
+
+        base = _merge_partials([running] + pending, measures)
+        if base is None:
+            raise ValueError("Keine Chunks erhalten")
+        if not state['datum']:
+            dims.remove(datum)
+        cube = {
+            'dims': dims,
+            'measures': measures,
+            'datum': datum,
+            'rows': int(state['rows']),
+            'cache': OrderedDict([((frozenset(dims), None, None), base)]),
+            'cache_size': cache_size,
+        }
+        print(f"cube: {state['rows']:,.0f} Zeilen in {state['chunks']} Chunks zu {len(base):,.0f} Zellen über {len(dims)} Dimensionen aggregiert")
+        return cube
+
+    except Exception as e:
+        print(f'Es ist ein Fehler aufgetreten: {str(e)}')
+        print("Error: %s" % e, file=sys.stderr)
+        print(file=sys.stderr)
+
+
+def _merge_partials(parts, measures):
+    # Teilaggregate mehrerer Chunks zu einem zusammenführen (gleiche Dimensionen in allen Teilen)
+    parts = [p for p in parts if p is not None]
+    if not parts:
+        return None
+    if len(parts) == 1:
+        return parts[0]
+    by = [c for c in parts[0].columns if not any(c == f'{agg}_{m}' for m in measures for agg in _PARTIALS)]
+    return _rollup_partials(pd.concat(parts, ignore_index=True), by, measures)
+
+
+def rollup(cube, by, **kwargs):
+    """
+    Diese Funktion liefert ein Aggregat aus dem Cube, entspricht also
+    data.loc[date_from:date_to].groupby(by).agg(sum_X=('X', 'sum')).
+    Das Resultat wird aus dem kleinsten bereits berechneten Aggregat abgeleitet, das alle gewünschten Dimensionen enthält,
+    und unter den Dimensionen und dem Zeitabschnitt zwischengespeichert.
+
+    Parameter (zwingend):
+    - cube (dict): Der Cube aus build_cube().
+    - by (list): Dimensionen, nach denen gruppiert werden soll, z.B. ['StichtagDatJahr', 'RAUM_LANG', 'RAUM_CODE'].
+
+    Optionale Parameter:
+    - aggs (list): Gewünschte Aggregate: 'sum', 'count', 'min', 'max', 'mean'. Default: ['sum']
+    - date_from (str): Beginn des Zeitabschnitts, z.B. data_min_date ('2009'). Default: None
+    - date_to (str): Ende des Zeitabschnitts (inklusive), z.B. data_max_date ('2023'). Default: None
+    - sort (bool): Nach den Dimensionen sortieren? Default: True
+
+    Rückgabe:
+    - agg (DataFrame): Aggregat mit den Dimensionen als Index und Spalten wie sum_WHG.
+
+    Fehler:
+    - ValueError: by enthält Dimensionen, die nicht im Cube sind, oder ein Zeitabschnitt ist angegeben, aber der Cube hat keine Datumsspalte.
+    """
+    date_from = kwargs.get('date_from', None)
+    date_to = kwargs.get('date_to', None)
+    by = list(by)
+    datum = cube['datum']
+    # Ungültige Argumente sind Fehler des Aufrufers und werden nicht wie Rechenfehler nur ausgegeben
+    missing = [d for d in by if d not in cube['dims']]
+    if missing:
+        raise ValueError(f"Dimensionen {missing} sind nicht im Cube enthalten")
+    if (date_from is not None or date_to is not None) and datum not in cube['dims']:
+        raise ValueError(f"date_from/date_to brauchen die Datumsspalte {datum!r}, sie ist nicht im Cube enthalten")
+
+    try:
+        aggs = kwargs.get('aggs', ['sum'])
+        sort = kwargs.get('sort', True)
+
+        measures = cube['measures']
+        cache = cube['cache']
+
+        start, end = _slice_bounds(date_from, date_to)
+        key = (frozenset(by), start, end)
+        if key in cache:
+            cache.move_to_end(key)
+            partials = cache[key]
+        else:
+            # Kleinstes passendes Aggregat suchen: gleicher Zeitabschnitt, oder ungefiltert und mit Datumsspalte
+            best = None
+            for (dims, s, e), candidate in cache.items():
+                if not set(by) <= dims:
+                    continue
+                if (s, e) == (start, end):
+                    needs_filter = False
+                elif s is None and e is None and datum in dims:
+                    needs_filter = True
+                else:
+                    continue
+                if best is None or len(candidate) < len(best[0]):
+                    best = (candidate, needs_filter)
+
+            source, needs_filter = best
+            if needs_filter:
+                mask = pd.Series(True, index=source.index)
+                if start is not None:
+                    mask &= source[datum] >= start
+                if end is not None:
+                    mask &= source[datum] <= end
+                source = source.loc[mask]
+            partials = _rollup_partials(source, by, measures)
+
+            if cube['cache_size'] > 0:
+                cache[key] = partials
+            while len(cache) > max(cube['cache_size'], 1):
+                # Das feinste Aggregat (erster Eintrag) wird nie verdrängt
+                oldest = next(k for k in cache if k != (frozenset(cube['dims']), None, None))
+                del cache[oldest]
+
+        result = pd.DataFrame(partials[by]) if by else pd.DataFrame(index=partials.index)
+        for m in measures:
+            for agg in aggs:
+                if agg == 'mean':
+                    result[f'mean_{m}'] = partials[f'sum_{m}'] / partials[f'count_{m}']
+                else:
+                    result[f'{agg}_{m}'] = partials[f'{agg}_{m}']
+        if by:
+            result = result.set_index(by)
+            if sort:
+                result = result.sort_index()
+        return result
+
+    except Exception as e:
+        print(f'Es ist ein Fehler aufgetreten: {str(e)}')
+        print("Error: %s" % e, file=sys.stderr)
+        print(file=sys.stderr)
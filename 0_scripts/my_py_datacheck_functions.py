@@ -0,0 +1,320 @@
+import sys
+
+from my_py_import_functions import lazy_import
+import my_py_dataloading_functions as mypy_dl
+import my_py_delta_functions as mypy_delta
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+# Reihenfolge in der Anomalie-Tabelle: Strukturfehler vor auffälligen Werten
+_PRUEFUNGEN = ['fehlender_stichtag', 'doppelter_stichtag', 'fehlende_perioden', 'fehlt_am_ende', 'sprung']
+
+
+def _as_mapping(cols):
+    # Spalten können als Liste (gleiche Namen links und rechts) oder als dict {links: rechts} angegeben werden
+    if isinstance(cols, dict):
+        return dict(cols)
+    if isinstance(cols, str):
+        return {cols: cols}
+    return {c: c for c in cols}
+
+
+def _value_dtype(series):
+    # Datentyp der Werte, bei Kategorien der Datentyp der Kategorien
+    return series.cat.categories.dtype if isinstance(series.dtype, pd.CategoricalDtype) else series.dtype
+
+
+def _prepare(data, keys, measures):
+    # Auf Schlüssel und Kennzahlen reduzieren, mehrfach vorkommende Schlüssel aufsummieren
+    data = data[keys + measures]
+    dup_keys = int(data.duplicated(subset=keys).sum())
+    if dup_keys:
+        data = data.groupby(keys, observed=True, sort=False, dropna=False)[measures].sum(min_count=1).reset_index()
+    return data, dup_keys
+
+
+def reconcile(left, right, keys, measures, **kwargs):
+    """
+    Diese Funktion gleicht zwei Cubes ab, typischerweise den SASA/CKAN-Datensatz (data_source='web') mit dem Output des LD-Harvesters (data_source='ld').
+    Die beiden Datensätze werden über die Dimensions-Codes und das Datum per Hash-Join verbunden. Danach werden fehlende und zusätzliche
+    Zeilen sowie die Abweichungen der Kennzahlen pro Zelle berechnet, alles vektorisiert und ohne Schleife über die Zeilen.
+    Kommt ein Schlüssel mehrfach vor, werden die Kennzahlen pro Schlüssel zuerst summiert.
+
+    Parameter (zwingend):
+    - left (DataFrame): Der erste Datensatz (z.B. SASA).
+    - right (DataFrame): Der zweite Datensatz (z.B. LD).
+    - keys (list oder dict): Schlüsselspalten. Bei unterschiedlichen Spaltennamen als dict {Spalte links: Spalte rechts},
+      z.B. {'StichtagDatJahr': 'ZEIT_LANG', 'QuarCd': 'RAUM_CODE'}.
+    - measures (list oder dict): Kennzahlen, die verglichen werden sollen. Bei unterschiedlichen Namen als dict, z.B. {'AnzWhgStat': 'WHG'}.
+
+    Optionale Parameter:
+    - atol (num): Absolute Toleranz für Abweichungen. Default: 0
+    - rtol (num): Relative Toleranz (bezogen auf den rechten Wert). Default: 0
+    - max_beispiele (int): Anzahl Beispielzeilen für fehlende, zusätzliche und abweichende Zeilen. Default: 10
+
+    Rückgabe:
+    - result (dict): Kompakte Zusammenfassung mit
+        - 'ok' (bool): Stimmen die beiden Datensätze innerhalb der Toleranzen überein?
+        - 'n_left', 'n_right', 'n_matched', 'n_missing' (nur links), 'n_extra' (nur rechts), 'dup_keys_left', 'dup_keys_right'
+        - 'measures' (DataFrame): pro Kennzahl Anzahl verglichener Zellen, Anzahl Abweichungen, maximale Abweichung und Summen links/rechts
+        - 'missing', 'extra' (DataFrame): Beispiele der Schlüssel, die nur links bzw. nur rechts vorkommen
+        - 'diffs' (DataFrame): Beispiele der grössten Abweichungen
+    """
+    try:
+        atol = kwargs.get('atol', 0)
+        rtol = kwargs.get('rtol', 0)
+        max_beispiele = kwargs.get('max_beispiele', 10)
+
+        key_map = _as_mapping(keys)
+        measure_map = _as_mapping(measures)
+        keys_l = list(key_map)
+        measures_l = list(measure_map)
+
+        # Rechte Seite auf die Namen der linken Seite umbenennen
+        right = right[list(key_map.values()) + list(measure_map.values())]
+        right = right.set_axis(keys_l + measures_l, axis=1)
+
+        left = left[keys_l + measures_l]
+        for col in keys_l:
+            left_dtype, right_dtype = _value_dtype(left[col]), _value_dtype(right[col])
+            if left_dtype != right_dtype:
+                # Unterschiedliche Datentypen (z.B. Datum links als Text '2023-12-31' oder 'Z31122023', rechts als datetime64)
+                # lassen sich nicht joinen: beide Seiten als einheitlichen Text vergleichen, wie beim Delta-Index
+                left = left.assign(**{col: mypy_delta._key_text(left[col])})
+                right = right.assign(**{col: mypy_delta._key_text(right[col])})
+            elif isinstance(left[col].dtype, pd.CategoricalDtype) or isinstance(right[col].dtype, pd.CategoricalDtype):
+                # Kategorien mit unterschiedlichen Ausprägungen würden den Join verlangsamen, daher auf die Werte zurückführen
+                left = left.assign(**{col: np.asarray(left[col])})
+                right = right.assign(**{col: np.asarray(right[col])})
+
+        left, dup_left = _prepare(left, keys_l, measures_l)
+        right, dup_right = _prepare(right, keys_l, measures_l)
+
+        merged = left.merge(right, on=keys_l, how='outer', suffixes=('_left', '_right'), indicator=True, sort=False)
+        side = merged['_merge'].to_numpy()
+        in_both = side == 'both'
+        only_left = side == 'left_only'
+        only_right = side == 'right_only'
+
+        rows = []
+        diff_mask = np.zeros(len(merged), dtype=bool)
+        abs_diffs = np.zeros(len(merged), dtype='float64')
+        for m in measures_l:
+            lv = merged[m + '_left'].to_numpy(dtype='float64', na_value=np.nan)
+            rv = merged[m + '_right'].to_numpy(dtype='float64', na_value=np.nan)
+            both_nan = np.isnan(lv) & np.isnan(rv)
+            delta = np.abs(lv - rv)
+            within = (delta <= atol + rtol * np.abs(rv)) | both_nan
+            cell_diff = in_both & ~within
+            diff_mask |= cell_diff
+            abs_diffs = np.fmax(abs_diffs, np.where(cell_diff, np.where(np.isnan(delta), np.inf, delta), 0))
+            rows.append({
+                'measure': m,
+                'n_compared': int(in_both.sum()),
+                'n_diff': int(cell_diff.sum()),
+                'max_abs_diff': float(np.nanmax(delta[in_both])) if in_both.any() and not np.isnan(delta[in_both]).all() else 0.0,
+                'sum_left': float(np.nansum(lv[in_both | only_left])),
+                'sum_right': float(np.nansum(rv[in_both | only_right])),
+            })
+        measure_summary = pd.DataFrame(rows, columns=['measure', 'n_compared', 'n_diff', 'max_abs_diff', 'sum_left', 'sum_right'])
+        measure_summary['sum_diff'] = measure_summary['sum_left'] - measure_summary['sum_right']
+
+        value_cols = [m + s for m in measures_l for s in ('_left', '_right')]
+        top = np.argsort(-abs_diffs[diff_mask], kind='stable')[:max_beispiele]
+        diffs = merged.loc[diff_mask, keys_l + value_cols].iloc[top].reset_index(drop=True)
+
+        result = {
+            'ok': bool(not only_left.any() and not only_right.any() and not diff_mask.any()),
+            'n_left': int(len(left)),
+            'n_right': int(len(right)),
+            'n_matched': int(in_both.sum()),
+            'n_missing': int(only_left.sum()),
+            'n_extra': int(only_right.sum()),
+            'dup_keys_left': dup_left,
+            'dup_keys_right': dup_right,
+            'measures': measure_summary,
+            'missing': merged.loc[only_left, keys_l].head(max_beispiele).reset_index(drop=True),
+            'extra': merged.loc[only_right, keys_l].head(max_beispiele).reset_index(drop=True),
+            'diffs': diffs,
+        }
+        print(f"reconcile: {result['n_matched']:,.0f} gemeinsame Zeilen, {result['n_missing']:,.0f} fehlen rechts, "
+              f"{result['n_extra']:,.0f} zusätzlich rechts, {int(diff_mask.sum()):,.0f} Zeilen mit Abweichungen")
+        return result
+
+    except Exception as e:
+        print(f'Es ist ein Fehler aufgetreten: {str(e)}')
+        print("Error: %s" % e, file=sys.stderr)
+        print(file=sys.stderr)
+
+
+# Periodizitäten und ihre Länge in Monaten
+_FREQ_MONATE = {'Y': 12, 'H': 6, 'Q': 3, 'M': 1}
+
+
+def _period_ordinals(zeit, freq):
+    # Stichtage als fortlaufende Periodennummern, damit Lücken als Differenz > 1 erkannt werden. freq ist 'D', ein Kürzel aus
+    # _FREQ_MONATE oder eine Anzahl Monate. Die Ganzzahldivision ist für Stichtage im Abstand von Vielfachen der Periode exakt.
+    if freq == 'D':
+        return zeit.to_numpy(dtype='datetime64[D]').astype('int64')
+    months = zeit.year.to_numpy(dtype='int64') * 12 + zeit.month.to_numpy(dtype='int64') - 1
+    return months // _FREQ_MONATE.get(freq, freq)
+
+
+def _infer_freq(zeit, series):
+    # Periode = grösster gemeinsamer Teiler der Abstände (in Monaten) aufeinanderfolgender Stichtage innerhalb der Serien:
+    # 12 -> 'Y', 6 -> 'H', 3 -> 'Q', 1 -> 'M', sonst die Anzahl Monate. Zwei verschiedene Stichtage im gleichen Monat -> 'D'.
+    months = zeit.year.to_numpy(dtype='int64') * 12 + zeit.month.to_numpy(dtype='int64') - 1
+    days = zeit.to_numpy(dtype='datetime64[D]').astype('int64')
+    order = np.lexsort((days, series))
+    same = series[order][1:] == series[order][:-1]
+    month_step = np.diff(months[order])[same]
+    if ((month_step == 0) & (np.diff(days[order])[same] != 0)).any():
+        return 'D'
+    month_step = month_step[month_step > 0]
+    if not len(month_step):
+        return 'Y'
+    step = int(np.gcd.reduce(month_step))
+    return {v: k for k, v in _FREQ_MONATE.items()}.get(step, step)
+
+
+def _group_median(values, groups, n_groups):
+    # Median pro Gruppe ohne Schleife über die Gruppen: nach (Gruppe, Wert) sortieren und die mittleren Positionen lesen. NaN zählt nicht.
+    valid = ~np.isnan(values)
+    v, g = values[valid], groups[valid]
+    order = np.lexsort((v, g))
+    v = v[order]
+    counts = np.bincount(g, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    median = np.full(n_groups, np.nan)
+    has = counts > 0
+    median[has] = (v[(starts + (counts - 1) // 2)[has]] + v[(starts + counts // 2)[has]]) / 2
+    return median, counts
+
+
+def check_timeseries(data, keys, measures, **kwargs):
+    """
+    Diese Funktion prüft die Zeitreihen eines Cubes auf Plausibilität, z.B. pro Quartier oder Kreis: doppelte Stichtage, fehlende Perioden
+    (auch am Ende einer Serie, verglichen mit dem letzten Stichtag des Cubes) und unplausible Sprünge von einer Periode zur nächsten.
+    Die Daten werden einmal nach Serie und Stichtag sortiert, danach werden Differenzen, prozentuale Veränderungen und robuste z-Werte
+    (Abstand der Differenz vom Median der Serie in MAD-Einheiten) für alle Serien gleichzeitig als NumPy-Operationen berechnet.
+
+    Parameter (zwingend):
+    - data (DataFrame): Der Cube (data2betested).
+    - keys (list): Spalten, die eine Serie bilden, z.B. ['RAUM_CODE'] oder ['KREISEZH_CODE', 'SEX_CODE'].
+    - measures (list): Kennzahlen, z.B. ['BEW'].
+
+    Optionale Parameter:
+    - zeit (str): Datumsspalte der Stichtage (Datum oder Text wie '2023-12-31'). Default: 'StichtagDatJahr'
+    - freq (str): Periodizität 'Y', 'H' (Halbjahr), 'Q', 'M', 'D' oder eine Anzahl Monate (int). Default: None (aus den Abständen der
+      Stichtage innerhalb der Serien abgeleitet)
+    - z_max (num): Ab diesem robusten z-Wert gilt eine Veränderung als Sprung. Default: 3.5
+    - pct_max (num): Zusätzlich gilt als Sprung, was sich um mehr als diesen Anteil verändert (z.B. 0.5 = 50%). Default: None
+    - min_periods (int): Minimale Anzahl Veränderungen einer Serie, damit robuste z-Werte berechnet werden. Default: 5
+    - max_zeilen (int): Nur die ersten max_zeilen Anomalien zurückgeben. Default: None (alle)
+
+    Rückgabe:
+    - anomalies (DataFrame): Eine Zeile pro Anomalie, Strukturfehler zuerst, danach nach Schwere sortiert, mit den Schlüsseln,
+      pruefung ('fehlender_stichtag', 'doppelter_stichtag', 'fehlende_perioden', 'fehlt_am_ende', 'sprung'), zeit, zeit_vorher, measure, wert, wert_vorher,
+      diff, pct_change, robust_z, n_fehlend und score.
+    """
+    try:
+        zeit = kwargs.get('zeit', 'StichtagDatJahr')
+        freq = kwargs.get('freq', None)
+        z_max = kwargs.get('z_max', 3.5)
+        pct_max = kwargs.get('pct_max', None)
+        min_periods = kwargs.get('min_periods', 5)
+        max_zeilen = kwargs.get('max_zeilen', None)
+
+        keys = [keys] if isinstance(keys, str) else list(keys)
+        measures = [measures] if isinstance(measures, str) else list(measures)
+        if zeit not in data.columns and zeit in (data.index.names or []):
+            data = data.reset_index()
+
+        stichtage = pd.DatetimeIndex(mypy_dl.parse_zeit(data[zeit]))
+        # Zeilen ohne Stichtag werden gemeldet und nicht in die Serien einsortiert, sonst ergäbe NaT eine beliebige Periodennummer
+        no_zeit = np.asarray(stichtage.isna())
+        parts = []
+        if no_zeit.any():
+            frame = data.loc[no_zeit, keys].reset_index(drop=True)
+            frame.insert(len(keys), 'pruefung', 'fehlender_stichtag')
+            frame['score'] = np.inf
+            parts.append(frame)
+            data, stichtage = data.loc[~no_zeit], stichtage[~no_zeit]
+        series = data.groupby(keys, observed=True, sort=False, dropna=False).ngroup().to_numpy()
+        freq = freq or _infer_freq(stichtage, series)
+        n_series = int(series.max()) + 1 if len(series) else 0
+        t = _period_ordinals(stichtage, freq)
+
+        # Einmal sortieren, alles Weitere sind Vergleiche benachbarter Zeilen
+        order = np.lexsort((t, series))
+        g, t = series[order], t[order]
+        same = g[1:] == g[:-1]
+        step = t[1:] - t[:-1]
+        prev_pos, pos = order[:-1], order[1:]
+
+        def collect(pruefung, mask, at, before=None, **cols):
+            if not mask.any():
+                return
+            frame = data.iloc[at[mask]][keys].reset_index(drop=True)
+            frame.insert(len(keys), 'pruefung', pruefung)
+            frame['zeit'] = stichtage[at[mask]]
+            frame['zeit_vorher'] = stichtage[before[mask]] if before is not None else pd.NaT
+            for name, values in cols.items():
+                frame[name] = values[mask] if isinstance(values, np.ndarray) else values
+            parts.append(frame)
+
+        collect('doppelter_stichtag', same & (step == 0), pos, prev_pos, score=np.inf)
+        gap = same & (step > 1)
+        collect('fehlende_perioden', gap, pos, prev_pos, n_fehlend=step - 1, score=(step - 1).astype('float64'))
+        # Letzte Zeile jeder Serie mit dem letzten Stichtag des Cubes vergleichen
+        if len(t):
+            last = np.r_[~same, True]
+            behind = t.max() - t
+            collect('fehlt_am_ende', last & (behind > 0), order, None, n_fehlend=behind, score=behind.astype('float64'))
+
+        valid = same & (step > 0)
+        for m in measures:
+            v = pd.to_numeric(data[m], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)[order]
+            diff = np.where(valid, v[1:] - v[:-1], np.nan)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                pct = diff / np.abs(v[:-1])
+            pct[diff == 0] = 0.0
+
+            # Robuster z-Wert pro Serie: Median und MAD der Differenzen; ist die MAD 0, die mittlere absolute Abweichung
+            median, counts = _group_median(diff, g[1:], n_series)
+            deviation = np.abs(diff - median[g[1:]])
+            mad, _ = _group_median(deviation, g[1:], n_series)
+            mean_ad = np.bincount(g[1:][~np.isnan(deviation)], weights=deviation[~np.isnan(deviation)], minlength=n_series)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mean_ad = mean_ad / counts
+                scale = np.where(mad > 0, mad / 0.6745, mean_ad * 1.2533)[g[1:]]
+                z = np.where(scale > 0, (diff - median[g[1:]]) / scale, 0.0)
+            z[np.isnan(diff) | (counts[g[1:]] < min_periods)] = np.nan
+
+            jump = np.abs(z) >= z_max
+            if pct_max is not None:
+                jump |= np.abs(pct) > pct_max
+            jump &= valid
+            collect('sprung', jump, pos, prev_pos, measure=m, wert=v[1:], wert_vorher=v[:-1], diff=diff, pct_change=pct,
+                    robust_z=z, score=np.nan_to_num(np.abs(z), nan=0.0, posinf=np.inf))
+
+        columns = keys + ['pruefung', 'zeit', 'zeit_vorher', 'measure', 'wert', 'wert_vorher', 'diff', 'pct_change', 'robust_z', 'n_fehlend', 'score']
+        parts = [p.dropna(axis=1, how='all') for p in parts]
+        anomalies = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+        anomalies = anomalies.reindex(columns=columns)
+        anomalies['n_fehlend'] = anomalies['n_fehlend'].astype('Int64')
+        anomalies['_rang'] = anomalies['pruefung'].map({p: i for i, p in enumerate(_PRUEFUNGEN)})
+        anomalies = anomalies.sort_values(['_rang', 'score'], ascending=[True, False], kind='stable').drop(columns=['_rang'])
+        anomalies = anomalies.reset_index(drop=True)
+
+        counts = anomalies['pruefung'].value_counts()
+        print(f"zeitreihen: {n_series:,.0f} Serien ({freq}), " + ", ".join(f"{counts.get(p, 0):,.0f} {p}" for p in _PRUEFUNGEN))
+        if max_zeilen is not None:
+            anomalies = anomalies.head(max_zeilen)
+        return anomalies
+
+    except Exception as e:
+        print(f'Es ist ein Fehler aufgetreten: {str(e)}')
+        print("Error: %s" % e, file=sys.stderr)
+        print(file=sys.stderr)
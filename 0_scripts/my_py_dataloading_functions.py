@@ -1,12 +1,147 @@
 
-from IPython.display import Markdown as md
-import pandas as pd
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import hashlib
 import io
+import os
 import sys
+import tempfile
+import threading
 import warnings
 
+from my_py_import_functions import lazy_import
+import my_py_cache_functions as mypy_cache
+import my_py_download_functions as mypy_download
+import my_py_trace_functions as mypy_trace
 
+# Schwere Module werden erst beim ersten Gebrauch geladen
+np = lazy_import('numpy')
+pa = lazy_import('pyarrow')
+pacsv = lazy_import('pyarrow.csv')
+pd = lazy_import('pandas')
+requests = lazy_import('requests')
+tseries = lazy_import('pandas.tseries.api')
+
+
+def _display_md(text):
+    # Im Notebook als Markdown anzeigen, in Skripten und Batch-Jobs (ohne IPython) als Text ausgeben.
+    # Läuft ein Notebook, ist IPython bereits geladen, sonst muss es dafür auch nicht importiert werden.
+    if 'IPython' in sys.modules:
+        from IPython import get_ipython
+        if get_ipython() is not None:
+            from IPython.display import Markdown as md, display
+            display(md(text))
+            return
+    print(text.strip())
+
+
+def _parse_dates(df, datums_attr):
+    # Wie parse_dates in read_csv, aber als eigener (messbarer) Schritt: nicht umwandelbare Spalten bleiben unverändert
+    missing = [d for d in datums_attr if d not in df.columns]
+    if missing:
+        raise ValueError(f"Missing column provided to 'parse_dates': {', '.join(missing)}")
+    for d in datums_attr:
+        try:
+            df[d] = parse_zeit(df[d])
+        except (ValueError, TypeError):
+            pass
+    return df
+
+
+def _download_name(url):
+    # Fester Filename pro URL, damit ein abgebrochener Download im download_dir beim nächsten Aufruf fortgesetzt wird
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()[:16] + '.csv'
+
+
+def _trace_shape(p, data):
+    # Zeilen und Spalten für das Tracing, bei chunksize ist data ein Iterator ohne Form
+    if isinstance(data, pd.DataFrame):
+        p.set(rows=len(data), columns=data.shape[1])
+
+
+def _read_csv_arrow(fp, separator, encoding, na_values, datums_attr, arrow_columns, chunksize):
+    # Multithreaded CSV-Parser von pyarrow auf einem Memory-Mapping des Files. na_values und Datumsspalten wandelt pyarrow selbst um,
+    # Textspalten werden als Kategorien (Dictionary) oder als Arrow-Strings übernommen statt als Python-Objekte.
+    c_encoding = encoding
+    if encoding.lower().replace('-', '').replace('_', '') in ('utf8', 'utf8sig'):
+        # pyarrow überspringt das BOM selbst, eine Umkodierung über Python ist nur für andere Encodings nötig
+        encoding = 'utf8'
+    if arrow_columns not in ('category', 'pyarrow'):
+        raise ValueError(f"arrow_columns muss 'category' oder 'pyarrow' sein, nicht {arrow_columns!r}")
+    read_options = pacsv.ReadOptions(encoding=encoding, use_threads=True)
+    parse_options = pacsv.ParseOptions(delimiter=separator)
+
+    # pyarrow erkennt Texte wie '2023-12-31' oder '12:00' auch ausserhalb von datums_attr als Datum bzw. Zeit, der C-Parser lässt sie als Text.
+    # Die erkannten Typen stehen im Schema des ersten Blocks, diese Spalten werden danach ausdrücklich als Text gelesen.
+    with pa.memory_map(fp, 'r') as source:
+        schema = pacsv.open_csv(source, read_options=read_options, parse_options=parse_options,
+                                convert_options=pacsv.ConvertOptions(null_values=list(na_values), strings_can_be_null=True)).schema
+    text = pa.dictionary(pa.int32(), pa.string()) if arrow_columns == 'category' else pa.string()
+    text_columns = {f.name: text for f in schema
+                    if f.name not in datums_attr and pa.types.is_temporal(f.type)}
+
+    def convert_options(with_dates):
+        return pacsv.ConvertOptions(
+            null_values=list(na_values), strings_can_be_null=True,
+            column_types={**text_columns, **({d: pa.timestamp('us') for d in datums_attr} if with_dates else {})},
+            timestamp_parsers=[pacsv.ISO8601, '%Y-%m-%d', '%d.%m.%Y'],
+            auto_dict_encode=arrow_columns == 'category', auto_dict_max_cardinality=2 ** 31 - 1)
+
+    def to_pandas(table):
+        if arrow_columns == 'pyarrow':
+            # Datumsspalten bleiben datetime64, damit parse_zeit und .dt wie gewohnt funktionieren
+            return table.to_pandas(types_mapper=lambda t: None if pa.types.is_timestamp(t) else pd.ArrowDtype(t))
+        return table.to_pandas()
+
+    def fallback(done):
+        # Rest des Files ab der Zeile done mit dem C-Parser, die Datumsspalten wandelt danach _parse_dates in load_data um
+        return pd.read_csv(fp, sep=separator, encoding=c_encoding, na_values=na_values, low_memory=False,
+                           skiprows=range(1, done + 1), chunksize=chunksize)
+
+    if chunksize:
+        return _iter_arrow_chunks(fp, read_options, parse_options, convert_options(True), to_pandas, chunksize, fallback)
+
+    def read(with_dates):
+        with pa.memory_map(fp, 'r') as source:
+            return to_pandas(pacsv.read_csv(source, read_options=read_options, parse_options=parse_options,
+                                            convert_options=convert_options(with_dates)))
+
+    try:
+        return read(True)
+    except pa.ArrowInvalid:
+        if not datums_attr:
+            raise
+        # Nicht umwandelbare Datumsspalten: ohne feste Typen lesen, die Umwandlung übernimmt wie beim C-Parser _parse_dates
+        return read(False)
+
+
+def _iter_arrow_chunks(fp, read_options, parse_options, convert_options, to_pandas, chunksize, fallback):
+    # Blöcke des Streaming-Readers zu DataFrames mit je chunksize Zeilen zusammenfassen. Der Reader legt die Spaltentypen nach dem
+    # ersten Block fest, passt ein späterer Wert nicht dazu (z.B. ein Text in einer Zahlen- oder Datumsspalte), wird der Rest des Files
+    # ab der ersten noch nicht gelieferten Zeile mit fallback (C-Parser) gelesen.
+    done = 0
+    try:
+        with pa.memory_map(fp, 'r') as source:
+            reader = pacsv.open_csv(source, read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+            pending, rows = [], 0
+            for batch in reader:
+                pending.append(batch)
+                rows += batch.num_rows
+                while rows >= chunksize:
+                    table = pa.Table.from_batches(pending).combine_chunks()
+                    yield to_pandas(table.slice(0, chunksize))
+                    done += chunksize
+                    rest = table.slice(chunksize)
+                    pending, rows = rest.to_batches(), rest.num_rows
+            if rows:
+                yield to_pandas(pa.Table.from_batches(pending, schema=reader.schema))
+        return
+    except pa.ArrowInvalid as e:
+        print(f"read_csv: pyarrow kann einen Wert nicht umwandeln ({e}), lese ab Zeile {done + 1:,} mit dem C-Parser weiter")
+    yield from fallback(done)
+
+
+@mypy_trace.traced()
 def load_data(status, data_source, package_name, dataset_name, **kwargs):
     """
     Diese Funktion importiert die gewünschten Daten je nach Status (Int/Prod) und Speicherort (Dropzone/Web) in Pandas ein.
@@ -31,6 +166,25 @@ def load_data(status, data_source, package_name, dataset_name, **kwargs):
     - encoding (str): Welches Encoding enthalten die Import-Daten. Default: 'encoding', 'utf-8'
     - separator (str): Welche Trennzeichen sind im Import-Datensatz vorhanden. Default: 'separator', ','
     - na_values (liste): Welche Zeichen sollen NaN interpretiert werden?
+    - cache (bool): Sollen Web-/LD-Downloads im lokalen Cache abgelegt und per ETag/Last-Modified revalidiert werden? Default: False
+    - cache_dir (str): Verzeichnis des Caches. Default: LOSD_CACHE_DIR bzw. ~/.cache/losd_colab
+    - cache_max_mb (num): Maximale Grösse des Caches in MB. Default: 500
+    - cache_max_age_days (num): Einträge, die so viele Tage nicht verwendet wurden, werden gelöscht. Default: 30
+    - session (requests.Session): Session für Web-/LD-Downloads, z.B. aus make_session(). Default: None (einfaches requests.get)
+    - timeout (num): Timeout für Web-/LD-Downloads in Sekunden. Default: None (ohne stream/chunksize/cache: 60)
+    - download_parts (int): Anzahl paralleler Teil-Downloads, falls der Server unkomprimiert mit Range-Requests ausliefert. Default: 4
+    - download_dir (str): Verzeichnis für das temporäre Download-File. Wird ein Download abgebrochen (z.B. Kernel unterbrochen),
+      setzt der nächste Aufruf mit dem gleichen download_dir dort fort. Default: None (temporäres Verzeichnis)
+    - stream (bool): Soll der Web-/LD-Download direkt in den CSV-Parser gestreamt werden, ohne die Antwort vorher ganz im Speicher zu halten? Default: False
+    - chunksize (int): Falls gesetzt, wird statt eines DataFrames ein Iterator über DataFrames mit je chunksize Zeilen zurückgegeben. Default: None
+    - losd_dtypes (bool): Sollen die Datentypen nach der LOSD-Namenskonvention optimiert werden (siehe optimize_losd_dtypes)? Default: False
+    - engine (str): CSV-Parser für Dropzone-/Fileverzeichnis-Daten: 'c' (pandas) oder 'pyarrow' (multithreaded, liest das File per
+      Memory-Mapping und wandelt na_values und datums_attr direkt um). Default: 'c'
+    - arrow_columns (str): Mit engine='pyarrow': Textspalten als 'category' (pd.Categorical) oder als 'pyarrow' (pd.ArrowDtype,
+      dann auch Zahlen als Arrow-Typen mit fehlenden Werten statt float). Default: 'category'
+
+    Hinweis: Ist 'ZEIT_CODE' in datums_attr enthalten, wird der LOSD-Zeitcode (z.B. 'Z31122023') mit dem festen Format 'Z%d%m%Y' in ein Datum umgewandelt.
+    Hinweis: Mit mypy_trace.enable() werden Download, Dekodierung, read_csv und Datumsumwandlung einzeln gemessen (siehe mypy_trace.print_trace()).
 
     Rückgabe:
     - chart (alt.Chart): Das erstellte interaktive Diagramm.
@@ -55,6 +209,27 @@ def load_data(status, data_source, package_name, dataset_name, **kwargs):
         separator = kwargs.get('separator', ',')
         na_values = kwargs.get('na_values', ['','.','...','NA','NULL'])
 
+        cache = kwargs.get('cache', False)
+        cache_dir = kwargs.get('cache_dir', None)
+        cache_max_mb = kwargs.get('cache_max_mb', 500)
+        cache_max_age_days = kwargs.get('cache_max_age_days', 30)
+
+        session = kwargs.get('session', None)
+        timeout = kwargs.get('timeout', None)
+
+        download_parts = kwargs.get('download_parts', 4)
+        download_dir = kwargs.get('download_dir', None)
+
+        stream = kwargs.get('stream', False)
+        chunksize = kwargs.get('chunksize', None)
+        losd_dtypes = kwargs.get('losd_dtypes', False)
+        engine = kwargs.get('engine', 'c')
+        arrow_columns = kwargs.get('arrow_columns', 'category')
+
+        # ZEIT_CODE kann pandas nicht selbst als Datum erkennen, es wird nach dem Einlesen mit festem Format umgewandelt
+        zeit_code_attr = [d for d in datums_attr if d == 'ZEIT_CODE']
+        datums_attr = [d for d in datums_attr if d != 'ZEIT_CODE']
+
     
         #create filepath
         # Filepath
@@ -65,20 +240,20 @@ def load_data(status, data_source, package_name, dataset_name, **kwargs):
             elif data_source == "ld":
                 fp = ld_prod_url+package_name.upper()+'/observation?format=csv'
                 print("fp lautet:"+fp)
-                display(md(" **Überprüfe die Metadaten:**"))
-                display(md(" **Dataset auf PROD-Datakatalog:** Link {} ".format(ckan_prod_url+package_name.lower())))
-                display(md(" **View auf PROD-LD:** Link {} ".format(ld_prod_url+package_name.upper())))
-                display(md(" **Dataset auf INTEG-Datakatalog:** Link {} ".format(ckan_integ_url+package_name.lower())))
-                display(md(" **View auf INTEG-LD:** Link {} ".format(ld_integ_url+package_name.upper())))
+                _display_md(" **Überprüfe die Metadaten:**")
+                _display_md(" **Dataset auf PROD-Datakatalog:** Link {} ".format(ckan_prod_url+package_name.lower()))
+                _display_md(" **View auf PROD-LD:** Link {} ".format(ld_prod_url+package_name.upper()))
+                _display_md(" **Dataset auf INTEG-Datakatalog:** Link {} ".format(ckan_integ_url+package_name.lower()))
+                _display_md(" **View auf INTEG-LD:** Link {} ".format(ld_integ_url+package_name.upper()))
 
             else:
                 fp = ckan_prod_url+package_name.lower()+'/download/'+dataset_name+file_format
                 # Nur bei SASA-Jobs sind die Filenamen immer gross. Sonst kann alles vorkommen. Daher dataset_name.upper() hier nicht angebracht.
                 # fp = ckan_prod_url+package_name.lower()+'/download/'+dataset_name.upper()+file_format
                 print("fp lautet:"+fp)
-                display(md(" **Überprüfe die Metadaten:**"))
-                display(md(" **Dataset auf PROD-Datakatalog:** Link {} ".format(ckan_prod_url+package_name.lower())))
-                display(md(" **Dataset auf INTEG-Datakatalog:** Link {} ".format(ckan_integ_url+package_name.lower())))
+                _display_md(" **Überprüfe die Metadaten:**")
+                _display_md(" **Dataset auf PROD-Datakatalog:** Link {} ".format(ckan_prod_url+package_name.lower()))
+                _display_md(" **Dataset auf INTEG-Datakatalog:** Link {} ".format(ckan_integ_url+package_name.lower()))
 
         else:
             if data_source == "dropzone":
@@ -88,39 +263,117 @@ def load_data(status, data_source, package_name, dataset_name, **kwargs):
             elif data_source == "ld":
                 fp = ld_integ_url+package_name.upper()+'/observation?format=csv'
                 print("fp lautet:"+fp)
-                display(md(" **Überprüfe die Metadaten:**"))
-                display(md(" **Dataset auf INTEG-Datakatalog:** Link {} ".format(ckan_integ_url+package_name.lower())))
-                display(md(" **View auf INTEG-LD:** Link {} ".format(ld_integ_url+package_name.upper())))
+                _display_md(" **Überprüfe die Metadaten:**")
+                _display_md(" **Dataset auf INTEG-Datakatalog:** Link {} ".format(ckan_integ_url+package_name.lower()))
+                _display_md(" **View auf INTEG-LD:** Link {} ".format(ld_integ_url+package_name.upper()))
 
             else:
                 fp = ckan_integ_url+ckan_integ_harvester_name.lower()+package_name+'/download/'+dataset_name+file_format
                 print("fp lautet:"+fp)
-                display(md(" **Überprüfe die Metadaten:**"))
-                display(md(" **Dataset auf INTEG-Datakatalog:** Link {} ".format(ckan_integ_url+ckan_integ_harvester_name.lower()+package_name.lower())))                
-                display(md(" **Dataset auf PROD-Datakatalog:** Link {} ".format(ckan_prod_url+package_name.lower())))
+                _display_md(" **Überprüfe die Metadaten:**")
+                _display_md(" **Dataset auf INTEG-Datakatalog:** Link {} ".format(ckan_integ_url+ckan_integ_harvester_name.lower()+package_name.lower()))
+                _display_md(" **Dataset auf PROD-Datakatalog:** Link {} ".format(ckan_prod_url+package_name.lower()))
 
 
         #import dataset
-        if data_source == "dropzone":
-            data2betested = pd.read_csv(
+        if data_source == "dropzone" and engine == 'pyarrow':
+            with mypy_trace.phase('read_csv', engine=engine) as p:
+                data2betested = _read_csv_arrow(fp, separator, encoding, na_values, datums_attr, arrow_columns, chunksize)
+                _trace_shape(p, data2betested)
+            print("data_source: dropzone (pyarrow)")
+        elif data_source == "dropzone":
+            with mypy_trace.phase('read_csv') as p:
+                data2betested = pd.read_csv(
+                    fp
+                    , sep=separator
+                    , na_values = na_values
+                    , low_memory=False
+                    , chunksize=chunksize
+                )
+                _trace_shape(p, data2betested)
+            print("data_source: dropzone")
+        elif cache:
+            # Bei unveränderten Daten kostet das nur einen 304 statt des ganzen Downloads
+            object_path = mypy_cache.cached_download(
                 fp
-                , sep=separator
-                , na_values = na_values
-                , parse_dates= datums_attr
-                , low_memory=False
+                , cache_dir=cache_dir
+                , cache_max_mb=cache_max_mb
+                , cache_max_age_days=cache_max_age_days
+                , session=session
+                , timeout=timeout
             )
-            print("data_source: dropzone")
+            with mypy_trace.phase('read_csv') as p:
+                data2betested = pd.read_csv(
+                    object_path
+                    , compression='gzip'
+                    , encoding=encoding
+                    , sep=separator
+                    , na_values = na_values
+                    , low_memory=False
+                    , chunksize=chunksize)
+                _trace_shape(p, data2betested)
+            print("data_source: web (cache)")
+        elif stream or chunksize:
+            # Die Bytes werden inkrementell dekodiert (utf-8-sig entfernt das BOM) und direkt vom Parser gelesen.
+            # Mit chunksize wird nie mehr als ein Chunk gleichzeitig im Speicher gehalten.
+            getter = session if session is not None else requests
+            r = getter.get(fp, verify=False, timeout=timeout, stream=True)
+            mypy_trace.record('http_headers', r.elapsed.total_seconds(), status=r.status_code)
+            r.raise_for_status()
+            r.raw.decode_content = True
+            r.raw.auto_close = False
+            text_stream = io.TextIOWrapper(r.raw, encoding=encoding, newline='')
+            # Download, Dekodierung und Parser laufen hier ineinander und werden zusammen gemessen
+            with mypy_trace.phase('download_read_csv') as p:
+                data2betested = pd.read_csv(
+                    text_stream
+                    , sep=separator
+                    , na_values = na_values
+                    , low_memory=False
+                    , chunksize=chunksize)
+                _trace_shape(p, data2betested)
+                p.set(bytes=r.raw.tell())
+            print("data_source: web (stream)")
         else:
-            r = requests.get(fp, verify=False)  
-            r.encoding = encoding
-            data2betested = pd.read_csv(
-                io.StringIO(r.text)
-                , sep=separator
-                , na_values = na_values                
-                , parse_dates= datums_attr
-                , low_memory=False)
+            # Download in ein temporäres File: komprimierte Übertragung, Fortsetzen nach Abbrüchen und parallele Teile (siehe download_file)
+            if download_dir:
+                os.makedirs(download_dir, exist_ok=True)
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = mypy_download.download_file(
+                    fp
+                    , os.path.join(download_dir or tmp_dir, _download_name(fp))
+                    , session=session
+                    , timeout=timeout or 60
+                    , parts=download_parts)
+                with mypy_trace.phase('read_csv') as p:
+                    data2betested = pd.read_csv(
+                        path
+                        , encoding=encoding
+                        , sep=separator
+                        , na_values = na_values
+                        , low_memory=False)
+                    _trace_shape(p, data2betested)
+                if download_dir:
+                    os.remove(path)
             print("data_source: web")
-               
+
+        if datums_attr or zeit_code_attr or losd_dtypes:
+            def postprocess(df):
+                if datums_attr:
+                    with mypy_trace.phase('parse_dates', columns=len(datums_attr)):
+                        df = _parse_dates(df, datums_attr)
+                if zeit_code_attr and 'ZEIT_CODE' in df.columns:
+                    with mypy_trace.phase('parse_zeit_code'):
+                        df['ZEIT_CODE'] = parse_zeit_code(df['ZEIT_CODE'])
+                if losd_dtypes:
+                    with mypy_trace.phase('losd_dtypes'):
+                        df = optimize_losd_dtypes(df)
+                return df
+
+            if chunksize:
+                data2betested = (postprocess(chunk) for chunk in data2betested)
+            else:
+                data2betested = postprocess(data2betested)
 
         return data2betested
 
@@ -129,4 +382,402 @@ def load_data(status, data_source, package_name, dataset_name, **kwargs):
     except Exception as e:
         print(f'Es ist ein Fehler aufgetreten: {str(e)}')
         print("Error: %s" % e, file=sys.stderr)
-        print(file=sys.stderr) 
\ No newline at end of file
+        print(file=sys.stderr)
+
+
+# Lookup-Tabelle (Format, Zeitwert) -> Datum über alle Aufrufe hinweg. LOSD-Zeitdimensionen haben nur wenige hundert Werte,
+# jeder wird also einmal pro Sitzung geparst. Wird sie zu gross, fallen die am längsten nicht gebrauchten Werte heraus.
+# load_many ruft load_data in Threads auf, deshalb der Lock.
+_zeit_lookup = OrderedDict()
+_zeit_lookup_lock = threading.Lock()
+_ZEIT_LOOKUP_MAX = 100000
+
+
+def _zeit_categories(values):
+    # Verschiedene Werte und Codes pro Zeile, ohne die Spalte zu kopieren, falls sie bereits kategorisch ist
+    cat = values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype('category')
+    return cat.cat.categories, cat.cat.codes.to_numpy()
+
+
+def _guess_format(categories, codes):
+    # Format einmal pro Spalte wie pd.to_datetime aus dem ersten vorhandenen Wert in der Reihenfolge der Zeilen ableiten,
+    # nicht aus den sortierten Kategorien (sonst hinge z.B. '%d.%m.%Y' oder '%m.%d.%Y' von den anderen Werten ab)
+    present = codes[codes >= 0]
+    if not len(present):
+        return None
+    # Wie pd.to_datetime (dayfirst=False): '01.02.2021' -> '%m.%d.%Y', '13.02.2021' -> '%d.%m.%Y'
+    return tseries.guess_datetime_format(str(categories[present[0]]))
+
+
+def _parse_distinct(categories, format, errors):
+    # Nur die noch unbekannten Werte parsen, die bekannten kommen aus der Lookup-Tabelle. Das Resultat wird aus einem lokalen dict
+    # gebildet, damit ein Verdrängen aus der Tabelle keine Werte dieses Aufrufs verliert.
+    keys = [(format, v) for v in categories.astype(str)]
+    found = {}
+    with _zeit_lookup_lock:
+        for k in keys:
+            if k in _zeit_lookup:
+                _zeit_lookup.move_to_end(k)
+                found[k] = _zeit_lookup[k]
+    missing = [k[1] for k in keys if k not in found]
+    if missing:
+        parsed = pd.to_datetime(pd.Index(missing), format=format, errors=errors)
+        new = {(format, value): date for value, date in zip(missing, parsed) if date is not pd.NaT}
+        found.update(new)
+        with _zeit_lookup_lock:
+            _zeit_lookup.update(new)
+            while len(_zeit_lookup) > _ZEIT_LOOKUP_MAX:
+                _zeit_lookup.popitem(last=False)
+    return pd.DatetimeIndex([found.get(k, pd.NaT) for k in keys])
+
+
+def parse_zeit(values, **kwargs):
+    """
+    Diese Funktion wandelt eine Zeitspalte (z.B. ZEIT_LANG '2023-12-31' oder ZEIT_CODE 'Z31122023') in Datumswerte um.
+    Jeder unterschiedliche Wert wird nur einmal geparst und unter (Format, Wert) in einer Lookup-Tabelle gemerkt, die Zeilen erhalten
+    ihr Datum über die Kategorien-Codes. Der Aufwand hängt damit von der Anzahl verschiedener Werte ab, nicht von der Anzahl Zeilen.
+    Ohne format wird es wie bei pd.to_datetime aus dem ersten Wert der Spalte abgeleitet. Lässt sich keines ableiten,
+    wird wie bei pd.to_datetime jeder Wert einzeln geparst und nichts gemerkt.
+
+    Parameter (zwingend):
+    - values (Series): Spalte mit den Zeitwerten.
+
+    Optionale Parameter:
+    - format (str): Format der Werte, z.B. 'Z%d%m%Y'. Default: None (wie pd.to_datetime ermitteln)
+    - errors (str): 'raise' oder 'coerce' (nicht umwandelbare Werte werden NaT), wie bei pd.to_datetime. Default: 'raise'
+
+    Rückgabe:
+    - dates (Series): Spalte vom Typ datetime64.
+    """
+    format = kwargs.get('format', None)
+    errors = kwargs.get('errors', 'raise')
+
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    categories, codes = _zeit_categories(values)
+    format = format or _guess_format(categories, codes)
+    if format is None:
+        dates = pd.DatetimeIndex(pd.to_datetime(pd.Index(categories.astype(str)), errors=errors))
+    else:
+        dates = _parse_distinct(categories, format, errors)
+    return pd.Series(dates.take(codes, allow_fill=True, fill_value=pd.NaT), index=values.index, name=values.name)
+
+
+def parse_zeit_code(codes):
+    """
+    Diese Funktion wandelt LOSD-Zeitcodes im Format 'Z<TT><MM><JJJJ>' (z.B. 'Z31122023') in Datumswerte um (siehe parse_zeit).
+
+    Parameter (zwingend):
+    - codes (Series): Spalte mit den Zeitcodes.
+
+    Rückgabe:
+    - dates (Series): Spalte vom Typ datetime64, nicht lesbare Codes werden NaT.
+    """
+    return parse_zeit(codes, format='Z%d%m%Y', errors='coerce')
+
+
+def derive_zeit_columns(data, zeit, **kwargs):
+    """
+    Diese Funktion bildet aus einer Zeitspalte die abgeleiteten Spalten der Notebooks, also z.B.
+    StichtagDatJahr = ZEIT_LANG, StichtagDatJahr_str = ZEIT_LANG.astype(str) und Jahr = ZEIT_LANG.dt.year.
+    Datum, Jahr, Monat und Beschriftung werden nur für die verschiedenen Zeitwerte berechnet und über die Kategorien-Codes
+    auf die Zeilen verteilt. Die Zeitspalte darf ein Datum oder ein noch nicht umgewandelter String (ZEIT_CODE, ZEIT_LANG) sein.
+
+    Parameter (zwingend):
+    - data (DataFrame): Der Datensatz.
+    - zeit (str): Die Zeitspalte, z.B. 'ZEIT_LANG'.
+
+    Optionale Parameter:
+    - format (str): Format, falls die Zeitspalte Strings enthält. Default: 'Z%d%m%Y' für 'ZEIT_CODE', sonst None
+    - datum (str): Name der Datumsspalte. Default: 'StichtagDatJahr'
+    - datum_str (str): Name der Spalte mit dem Datum als Text. Default: 'StichtagDatJahr_str'
+    - jahr (str): Name der Jahresspalte. Default: 'Jahr'
+    - monat (str): Name der Monatsspalte, None für keine. Default: None
+    - as_category (bool): Textspalte als Kategorie statt als Strings zurückgeben (spart Speicher)? Default: False
+
+    Rückgabe:
+    - data (DataFrame): Kopie des Datensatzes mit den zusätzlichen Spalten.
+    """
+    format = kwargs.get('format', 'Z%d%m%Y' if zeit == 'ZEIT_CODE' else None)
+    datum = kwargs.get('datum', 'StichtagDatJahr')
+    datum_str = kwargs.get('datum_str', 'StichtagDatJahr_str')
+    jahr = kwargs.get('jahr', 'Jahr')
+    monat = kwargs.get('monat', None)
+    as_category = kwargs.get('as_category', False)
+
+    categories, codes = _zeit_categories(data[zeit])
+    if isinstance(categories, pd.DatetimeIndex):
+        dates = categories
+    else:
+        dates = _parse_distinct(categories, format, 'coerce' if zeit == 'ZEIT_CODE' else 'raise')
+
+    # Lookup pro verschiedenem Wert, danach ein take pro abgeleiteter Spalte
+    missing = (codes == -1).any()
+    labels = dates.astype(str)
+    columns = {datum: dates.take(codes, allow_fill=True, fill_value=pd.NaT)}
+    if as_category and labels.is_unique:
+        columns[datum_str] = pd.Categorical.from_codes(codes, categories=labels)
+    else:
+        columns[datum_str] = labels.take(codes, allow_fill=True, fill_value=np.nan) if missing else labels.take(codes)
+    for name, part in ((jahr, dates.year), (monat, dates.month)):
+        if name:
+            part = pd.Index(part)
+            columns[name] = part.astype('float64').take(codes, allow_fill=True, fill_value=np.nan) if missing else part.take(codes)
+
+    data = data.copy()
+    for name, column in columns.items():
+        data[name] = np.asarray(column) if not isinstance(column, pd.Categorical) else column
+    return data
+
+
+def optimize_losd_dtypes(data, **kwargs):
+    """
+    Diese Funktion verkleinert einen LOSD-Cube im Speicher. Die Spalten werden anhand der LOSD-Namenskonvention erkannt:
+    - Dimensionen ('*_LANG', '*_CODE', z.B. RAUM_LANG, KREISEZH_CODE) und Text-Attribute mit wenigen Ausprägungen (z.B. Datenstatus) werden zu 'category'.
+    - Kennzahlen (numerische Spalten wie WHG oder BEW) werden auf den kleinsten verlustfreien Integer- bzw. Float-Typ verkleinert.
+    Gruppierungen über die Dimensionen (groupby([..._LANG, ..._CODE])) werden dadurch ebenfalls deutlich schneller.
+
+    Parameter (zwingend):
+    - data (DataFrame): Der eingelesene Datensatz.
+
+    Optionale Parameter:
+    - max_cat_ratio (num): Text-Spalten ohne LOSD-Suffix werden nur zu 'category', wenn der Anteil unterschiedlicher Werte kleiner ist. Default: 0.5
+
+    Hinweis: Bei groupby über category-Spalten observed=True mitgeben, damit nur die vorhandenen Kombinationen gebildet werden.
+
+    Rückgabe:
+    - data (DataFrame): Der Datensatz mit optimierten Datentypen.
+    """
+    max_cat_ratio = kwargs.get('max_cat_ratio', 0.5)
+
+    n = max(len(data), 1)
+    # Spalte -> Ziel-Datentyp; astype statt assign, damit auch Spaltennamen, die keine Strings sind, funktionieren
+    converted = {}
+    for col in data.columns:
+        series = data[col]
+        if str(col).endswith(('_LANG', '_CODE')) and not pd.api.types.is_datetime64_any_dtype(series):
+            converted[col] = 'category'
+        elif pd.api.types.is_bool_dtype(series):
+            continue
+        elif pd.api.types.is_integer_dtype(series):
+            converted[col] = pd.to_numeric(series, downcast='integer').dtype
+        elif pd.api.types.is_float_dtype(series):
+            dtype = _downcast_float(series)
+            if dtype is not None:
+                converted[col] = dtype
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if series.nunique(dropna=True) / n < max_cat_ratio:
+                converted[col] = 'category'
+
+    return data.astype(converted) if converted else data
+
+
+def _downcast_float(series):
+    # Ganzzahlige Kennzahlen ohne Lücken (und ohne inf, im int64-Bereich) werden zu Integer, sonst nur dann float32,
+    # wenn dabei keine Werte verändert werden. Rückgabe: Ziel-Datentyp oder None (unverändert lassen)
+    values = series.to_numpy(dtype='float64', na_value=np.nan)
+    if len(values) and np.isfinite(values).all() and (values == np.round(values)).all() \
+            and values.min() >= -2.0 ** 63 and values.max() < 2.0 ** 63:
+        return pd.to_numeric(values.astype('int64'), downcast='integer').dtype
+    valid = ~np.isnan(values)
+    with np.errstate(over='ignore'):
+        as_float32 = values.astype('float32')
+    if (as_float32.astype('float64') == values)[valid].all():
+        return np.dtype('float32')
+    return None
+
+
+def make_session(**kwargs):
+    """
+    Diese Funktion erstellt eine requests.Session mit Connection-Pooling und automatischen Wiederholungen.
+    Die Session kann an load_data (Parameter session) übergeben oder von load_many gemeinsam genutzt werden.
+
+    Optionale Parameter:
+    - max_per_host (int): Maximale Anzahl gleichzeitiger Verbindungen pro Host. Default: 4
+    - retries (int): Anzahl Wiederholungen bei Verbindungsfehlern und 429/5xx-Antworten. Default: 3
+    - backoff_factor (num): Wartezeit zwischen den Wiederholungen (0.5 -> 0.5s, 1s, 2s, ...). Default: 0.5
+
+    Rückgabe:
+    - session (requests.Session): Die konfigurierte Session.
+    """
+    max_per_host = kwargs.get('max_per_host', 4)
+    retries = kwargs.get('retries', 3)
+    backoff_factor = kwargs.get('backoff_factor', 0.5)
+
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries
+        , backoff_factor=backoff_factor
+        , status_forcelist=(429, 500, 502, 503, 504)
+        , allowed_methods=frozenset(['GET', 'HEAD'])
+    )
+    # pool_block: pro Host nie mehr als max_per_host Verbindungen, weitere Threads warten auf eine freie Verbindung
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=max_per_host, max_retries=retry, pool_block=True)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def load_many(specs, **kwargs):
+    """
+    Diese Funktion lädt mehrere Datensätze gleichzeitig mit load_data. Alle Downloads laufen über eine gemeinsame,
+    gepoolte requests.Session. Die Wartezeit entspricht damit etwa dem langsamsten Download statt der Summe aller Downloads.
+
+    Parameter (zwingend):
+    - specs (list): Liste von dicts mit den Parametern für load_data (status, data_source, package_name, dataset_name, ...).
+      Optional kann pro dict ein 'name' angegeben werden, unter dem der Datensatz im Resultat abgelegt wird.
+      Default-Name: '<status>_<data_source>_<package_name>'
+
+    Optionale Parameter:
+    - max_workers (int): Anzahl gleichzeitiger Downloads. Default: Anzahl specs
+    - session (requests.Session): Bestehende Session. Default: neue Session aus make_session()
+    - max_per_host, retries, backoff_factor: siehe make_session
+    - timeout (num): Timeout pro Download in Sekunden. Default: 60
+    - alle weiteren kwargs werden an jeden load_data-Aufruf weitergegeben (z.B. cache=True), Angaben in den specs haben Vorrang.
+
+    Rückgabe:
+    - datasets (dict): Name -> DataFrame (None, falls der Datensatz nicht geladen werden konnte).
+    """
+    try:
+        max_workers = kwargs.pop('max_workers', None) or max(len(specs), 1)
+        session = kwargs.pop('session', None)
+        if session is None:
+            session = make_session(
+                max_per_host=kwargs.pop('max_per_host', 4)
+                , retries=kwargs.pop('retries', 3)
+                , backoff_factor=kwargs.pop('backoff_factor', 0.5)
+            )
+        kwargs.setdefault('timeout', 60)
+
+        def load_one(spec):
+            params = dict(kwargs, session=session)
+            params.update({k: v for k, v in spec.items() if k != 'name'})
+            return load_data(**params)
+
+        names = [spec.get('name', '{}_{}_{}'.format(spec['status'], spec['data_source'], spec['package_name'])) for spec in specs]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(load_one, specs))
+
+        return dict(zip(names, results))
+
+    except Exception as e:
+        print(f'Es ist ein Fehler aufgetreten: {str(e)}')
+        print("Error: %s" % e, file=sys.stderr)
+        print(file=sys.stderr)
+
+
+# Zwischenspeicher für profile(): Fingerprint des DataFrames -> Report
+_profile_cache = OrderedDict()
+_PROFILE_CACHE_SIZE = 16
+
+
+def profile(data, **kwargs):
+    """
+    Diese Funktion erstellt in einem Durchgang über die Spalten einen Datenqualitäts-Report. Er ersetzt die Abfolge
+    info(memory_usage='deep'), duplicated().sum(), data[data.duplicated()], isnull().sum(), describe() für numerische und nicht-numerische Spalten sowie hist().
+    Duplikate werden über einen Hash pro Zeile gefunden, der nur einmal berechnet wird. Derselbe Hash dient als Fingerprint:
+    Ein erneuter Aufruf mit einem unveränderten DataFrame liefert den zwischengespeicherten Report.
+
+    Parameter (zwingend):
+    - data (DataFrame): Der Datensatz, der geprüft werden soll.
+
+    Optionale Parameter:
+    - sample (int): Falls der Datensatz mehr Zeilen hat, werden die Statistiken (describe, hist) auf einer Stichprobe dieser Grösse berechnet.
+      Anzahl fehlender Werte und Duplikate beziehen sich immer auf den ganzen Datensatz. Default: None (keine Stichprobe)
+    - bins (int): Anzahl Klassen der Histogramme. Default: 25
+    - max_duplicates (int): Maximale Anzahl Duplikat-Zeilen im Report. Default: 20
+    - cache (bool): Report zwischenspeichern bzw. aus dem Zwischenspeicher liefern? Default: True
+
+    Rückgabe:
+    - report (dict): mit
+        - 'rows', 'columns', 'memory_bytes', 'n_duplicates'
+        - 'duplicates' (DataFrame): die ersten Duplikat-Zeilen
+        - 'info' (DataFrame): pro Spalte dtype, Anzahl nicht-leerer und fehlender Werte, Anzahl unterschiedlicher Werte und Speicherbedarf
+        - 'numeric' (DataFrame): wie describe(include='number')
+        - 'non_numeric' (DataFrame): wie describe(exclude='number')
+        - 'histograms' (dict): Spalte -> (counts, bin_edges)
+    """
+    try:
+        sample = kwargs.get('sample', None)
+        bins = kwargs.get('bins', 25)
+        max_duplicates = kwargs.get('max_duplicates', 20)
+        cache = kwargs.get('cache', True)
+
+        row_hash = pd.util.hash_pandas_object(data, index=False).to_numpy()
+        sha = hashlib.sha256(row_hash.tobytes())
+        sha.update(repr([(str(c), str(t)) for c, t in data.dtypes.items()]).encode('utf-8'))
+        fingerprint = (sha.hexdigest(), sample, bins, max_duplicates)
+        if cache and fingerprint in _profile_cache:
+            _profile_cache.move_to_end(fingerprint)
+            print("profile: Datensatz unverändert, verwende zwischengespeicherten Report")
+            return _profile_cache[fingerprint]
+
+        duplicated = pd.Series(row_hash).duplicated(keep='first').to_numpy()
+        stats_data = data
+        if sample is not None and len(data) > sample:
+            stats_data = data.sample(n=sample, random_state=0)
+
+        info_rows, numeric_rows, non_numeric_rows, histograms = [], [], [], {}
+        for col in data.columns:
+            series = data[col]
+            n_null = int(series.isna().sum())
+            stats_series = stats_data[col]
+            counts = stats_series.value_counts(dropna=True, sort=True)
+            info_rows.append({
+                'column': col,
+                'dtype': str(series.dtype),
+                'non_null': int(len(series) - n_null),
+                'null': n_null,
+                'unique': int(len(counts)),
+                'memory_bytes': int(series.memory_usage(deep=True, index=False)),
+            })
+
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                values = stats_series.to_numpy(dtype='float64', na_value=np.nan)
+                values = values[~np.isnan(values)]
+                row = {'column': col, 'count': len(values)}
+                if len(values):
+                    q25, q50, q75 = np.percentile(values, [25, 50, 75])
+                    row.update({
+                        'mean': values.mean(),
+                        'std': values.std(ddof=1) if len(values) > 1 else np.nan,
+                        'min': values.min(), '25%': q25, '50%': q50, '75%': q75, 'max': values.max(),
+                    })
+                    histograms[col] = np.histogram(values, bins=bins)
+                numeric_rows.append(row)
+            else:
+                row = {'column': col, 'count': int(counts.sum()), 'unique': int(len(counts))}
+                if len(counts):
+                    row.update({'top': counts.index[0], 'freq': int(counts.iloc[0])})
+                if pd.api.types.is_datetime64_any_dtype(series):
+                    row.update({'min': stats_series.min(), 'max': stats_series.max()})
+                non_numeric_rows.append(row)
+
+        info = pd.DataFrame(info_rows).set_index('column')
+        report = {
+            'rows': int(data.shape[0]),
+            'columns': int(data.shape[1]),
+            'memory_bytes': int(info['memory_bytes'].sum() + data.index.memory_usage(deep=True)) if len(info) else 0,
+            'n_duplicates': int(duplicated.sum()),
+            'duplicates': data.loc[duplicated].head(max_duplicates),
+            'info': info,
+            'numeric': pd.DataFrame(numeric_rows, columns=['column', 'count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']).set_index('column').T,
+            'non_numeric': pd.DataFrame(non_numeric_rows, columns=['column', 'count', 'unique', 'top', 'freq', 'min', 'max']).set_index('column').T,
+            'histograms': histograms,
+        }
+        print(f"The dataset has {report['rows']:,.0f} rows (observations) and {report['columns']:,.0f} columns (variables).")
+        print(f"There seem to be {report['n_duplicates']} exact duplicates in the data.")
+
+        if cache:
+            _profile_cache[fingerprint] = report
+            while len(_profile_cache) > _PROFILE_CACHE_SIZE:
+                _profile_cache.popitem(last=False)
+        return report
+
+    except Exception as e:
+        print(f'Es ist ein Fehler aufgetreten: {str(e)}')
+        print("Error: %s" % e, file=sys.stderr)
+        print(file=sys.stderr)
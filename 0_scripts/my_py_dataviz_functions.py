@@ -1,11 +1,218 @@
-import altair as alt
-import pandas as pd
-import plotly.express as px
-import seaborn as sns
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
 import sys
 import warnings
+from collections import OrderedDict
+
+from my_py_import_functions import lazy_import
+import my_py_trace_functions as mypy_trace
+
+# Die Plot-Backends werden erst geladen, wenn die jeweilige Funktion zum ersten Mal verwendet wird
+alt = lazy_import('altair')
+go = lazy_import('plotly.graph_objects')
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+plt = lazy_import('matplotlib.pyplot')
+pio = lazy_import('plotly.io')
+px = lazy_import('plotly.express')
+sns = lazy_import('seaborn')
+
+
+def _field(shorthand):
+    # 'StichtagDatJahr:T' -> 'StichtagDatJahr'
+    return shorthand.split(':')[0] if shorthand else shorthand
+
+
+def _slim_chart_data(data, x, y, category, aggregate, keep_columns):
+    # Nur die codierten Spalten (und keep_columns) behalten und doppelte Punkte entfernen bzw. vorab aggregieren
+    fields = [f for f in (_field(x), _field(category)) if f]
+    y_field = _field(y)
+    columns = list(dict.fromkeys(fields + [y_field] + list(keep_columns)))
+    missing = [c for c in columns if c not in data.columns]
+    if missing:
+        raise ValueError(f"slim_data: Spalten {missing} fehlen in den Daten")
+    data = data[columns]
+    if aggregate:
+        # Zusätzliche Spalten werden mitgruppiert, sie sollten also pro x und category eindeutig sein (z.B. RAUM_CODE zu RAUM_LANG)
+        by = [c for c in columns if c != y_field]
+        return data.groupby(by, observed=True, sort=False)[y_field].agg(aggregate).reset_index()
+    return data.drop_duplicates()
+
+
+# Zwischengespeicherte Grafiken: Fingerprint aus Daten und Parametern -> Grafik (LRU)
+_chart_cache = OrderedDict()
+
+
+def _stable_repr(value):
+    # Funktionen (z.B. grafiktyp=sns.lineplot) über ihren Namen, damit der Schlüssel auch nach einem Neustart gleich ist
+    if callable(value) and hasattr(value, '__qualname__'):
+        return f'{getattr(value, "__module__", "")}.{value.__qualname__}'
+    if isinstance(value, dict):
+        return '{' + ', '.join(f'{k!r}: {_stable_repr(v)}' for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))) + '}'
+    if isinstance(value, (list, tuple)):
+        return '[' + ', '.join(_stable_repr(v) for v in value) + ']'
+    return repr(value)
+
+
+def _chart_fingerprint(func, data, columns, arguments):
+    # Hash über die verwendeten Spalten (Werte, Namen, Datentypen) und alle übrigen Parameter
+    sha = hashlib.sha256(func.__qualname__.encode('utf-8'))
+    # columns=None: die Grafik übernimmt alle Spalten
+    columns = list(data.columns) if columns is None else [c for c in dict.fromkeys(columns) if c and c in data.columns]
+    projected = data[columns]
+    sha.update(repr([(c, str(projected[c].dtype)) for c in columns]).encode('utf-8'))
+    sha.update(pd.util.hash_pandas_object(projected, index=False).to_numpy().tobytes())
+    sha.update(_stable_repr(arguments).encode('utf-8'))
+    return sha.hexdigest()
+
+
+def _show_cached(chart):
+    # Matplotlib zeigt im Notebook nur neu erstellte Figuren automatisch an, eine Grafik aus dem Cache muss explizit angezeigt werden
+    figure = getattr(chart, 'figure', None)
+    if 'IPython' in sys.modules and figure is not None and type(figure).__module__.startswith('matplotlib'):
+        from IPython import get_ipython
+        if get_ipython() is not None:
+            from IPython.display import display
+            display(figure)
+
+
+def _memoized(columns_of):
+    """
+    Dieser Decorator speichert die Rückgabe einer plot_*-Funktion zwischen, wenn sie mit memo=True oder memo_dir aufgerufen wird.
+    Der Schlüssel ist ein Fingerprint der verwendeten Spalten (pd.util.hash_pandas_object) und aller übrigen Parameter.
+
+    Parameter (zwingend):
+    - columns_of (function): Liefert aus den Parametern des Aufrufs (dict) die Spalten, welche die Grafik verwendet.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            memo = kwargs.pop('memo', False)
+            memo_dir = kwargs.pop('memo_dir', None)
+            memo_size = kwargs.pop('memo_size', 32)
+            if not (memo or memo_dir):
+                return func(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            arguments = dict(bound.arguments)
+            arguments.update(arguments.pop('kwargs', {}))
+            data = arguments.pop('data')
+            if not isinstance(data, pd.DataFrame):
+                return func(*args, **kwargs)
+            key = _chart_fingerprint(func, data, columns_of(arguments), arguments)
+
+            if key in _chart_cache:
+                _chart_cache.move_to_end(key)
+                print("chart: unverändert, verwende Grafik aus dem Cache")
+                _show_cached(_chart_cache[key])
+                return _chart_cache[key]
+            path = os.path.join(memo_dir, f'{key}.pkl') if memo_dir else None
+            if path and os.path.exists(path):
+                try:
+                    with open(path, 'rb') as f:
+                        chart = pickle.load(f)
+                    _chart_cache[key] = chart
+                    print("chart: unverändert, verwende gespeicherte Grafik")
+                    _show_cached(chart)
+                    return chart
+                except Exception:
+                    pass
+
+            chart = func(*args, **kwargs)
+            if chart is None:
+                return chart
+            _chart_cache[key] = chart
+            while len(_chart_cache) > memo_size:
+                _chart_cache.popitem(last=False)
+            if path:
+                # Nicht jede Grafik lässt sich pickeln, dann bleibt sie nur im Speicher
+                tmp = f"{path}.{os.getpid()}.tmp"
+                try:
+                    os.makedirs(memo_dir, exist_ok=True)
+                    with open(tmp, 'wb') as f:
+                        pickle.dump(chart, f)
+                    os.replace(tmp, path)
+                except Exception:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+            return chart
+        return wrapper
+    return decorator
+
+
+def _lttb_indices(xs, ys, n_out):
+    # Largest-Triangle-Three-Buckets: pro Bucket den Punkt, der mit dem zuletzt gewählten Punkt und dem Mittel des nächsten Buckets
+    # das grösste Dreieck bildet. Erster und letzter Punkt bleiben immer erhalten.
+    length = len(xs)
+    if n_out >= length or n_out < 3:
+        return np.arange(length)
+    edges = np.linspace(1, length - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, length - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else length
+        avg_x, avg_y = xs[end:next_end].mean(), ys[end:next_end].mean()
+        area = np.abs((xs[a] - avg_x) * (ys[start:end] - ys[a]) - (xs[a] - xs[start:end]) * (avg_y - ys[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def _minmax_indices(ys, n_out):
+    # Pro Bin ((n_out - 2) / 2 gleich lange Abschnitte) das Minimum und das Maximum, dazu der erste und der letzte Punkt
+    length = len(ys)
+    if n_out >= length or n_out < 4:
+        return np.arange(length)
+    bins = (n_out - 2) // 2
+    bin_id = np.arange(length) * bins // length
+    order = np.lexsort((ys, bin_id))
+    starts = np.searchsorted(bin_id[order], np.arange(bins))
+    ends = np.r_[starts[1:], length] - 1
+    return np.unique(np.r_[order[starts], order[ends], 0, length - 1])
+
+
+def _downsample_chart_data(data, x, y, category, max_points, method):
+    # Pro Kategorie höchstens max_points Zeilen behalten; die behaltenen Zeilen sind Originalzeilen, die Tooltips bleiben also exakt
+    x_field, y_field, category_field = _field(x), _field(y), _field(category)
+    if not all(c in data.columns for c in (x_field, y_field)) or (category_field and category_field not in data.columns):
+        return data
+    data = data.sort_values(([category_field] if category_field else []) + [x_field], kind='stable')
+    x_values = data[x_field]
+    if pd.api.types.is_datetime64_any_dtype(x_values):
+        xs = x_values.to_numpy('datetime64[ns]').astype('int64').astype(float)
+    elif pd.api.types.is_numeric_dtype(x_values):
+        xs = x_values.to_numpy(float)
+    else:
+        # Nominale X-Achse: Position innerhalb der Serie
+        xs = np.arange(len(data), dtype=float)
+    ys = np.nan_to_num(pd.to_numeric(data[y_field], errors='coerce').to_numpy(float))
+
+    if category_field:
+        groups = data.groupby(category_field, observed=True, sort=False).indices.values()
+    else:
+        groups = [np.arange(len(data))]
+    keep = []
+    for idx in groups:
+        if len(idx) <= max_points:
+            keep.append(idx)
+        elif method == 'minmax':
+            keep.append(idx[_minmax_indices(ys[idx], max_points)])
+        else:
+            keep.append(idx[_lttb_indices(xs[idx], ys[idx], max_points)])
+    return data.iloc[np.sort(np.concatenate(keep))] if keep else data
 
 
+@mypy_trace.traced()
+@_memoized(lambda a: [_field(a.get('x')), _field(a.get('y')), _field(a.get('category', ''))] + list(a.get('keep_columns') or [])
+           if a.get('slim_data') or a.get('aggregate') else None)
 def plot_altair_multiline_highlight(data, x, y, **kwargs):
     """
     Diese Funktion erstellt ein interaktives Liniendiagramm in Altair. Doku dazu unter: https://altair-viz.github.io/gallery/ resp. https://altair-viz.github.io/gallery/multiline_highlight.html
@@ -24,6 +231,22 @@ def plot_altair_multiline_highlight(data, x, y, **kwargs):
     - category (str): Die Spalte, die die Kategorien für die Farbcodierung darstellt. Default: '' (leerer String).
     - category_beschriftung (str): Legendentitel.
     - warning_status (str): Der Status der Warnmeldungen. 'always' oder 'ignore' 
+    - slim_data (bool): Nur die Spalten für x, y und category (und keep_columns) in die Grafik übernehmen und doppelte Zeilen entfernen.
+      Spalten, die erst nachträglich (z.B. in zusätzlichen Tooltips oder Transforms) verwendet werden, in keep_columns angeben. Default: False
+    - keep_columns (list): Spalten, die bei slim_data bzw. aggregate zusätzlich behalten werden. Default: []
+    - aggregate (str): Falls gesetzt (z.B. 'sum' oder 'mean'), wird y pro x und category vorab in pandas aggregiert. Default: None
+    - max_points (int): Falls gesetzt, werden Serien mit mehr Punkten pro Kategorie auf höchstens so viele Punkte reduziert, damit die
+      Hervorhebung im Browser flüssig bleibt. Die behaltenen Punkte sind Originalzeilen mit exakten Tooltips. Default: None
+    - downsample (str): Verfahren für max_points: 'lttb' (Largest-Triangle-Three-Buckets, behält die Form der Linie) oder 'minmax'
+      (Minimum und Maximum pro Abschnitt, behält die Ausschläge). Default: 'lttb'
+    - data_file (str): Falls gesetzt, werden die Daten in dieses JSON-File geschrieben und in der Grafik nur per URL referenziert.
+      Die Grösse der Grafik (und des Notebooks) hängt dann nicht mehr von der Anzahl Zeilen ab. Default: None
+    - data_url (str): URL, unter welcher der Browser das data_file findet. Default: data_file
+    - memo (bool): Die erstellte Grafik zwischenspeichern und bei einem Aufruf mit unveränderten Daten (verwendete Spalten) und Parametern
+      wiederverwenden. Default: False
+    - memo_dir (str): Verzeichnis, in dem die Grafiken zusätzlich als Pickle gespeichert werden, damit sie einen Neustart des Kernels überstehen.
+      Schaltet memo ein. Default: None
+    - memo_size (int): Anzahl Grafiken, die höchstens im Speicher gehalten werden. Default: 32
 
     Rückgabe:
     - chart (alt.Chart): Das erstellte interaktive Diagramm.
@@ -36,40 +259,72 @@ def plot_altair_multiline_highlight(data, x, y, **kwargs):
         category = kwargs.get('category', '')
         category_beschriftung = kwargs.get('category_beschriftung', '')
         warning_status = kwargs.get('warning_status', 'ignore')
+        slim_data = kwargs.get('slim_data', False)
+        keep_columns = list(kwargs.get('keep_columns', None) or [])
+        aggregate = kwargs.get('aggregate', None)
+        data_file = kwargs.get('data_file', None)
+        data_url = kwargs.get('data_url', data_file)
+        max_points = kwargs.get('max_points', None)
+        downsample = kwargs.get('downsample', 'lttb')
+
+        if slim_data or aggregate:
+            with mypy_trace.phase('slim_data', rows_in=len(data)) as p:
+                data = _slim_chart_data(data, x, y, category, aggregate, keep_columns)
+                p.set(rows=len(data), columns=data.shape[1])
+
+        if max_points:
+            if downsample not in ('lttb', 'minmax'):
+                raise ValueError(f"downsample muss 'lttb' oder 'minmax' sein, nicht {downsample!r}")
+            with mypy_trace.phase('downsample', rows_in=len(data)) as p:
+                data = _downsample_chart_data(data, x, y, category, max_points, downsample)
+                p.set(rows=len(data))
+
+        if data_file:
+            # Sidecar-File statt Inline-Daten im Vega-Lite-Spec
+            if os.path.dirname(data_file):
+                os.makedirs(os.path.dirname(data_file), exist_ok=True)
+            data.to_json(data_file, orient='records', date_format='iso')
+            data = alt.UrlData(url=data_url, format=alt.DataFormat(type='json'))
+
+        with mypy_trace.phase('build_chart'):
+            highlight = alt.selection_point(on='pointerover', fields=[category], nearest=True)
+
+            # Überprüfen, ob category_beschriftung definiert ist, bevor sie verwendet wird
+            if category == '':
+                base = alt.Chart(data, title=myTitle).encode(
+                    x=alt.X(x, axis=alt.Axis(title=x_beschriftung)),
+                    y=alt.Y(y, axis=alt.Axis(title=y_beschriftung)),
+                    tooltip=[x, y]
+                )            
+
+            else:
+                base = alt.Chart(data, title=myTitle).encode(
+                    x=alt.X(x, axis=alt.Axis(title=x_beschriftung)),
+                    y=alt.Y(y, axis=alt.Axis(title=y_beschriftung)),
+                    color=alt.Color(category, legend=alt.Legend(title=category_beschriftung, orient="right")),
+                    tooltip=[x, category, y]
+                )
+
+            points = base.mark_circle().encode(
+                opacity=alt.value(1.3)
+            ).add_params(
+                highlight
+            ).properties(
+                width=750, height=400
+            )
 
-        highlight = alt.selection_point(on='pointerover', fields=[category], nearest=True)
-
-        # Überprüfen, ob category_beschriftung definiert ist, bevor sie verwendet wird
-        if category == '':
-            base = alt.Chart(data, title=myTitle).encode(
-                x=alt.X(x, axis=alt.Axis(title=x_beschriftung)),
-                y=alt.Y(y, axis=alt.Axis(title=y_beschriftung)),
-                tooltip=[x, y]
-            )            
-
-        else:
-            base = alt.Chart(data, title=myTitle).encode(
-                x=alt.X(x, axis=alt.Axis(title=x_beschriftung)),
-                y=alt.Y(y, axis=alt.Axis(title=y_beschriftung)),
-                color=alt.Color(category, legend=alt.Legend(title=category_beschriftung, orient="right")),
-                tooltip=[x, category, y]
+            lines = base.mark_line().encode(
+                size=alt.condition(~highlight, alt.value(1.2), alt.value(3))
             )
 
-        points = base.mark_circle().encode(
-            opacity=alt.value(1.3)
-        ).add_params(
-            highlight
-        ).properties(
-            width=750, height=400
-        )
+            chart = points + lines
 
-        lines = base.mark_line().encode(
-            size=alt.condition(~highlight, alt.value(1.2), alt.value(3))
-        )
+        if mypy_trace.is_enabled():
+            # Den Vega-Lite-Spec baut Altair erst bei der Anzeige, fürs Tracing wird er hier einmal erzeugt
+            with mypy_trace.phase('vegalite_spec') as p:
+                p.set(bytes=len(json.dumps(chart.to_dict(), default=str)))
 
         warnings.filterwarnings(warning_status, category=FutureWarning)
-        
-        chart = points + lines
 
         return chart
    
@@ -79,6 +334,122 @@ def plot_altair_multiline_highlight(data, x, y, **kwargs):
         print(file=sys.stderr)
 
 
+class _FacetPanels:
+    """
+    Ergebnis von plot_sns_facetgrid(..., fast=True): Die gleichen Attribute wie ein sns.FacetGrid, soweit sie in den Notebooks und
+    beim Export verwendet werden (figure, fig, axes, axes_dict, savefig), dazu die Panels der angezeigten Seite.
+    """
+    def __init__(self, figure, axes, panels, page, pages):
+        self.figure = figure
+        self.axes = axes
+        self.panels = panels
+        self.page = page
+        self.pages = pages
+        self.axes_dict = dict(zip(panels, axes.flat))
+
+    @property
+    def fig(self):
+        return self.figure
+
+    def savefig(self, *args, **kwargs):
+        self.figure.savefig(*args, **kwargs)
+
+
+def _level_order(values):
+    # Reihenfolge der Panels bzw. Farben wie bei seaborn: Kategorien, sortierte Zahlen, sonst Reihenfolge des Auftretens
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return [c for c in values.cat.categories if c in set(values.dropna().unique())]
+    levels = pd.unique(values.dropna())
+    if pd.api.types.is_numeric_dtype(values):
+        levels = np.sort(levels)
+    return list(levels)
+
+
+def _facet_palette(n_colors):
+    # Wie sns.FacetGrid: aktuelle Palette, bei mehr Farben husl
+    current = sns.color_palette()
+    if n_colors > len(current):
+        return sns.color_palette('husl', n_colors)
+    return sns.color_palette(n_colors=n_colors)
+
+
+def _fast_facetgrid(data, col, hue, col_wrap, height, x, y, **kwargs):
+    # Daten einmal gruppieren und pro Panel und Farbe direkt aus den vorab aufgeteilten Arrays zeichnen
+    grafiktyp = kwargs.get('grafiktyp', 'lineplot')
+    page = kwargs.get('page', None)
+    page_size = kwargs.get('page_size', None)
+    reuse = kwargs.get('reuse', None)
+    aspect = kwargs.get('aspect', 1)
+
+    kind = getattr(grafiktyp, '__name__', str(grafiktyp)).split('.')[-1]
+    if kind not in ('lineplot', 'scatterplot'):
+        raise ValueError(f"fast=True unterstützt nur sns.lineplot und sns.scatterplot, nicht {kind}")
+
+    panels = _level_order(data[col])
+    hues = _level_order(data[hue]) if hue else []
+    colors = dict(zip(hues, _facet_palette(len(hues))))
+
+    pages = 1
+    if page_size:
+        pages = max(1, -(-len(panels) // page_size))
+        page = page or 0
+        panels = panels[page * page_size:(page + 1) * page_size]
+    else:
+        page = 0
+
+    with mypy_trace.phase('group', rows=len(data)):
+        keys = [col] + ([hue] if hue and hue != col else [])
+        subset = data[data[col].isin(panels)]
+        if kind == 'lineplot':
+            # sns.lineplot zeichnet bei mehreren Werten pro x den Mittelwert (ohne Konfidenzband im schnellen Modus)
+            subset = subset.groupby(keys + [x], observed=True, sort=False)[y].mean().reset_index()
+        subset = subset.sort_values(keys + [x], kind='stable')
+        groups = subset.groupby(keys, observed=True, sort=False).indices
+        xs = subset[x].to_numpy()
+        ys = subset[y].to_numpy()
+
+    # Beim Blättern bleibt das Raster gleich gross, damit die Achsen der vorherigen Seite wiederverwendet werden können
+    shown = page_size if page_size and pages > 1 else len(panels)
+    ncols = min(col_wrap or shown, max(shown, 1))
+    nrows = max(1, -(-shown // ncols))
+    with mypy_trace.phase('facetgrid', columns=len(panels)):
+        if reuse is not None and reuse.axes.size == nrows * ncols:
+            # Achsen einer früheren Seite wiederverwenden, nur die gezeichneten Linien und Punkte werden ersetzt
+            figure, axes = reuse.figure, reuse.axes
+            for ax in axes.flat:
+                for artist in list(ax.lines) + list(ax.collections):
+                    artist.remove()
+                ax.set_visible(True)
+                ax.relim()
+        else:
+            figure, axes = plt.subplots(nrows, ncols, sharex=True, sharey=True, squeeze=False,
+                                        figsize=(ncols * height * aspect, nrows * height))
+
+    with mypy_trace.phase('draw', rows=len(subset), columns=len(panels)):
+        for ax, panel in zip(axes.flat, panels):
+            for level in (hues if len(keys) > 1 else [None]):
+                idx = groups.get((panel, level) if len(keys) > 1 else panel)
+                if idx is None:
+                    continue
+                color = colors[panel if hue == col else level] if hue else None
+                if kind == 'lineplot':
+                    ax.plot(xs[idx], ys[idx], color=color, alpha=.8, label=level)
+                else:
+                    ax.scatter(xs[idx], ys[idx], color=color, alpha=.8, label=level)
+            ax.set_title(str(panel))
+            ax.autoscale_view()
+        for i, ax in enumerate(axes.flat):
+            if i >= len(panels):
+                ax.set_visible(False)
+                # Beschriftung der X-Achse beim Panel darüber anzeigen, wie bei sns.FacetGrid mit col_wrap
+                if i >= ncols:
+                    axes.flat[i - ncols].xaxis.set_tick_params(labelbottom=True)
+
+    return _FacetPanels(figure, axes, panels, page, pages), colors
+
+
+@mypy_trace.traced()
+@_memoized(lambda a: [a.get('col'), a.get('hue'), a.get('x'), a.get('y')])
 def plot_sns_facetgrid(data, col, hue, col_wrap, height, x, y, **kwargs ):
     """
     Diese Funktion erstellt mit Seaborn eine faced grid lineplot.
@@ -101,10 +472,22 @@ def plot_sns_facetgrid(data, col, hue, col_wrap, height, x, y, **kwargs ):
     - ylabel (str): Beschriftung der Y-Achse
     - warning_status (str): Der Status der Warnmeldungen.'always' oder 'ignore' 
     - myTitle (str): Der Titel des Diagramms.
+    - fast (bool): Schneller Modus für viele Panels und Farben: Die Daten werden einmal gruppiert und pro Panel direkt mit Matplotlib
+      gezeichnet, statt seaborn pro Panel und Farbe aufzurufen. Nur für sns.lineplot (Mittelwert pro x, ohne Konfidenzband) und
+      sns.scatterplot. Default: False
+    - page_size (int): Im schnellen Modus nur so viele Panels pro Grafik zeichnen. Default: None (alle)
+    - page (int): Im schnellen Modus die anzuzeigende Seite, beginnend bei 0. Default: 0
+    - reuse (Rückgabe eines früheren Aufrufs): Im schnellen Modus die Figur und Achsen einer früheren Seite wiederverwenden. Default: None
+    - memo (bool): Die erstellte Grafik zwischenspeichern und bei einem Aufruf mit unveränderten Daten (verwendete Spalten) und Parametern
+      wiederverwenden. Default: False
+    - memo_dir (str): Verzeichnis, in dem die Grafiken zusätzlich als Pickle gespeichert werden, damit sie einen Neustart des Kernels überstehen.
+      Schaltet memo ein. Default: None
+    - memo_size (int): Anzahl Grafiken, die höchstens im Speicher gehalten werden. Default: 32
 
 
     Rückgabe:
-    - chart (sns.FacetGrid): Das erstellte Seaborn Diagramm.
+    - chart (sns.FacetGrid): Das erstellte Seaborn Diagramm. Im schnellen Modus ein Objekt mit den gleichen Attributen figure, fig, axes,
+      axes_dict und savefig sowie panels, page und pages (Anzahl Seiten).
 
     """
     try:
@@ -115,17 +498,41 @@ def plot_sns_facetgrid(data, col, hue, col_wrap, height, x, y, **kwargs ):
         ylabel = kwargs.get('ylabel', '')
         warning_status = kwargs.get('warning_status', 'ignore')
         myTitle = kwargs.get('myTitle', '')
+        fast = kwargs.get('fast', False)
+        if isinstance(grafiktyp, str):
+            grafiktyp = getattr(sns, grafiktyp.split('.')[-1])
+
+        if fast:
+            fg, colors = _fast_facetgrid(data, col, hue, col_wrap, height, x, y, **{**kwargs, 'grafiktyp': grafiktyp})
+            with mypy_trace.phase('layout'):
+                for ax in fg.axes[-1]:
+                    ax.set_xlabel(xlabel)
+                for ax in fg.axes[:, 0]:
+                    ax.set_ylabel(ylabel)
+                for legend in list(fg.figure.legends):
+                    legend.remove()
+                if hue:
+                    handles = [plt.Line2D([], [], color=c, label=str(l)) for l, c in colors.items()]
+                    fg.figure.legend(handles=handles, title=hue, loc='center right', frameon=False)
+                # Feste Ränder in Zoll statt tight_layout, das die ganze Figur einmal zusätzlich zeichnen müsste
+                width, height_in = fg.figure.get_size_inches()
+                fg.figure.subplots_adjust(left=0.8 / width, right=1 - (1.6 if hue else 0.2) / width, bottom=0.6 / height_in,
+                                          top=1 - 0.6 / height_in, wspace=0.15, hspace=0.35)
+                sns.despine(fig=fg.figure)
+                fg.figure.suptitle(myTitle if fg.pages == 1 else f'{myTitle} ({fg.page + 1}/{fg.pages})')
+        else:
+            with mypy_trace.phase('facetgrid', rows=len(data)):
+                fg = sns.FacetGrid(data, col=col, hue=hue, col_wrap=col_wrap, height=height) #palette könnte auch def werden: , palette="tab20c"
+            with mypy_trace.phase('map', rows=len(data), columns=len(fg.axes.flat)):
+                fg.map(grafiktyp, x, y, alpha=.8)
 
+            with mypy_trace.phase('layout'):
+                fg.set_axis_labels(xlabel,ylabel)
+                fg.set_titles(col_template="{col_name}", row_template="{row_name}")
+                fg.add_legend()
 
-        fg = sns.FacetGrid(data, col=col, hue=hue, col_wrap=col_wrap, height=height) #palette könnte auch def werden: , palette="tab20c"
-        fg.map(grafiktyp, x, y, alpha=.8)
-
-        fg.set_axis_labels(xlabel,ylabel)
-        fg.set_titles(col_template="{col_name}", row_template="{row_name}")
-        fg.add_legend()
-
-        fg.fig.subplots_adjust(top=0.95)
-        fg.fig.suptitle(myTitle)
+                fg.fig.subplots_adjust(top=0.95)
+                fg.fig.suptitle(myTitle)
 
         warnings.filterwarnings(warning_status, category=FutureWarning)       
 
@@ -137,9 +544,81 @@ def plot_sns_facetgrid(data, col, hue, col_wrap, height, x, y, **kwargs ):
         print(file=sys.stderr)    
 
 
+def _treemap_nodes(data, levels, values, color, discrete):
+    # Knoten der Treemap pro Ebene aus einer einzigen Aggregation auf der untersten Ebene, die oberen Ebenen werden daraus summiert.
+    # Farbe wie bei px.treemap: kategoriell der gemeinsame Wert der Blätter (sonst '(?)'), numerisch der mit values gewichtete Mittelwert.
+    leaf = data[list(dict.fromkeys(levels + [values] + ([color] if color else [])))]
+    if color and not discrete:
+        leaf = leaf.assign(_weighted=leaf[color] * leaf[values])
+    agg = {'_value': (values, 'sum')}
+    if color and discrete:
+        agg.update(_color=(color, 'first'), _n=(color, 'nunique'))
+    elif color:
+        agg.update(_weighted=('_weighted', 'sum'))
+    current = leaf.groupby(levels, observed=True, sort=False).agg(**agg).reset_index()
+
+    nodes = []
+    for depth in range(len(levels), 0, -1):
+        keys = levels[:depth]
+        if depth < len(levels):
+            agg = {'_value': ('_value', 'sum')}
+            if color and discrete:
+                agg.update(_color=('_color', 'first'), _n=('_n', 'max'), _colors=('_color', 'nunique'))
+            elif color:
+                agg.update(_weighted=('_weighted', 'sum'))
+            current = current.groupby(keys, observed=True, sort=False).agg(**agg).reset_index()
+            if color and discrete:
+                current['_n'] = current[['_n', '_colors']].max(axis=1)
+                current = current.drop(columns=['_colors'])
+        labels = current[keys].astype(str)
+        node = pd.DataFrame({'label': labels[keys[-1]], 'value': current['_value']})
+        node['parent'] = labels[keys[0]].str.cat([labels[k] for k in keys[1:-1]], sep='/') if depth > 1 else ''
+        node['id'] = (node['parent'] + '/' + node['label']) if depth > 1 else node['label']
+        if color and discrete:
+            node['color'] = current['_color'].where(current['_n'] <= 1, '(?)').astype(str)
+        elif color:
+            node['color'] = current['_weighted'] / current['_value']
+        nodes.append(node)
+    return pd.concat(nodes[::-1], ignore_index=True)
+
+
+def _go_treemap(data, levels, values, color, myHeaderTitle, color_discrete_map, color_continuous_scale):
+    # Schneller Ersatz für px.treemap(path=[px.Constant(myHeaderTitle)] + levels, ...) mit den gleichen ids, parents, values und Farben
+    discrete = bool(color) and not pd.api.types.is_numeric_dtype(data[color])
+    nodes = _treemap_nodes(data, list(levels), values, color, discrete)
+    root = str(myHeaderTitle)
+    ids = (root + '/' + nodes['id']).tolist()
+    parents = [root if p == '' else f'{root}/{p}' for p in nodes['parent']]
+    total = nodes.loc[nodes['parent'] == '', 'value'].sum()
+
+    marker = {}
+    if discrete:
+        # Zuordnung der Farben wie bei Plotly Express: color_discrete_map, dann die Standardfarben in sortierter Reihenfolge der Werte
+        top = nodes.loc[nodes['parent'] == '', 'color']
+        root_color = top.iloc[0] if top.nunique() == 1 else '(?)'
+        mapping = dict(color_discrete_map or {})
+        sequence = (px.defaults.color_discrete_sequence or pio.templates[px.defaults.template or pio.templates.default].layout.colorway
+                    or px.colors.qualitative.D3)
+        for value in sorted(set(nodes['color']) | {root_color}):
+            if mapping.get(value) is None:
+                mapping[value] = sequence[len(mapping) % len(sequence)]
+        marker = dict(colors=[mapping[root_color]] + nodes['color'].map(mapping).tolist())
+    elif color:
+        root_color = (nodes.loc[nodes['parent'] == '', 'color'] * nodes.loc[nodes['parent'] == '', 'value']).sum() / total
+        marker = dict(colors=[root_color] + nodes['color'].tolist(), coloraxis='coloraxis')
+
+    fig = go.Figure(go.Treemap(ids=[root] + ids, labels=[root] + nodes['label'].tolist(), parents=[''] + parents,
+                               values=[total] + nodes['value'].tolist(), branchvalues='total', marker=marker))
+    if color and not discrete:
+        fig.update_layout(coloraxis=dict(colorscale=color_continuous_scale, colorbar=dict(title=dict(text=color))))
+    return fig
+
+
+@mypy_trace.traced()
+@_memoized(lambda a: list(a.get('levels') or []) + [a.get('values'), a.get('color')])
 def plot_px_treemap(data, levels, values, color, **kwargs):
     """
-    Diese Funktion erstellt mit Plotly Express eine interaktive Treemap.
+    Diese Funktion erstellt mit Plotly eine interaktive Treemap.
     Doku dazu unter: 
     - https://plotly.com/python/treemaps/
     - https://plotly.com/python/builtin-colorscales/
@@ -162,10 +641,18 @@ def plot_px_treemap(data, levels, values, color, **kwargs):
     - margin_val_right (str): Angaben zu leerem Space zu t, l, r, b (top, left, right, bottom)        
     - margin_val_bopttom (str): Angaben zu leerem Space zu t, l, r, b (top, left, right, bottom)    
     - warning_status (str): Der Status der Warnmeldungen.'always' oder 'ignore' 
+    - fast (bool): Die Werte einmal pro Ebene in pandas aggregieren und ids/parents/values direkt für go.Treemap aufbauen,
+      statt die Hierarchie von Plotly Express bilden zu lassen. Enthalten die Levels leere Werte, wird px.treemap verwendet. Default: True
+    - memo (bool): Die erstellte Figur zwischenspeichern und bei einem Aufruf mit unveränderten Daten (verwendete Spalten) und Parametern
+      wiederverwenden. Default: False
+    - memo_dir (str): Verzeichnis, in dem die Figuren zusätzlich als Pickle gespeichert werden, damit sie einen Neustart des Kernels überstehen.
+      Schaltet memo ein. Default: None
+    - memo_size (int): Anzahl Figuren, die höchstens im Speicher gehalten werden. Default: 32
 
 
     Rückgabe:
-    - fig (px.treemap): Das erstellte interaktive Diagramm.
+    - fig (go.Figure): Das erstellte interaktive Diagramm. Im Notebook wird es angezeigt, wenn es am Ende der Zelle steht,
+      und kann mit fig.write_image(...) exportiert werden.
 
     """
     try:
@@ -181,21 +668,32 @@ def plot_px_treemap(data, levels, values, color, **kwargs):
         margin_val_left = kwargs.get('margin_val_left', 25)
         margin_val_right = kwargs.get('margin_val_right', 25)
         margin_val_bottom = kwargs.get('margin_val_bottom', 25)
-
-        #Bilde die Path-Variable
-    
-        path = [px.Constant(myHeaderTitle)] + levels
-        print(f'path: {path}')
-        print(f'Typ von path: {type(path)}')
+        fast = kwargs.get('fast', True)
+
+        if fast and data[list(levels)].isna().any(axis=None):
+            # Leere Levels bilden bei Plotly Express unregelmässige Bäume (oder einen Fehler), das bildet nur px.treemap korrekt ab
+            print(f"treemap: {int(data[list(levels)].isna().any(axis=1).sum()):,.0f} Zeilen mit leeren Levels, verwende px.treemap")
+            fast = False
+        if fast:
+            with mypy_trace.phase('go_treemap', rows=len(data)):
+                fig = _go_treemap(data, levels, values, color, myHeaderTitle, color_discrete_map, color_continuous_scale)
+            fig.update_layout(height=height, width=width)
+        else:
+            #Bilde die Path-Variable
         
-        fig = px.treemap(data,
-                     path=path,
-                     values=values,  # Füge die entsprechenden Werte für values, color, etc. hinzu
-                     color=color,
-                     color_discrete_map=color_discrete_map,
-                     color_continuous_scale=color_continuous_scale,
-                     height=height,
-                     width=width)
+            path = [px.Constant(myHeaderTitle)] + levels
+            print(f'path: {path}')
+            print(f'Typ von path: {type(path)}')
+            
+            with mypy_trace.phase('px_treemap', rows=len(data)):
+                fig = px.treemap(data,
+                             path=path,
+                             values=values,  # Füge die entsprechenden Werte für values, color, etc. hinzu
+                             color=color,
+                             color_discrete_map=color_discrete_map,
+                             color_continuous_scale=color_continuous_scale,
+                             height=height,
+                             width=width)
 
         fig.update_traces(root_color="grey")
         fig.update_layout(margin = dict(t=margin_val_top, l=margin_val_left, r=margin_val_right, b=margin_val_bottom))
@@ -204,7 +702,7 @@ def plot_px_treemap(data, levels, values, color, **kwargs):
 
         warnings.filterwarnings(warning_status, category=FutureWarning)  
 
-        return fig.show()
+        return fig
 
     except Exception as e:
         print(f'Es ist ein Fehler aufgetreten: {str(e)}')
@@ -0,0 +1,208 @@
+import json
+import os
+import re
+import sys
+
+from my_py_import_functions import lazy_import
+import my_py_dataloading_functions as mypy_dl
+import my_py_snapshot_functions as mypy_snap
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+pa = lazy_import('pyarrow')
+feather = lazy_import('pyarrow.feather')
+
+# Version des Hash-Formats im Index. Ändert sich row_hashes, muss sie erhöht werden, damit alte Indizes neu berechnet werden.
+_INDEX_FORMAT = '2'
+_ZEIT_CODE = re.compile(r'^Z\d{8}$')
+_ISO_DATUM = re.compile(r'^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2})?)?$')
+
+
+def default_index_dir():
+    """
+    Diese Funktion liefert das Standardverzeichnis der Delta-Indizes: losd/saved_data/delta_index im geklonten Repository.
+
+    Rückgabe:
+    - index_dir (str): Pfad zum Verzeichnis der Delta-Indizes.
+    """
+    return os.path.join(mypy_snap.default_store_dir(), 'delta_index')
+
+
+def _key_text(values):
+    # Werte einer Schlüsselspalte als einheitlicher Text: Datum (auch ZEIT_CODE 'Z31122023' oder '2023-12-31' als Text) als ISO-Datum,
+    # ganzzahlige Floats ohne '.0'. Berechnet wird nur für die verschiedenen Werte, die Zeilen erhalten ihren Text über die Codes.
+    cat = values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype('category')
+    categories = cat.cat.categories
+    if pd.api.types.is_datetime64_any_dtype(categories):
+        text = categories.strftime('%Y-%m-%dT%H:%M:%S')
+    elif pd.api.types.is_float_dtype(categories) and (categories == np.round(categories)).all():
+        text = categories.astype('int64').astype(str)
+    else:
+        text = categories.astype(str)
+        if len(text) and text.str.match(_ZEIT_CODE).all():
+            text = mypy_dl.parse_zeit_code(pd.Series(text)).dt.strftime('%Y-%m-%dT%H:%M:%S')
+        elif len(text) and text.str.match(_ISO_DATUM).all():
+            text = pd.to_datetime(pd.Series(text)).dt.strftime('%Y-%m-%dT%H:%M:%S')
+    text = pd.Index(text, dtype=object)
+    return pd.Series(text.take(cat.cat.codes.to_numpy(), allow_fill=True, fill_value=None), index=values.index, dtype=object)
+
+
+def row_hashes(data, keys, measures):
+    """
+    Diese Funktion berechnet pro Zeile einen Hash über die Schlüsselspalten (Dimensions-Codes und Zeit) und einen Hash über die Kennzahlen.
+    Die Schlüssel werden vorher als Text vereinheitlicht, damit der Hash nicht davon abhängt, ob eine Spalte als Text, category oder
+    Datum (z.B. ZEIT_CODE nach parse_zeit_code) geladen wurde.
+    Die Kennzahlen werden vorher nach float64 umgewandelt, damit der Hash nicht vom Datentyp (z.B. int16 nach optimize_losd_dtypes) abhängt.
+
+    Parameter (zwingend):
+    - data (DataFrame): Der Datensatz.
+    - keys (list): Schlüsselspalten, z.B. ['ZEIT_CODE', 'RAUM_CODE', 'ZIM_CODE'].
+    - measures (list): Kennzahlen, z.B. ['WHG'].
+
+    Rückgabe:
+    - key_hash, value_hash (numpy.ndarray): Je ein uint64-Array mit einem Hash pro Zeile.
+    """
+    key_text = pd.DataFrame({i: _key_text(data[k]) for i, k in enumerate(keys)})
+    key_hash = pd.util.hash_pandas_object(key_text, index=False).to_numpy()
+    values = data[measures].astype('float64')
+    value_hash = pd.util.hash_pandas_object(values, index=False).to_numpy()
+    return key_hash, value_hash
+
+
+def _index_path(index_dir, package_name):
+    return os.path.join(index_dir, f"{package_name}_delta_index.arrow")
+
+
+def _index_meta(keys, measures):
+    # Im Schema des Index festgehalten, damit ein Index mit anderen Schlüsseln oder altem Hash-Format erkannt wird
+    return {b'delta_format': _INDEX_FORMAT.encode(), b'delta_keys': json.dumps(keys).encode(),
+            b'delta_measures': json.dumps(measures).encode()}
+
+
+def _read_index(index_path, keys, measures):
+    # Gespeicherten Index lesen. Passt er nicht zu keys/measures bzw. zum Hash-Format, werden die Hashes aus den mitgespeicherten
+    # Spalten neu berechnet. Fehlen diese Spalten, ist der Index für diesen Aufruf unbrauchbar.
+    table = feather.read_table(index_path, memory_map=True)
+    meta = table.schema.metadata or {}
+    expected = _index_meta(keys, measures)
+    old = table.to_pandas()
+    if all(meta.get(k) == v for k, v in expected.items()):
+        return old
+    missing = [c for c in keys + measures if c not in old.columns]
+    if missing:
+        raise ValueError(f"Der Delta-Index {index_path} wurde mit anderen Spalten erstellt, es fehlen {missing}. "
+                         "Index löschen oder previous mitgeben.")
+    print("delta: Index mit anderen Schlüsseln oder altem Format, Hashes werden neu berechnet")
+    old = old[keys + measures].copy()
+    old['key_hash'], old['value_hash'] = row_hashes(old, keys, measures)
+    return old
+
+
+def detect_delta(data, package_name, keys, measures, **kwargs):
+    """
+    Diese Funktion ermittelt, was sich in einem neuen Harvester-Lauf gegenüber dem letzten Stand verändert hat.
+    Pro Package wird ein persistenter Index mit den Zeilen-Hashes (siehe row_hashes) geführt. Der neue Datensatz wird nur über die
+    Hashes mit dem Index verglichen, ausgegeben werden ausschliesslich die eingefügten, gelöschten und geänderten Beobachtungen.
+
+    Parameter (zwingend):
+    - data (DataFrame): Der neu geladene Datensatz.
+    - package_name (str): Name des Packages, z.B. 'bau502od5022'.
+    - keys (list): Schlüsselspalten, welche eine Beobachtung eindeutig bestimmen (Dimensions-Codes und Zeit).
+    - measures (list): Kennzahlen, z.B. ['WHG'].
+
+    Optionale Parameter:
+    - zeit (str): Zeitspalte, deren betroffene Werte zurückgegeben werden. Default: 'ZEIT_CODE'
+    - index_dir (str): Verzeichnis der Delta-Indizes. Default: losd/saved_data/delta_index
+    - previous (DataFrame): Vorheriger Stand (z.B. aus load_snapshot), falls noch kein Index existiert. Default: None
+    - update_index (bool): Soll der Index danach auf den neuen Stand gesetzt werden? Default: True
+
+    Rückgabe:
+    - delta (dict): mit
+        - 'inserted' (DataFrame): neue Beobachtungen
+        - 'deleted' (DataFrame): nicht mehr vorhandene Beobachtungen (Stand vorher)
+        - 'changed' (DataFrame): Beobachtungen mit geänderten Kennzahlen, die bisherigen Werte stehen in '<Kennzahl>_alt'
+        - 'affected_zeit' (list): betroffene Werte der Zeitspalte
+        - 'n_inserted', 'n_deleted', 'n_changed', 'n_unchanged' (int)
+    """
+    try:
+        zeit = kwargs.get('zeit', 'ZEIT_CODE')
+        index_dir = kwargs.get('index_dir', None) or default_index_dir()
+        previous = kwargs.get('previous', None)
+        update_index = kwargs.get('update_index', True)
+
+        keys = list(keys)
+        measures = list(measures)
+        index_path = _index_path(index_dir, package_name)
+
+        new_kh, new_vh = row_hashes(data, keys, measures)
+        if len(np.unique(new_kh)) != len(new_kh):
+            raise ValueError(f"Die Schlüsselspalten {keys} bestimmen die Beobachtungen nicht eindeutig")
+
+        old = None
+        if os.path.exists(index_path):
+            try:
+                old = _read_index(index_path, keys, measures)
+            except ValueError:
+                # Ein unbrauchbarer Index wird durch previous ersetzt, ohne previous ist das ein Fehler
+                if previous is None:
+                    raise
+        if old is None and previous is not None:
+            old = previous[keys + measures].copy()
+            old['key_hash'], old['value_hash'] = row_hashes(old, keys, measures)
+
+        if old is None:
+            inserted_mask = np.ones(len(data), dtype=bool)
+            changed_mask = np.zeros(len(data), dtype=bool)
+            deleted = data.iloc[0:0][keys + measures]
+            pos = np.full(len(data), -1)
+        else:
+            old_kh = old['key_hash'].to_numpy()
+            old_vh = old['value_hash'].to_numpy()
+            # Hash-Join über die uint64-Schlüssel
+            pos = pd.Index(old_kh).get_indexer(new_kh)
+            inserted_mask = pos < 0
+            matched = ~inserted_mask
+            changed_mask = np.zeros(len(data), dtype=bool)
+            changed_mask[matched] = old_vh[pos[matched]] != new_vh[matched]
+            deleted = old.loc[~pd.Index(old_kh).isin(new_kh), keys + measures].reset_index(drop=True)
+
+        inserted = data.loc[inserted_mask].reset_index(drop=True)
+        changed = data.loc[changed_mask].reset_index(drop=True)
+        if changed_mask.any():
+            previous_values = old[measures].iloc[pos[changed_mask]].reset_index(drop=True)
+            for m in measures:
+                changed[m + '_alt'] = previous_values[m].to_numpy()
+
+        affected = set()
+        if zeit in data.columns:
+            for part in (inserted, changed, deleted):
+                affected.update(part[zeit].dropna().unique().tolist())
+
+        if update_index:
+            os.makedirs(index_dir, exist_ok=True)
+            index = data[keys + measures].reset_index(drop=True)
+            index = index.assign(key_hash=new_kh, value_hash=new_vh)
+            table = pa.Table.from_pandas(index, preserve_index=False)
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), **_index_meta(keys, measures)})
+            tmp = f"{index_path}.{os.getpid()}.tmp"
+            feather.write_feather(table, tmp, compression='uncompressed')
+            os.replace(tmp, index_path)
+
+        delta = {
+            'inserted': inserted,
+            'deleted': deleted,
+            'changed': changed,
+            'affected_zeit': sorted(affected),
+            'n_inserted': int(inserted_mask.sum()),
+            'n_deleted': int(len(deleted)),
+            'n_changed': int(changed_mask.sum()),
+            'n_unchanged': int(len(data) - inserted_mask.sum() - changed_mask.sum()),
+        }
+        print(f"delta: {delta['n_inserted']:,.0f} neu, {delta['n_deleted']:,.0f} gelöscht, {delta['n_changed']:,.0f} geändert, "
+              f"{len(delta['affected_zeit'])} betroffene Zeitpunkte")
+        return delta
+
+    except Exception as e:
+        print(f'Es ist ein Fehler aufgetreten: {str(e)}')
+        print("Error: %s" % e, file=sys.stderr)
+        print(file=sys.stderr)
@@ -0,0 +1,229 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from my_py_import_functions import lazy_import
+import my_py_trace_functions as mypy_trace
+
+requests = lazy_import('requests')
+urllib3 = lazy_import('urllib3')
+
+try:
+    import brotli
+except ImportError:  # ohne brotli wird nur gzip/deflate angeboten
+    brotli = None
+
+
+def accept_encoding():
+    """
+    Diese Funktion liefert den Accept-Encoding-Header für Downloads: gzip und deflate, br nur wenn das Modul brotli installiert ist.
+
+    Rückgabe:
+    - accept_encoding (str): z.B. 'gzip, deflate, br'
+    """
+    return 'gzip, deflate, br' if brotli is not None else 'gzip, deflate'
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta_path, meta):
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+
+def _validator(meta):
+    # If-Range: nur mit ETag oder Last-Modified darf ein Teil-Download fortgesetzt werden
+    return meta.get('etag') or meta.get('last_modified')
+
+
+def _total_size(r):
+    # Gesamtgrösse der (ggf. komprimierten) Ressource aus Content-Range bzw. Content-Length
+    content_range = r.headers.get('Content-Range', '')
+    if '/' in content_range and not content_range.endswith('/*'):
+        return int(content_range.rsplit('/', 1)[1])
+    if r.status_code == 200 and r.headers.get('Content-Length'):
+        return int(r.headers['Content-Length'])
+    return None
+
+
+def _decode(part_path, path, content_encoding):
+    # Die Übertragungskodierung erst nach dem vollständigen Download entfernen, damit Byte-Offsets für Range-Requests stimmen
+    if not content_encoding or content_encoding == 'identity':
+        os.replace(part_path, path)
+        return os.path.getsize(path)
+    if content_encoding == 'gzip':
+        with gzip.open(part_path, 'rb') as src, open(path, 'wb') as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+    elif content_encoding in ('deflate', 'br'):
+        if content_encoding == 'br':
+            if brotli is None:
+                raise ValueError("Antwort ist mit br komprimiert, das Modul brotli ist aber nicht installiert")
+            decompressor = brotli.Decompressor()
+        else:
+            decompressor = zlib.decompressobj()
+        with open(part_path, 'rb') as src, open(path, 'wb') as dst:
+            for block in iter(lambda: src.read(1 << 20), b''):
+                dst.write(decompressor.process(block) if content_encoding == 'br' else decompressor.decompress(block))
+            if content_encoding == 'deflate':
+                dst.write(decompressor.flush())
+    else:
+        raise ValueError(f"Unbekanntes Content-Encoding: {content_encoding}")
+    os.remove(part_path)
+    return os.path.getsize(path)
+
+
+def _download_range(getter, url, part_path, start, end, validator, verify, timeout, retries, chunk_size):
+    # Einen Byte-Bereich [start, end] an die richtige Stelle des vorab angelegten Files schreiben, bei Abbrüchen ab dem letzten Byte weiter
+    position = start
+    for attempt in range(retries + 1):
+        headers = {'Range': f'bytes={position}-{end}', 'Accept-Encoding': 'identity'}
+        if validator:
+            headers['If-Range'] = validator
+        try:
+            with getter.get(url, headers=headers, verify=verify, timeout=timeout, stream=True) as r:
+                if r.status_code != 206:
+                    raise RuntimeError(f"Server hat den Bereich {position}-{end} nicht geliefert (Status {r.status_code})")
+                with open(part_path, 'r+b') as f:
+                    f.seek(position)
+                    for chunk in r.raw.stream(chunk_size, decode_content=False):
+                        f.write(chunk)
+                        position += len(chunk)
+            if position > end:
+                return position - start
+        except (requests.RequestException, urllib3.exceptions.HTTPError, OSError):
+            if attempt == retries:
+                raise
+        time.sleep(min(0.5 * 2 ** attempt, 10))
+    raise RuntimeError(f"Bereich {start}-{end} unvollständig nach {retries} Wiederholungen")
+
+
+def download_file(url, path=None, **kwargs):
+    """
+    Diese Funktion lädt eine Datei über HTTP in ein File herunter. Sie bietet dem Server gzip/deflate (und br, falls brotli installiert ist)
+    als Übertragungskodierung an und schreibt die Bytes zuerst in ein temporäres File <path>.part.
+    Bricht die Verbindung ab, wird mit einem Range-Request ab dem letzten empfangenen Byte weitergeladen (falls der Server Ranges unterstützt),
+    auch über mehrere Aufrufe hinweg: ein <path>.part eines abgebrochenen Aufrufs wird fortgesetzt, solange sich ETag/Last-Modified nicht geändert haben.
+    Liefert der Server eine unkomprimierte Datei mit Accept-Ranges, wird sie ab part_min_mb in mehreren Teilen parallel geladen.
+
+    Parameter (zwingend):
+    - url (str): Die URL der Datei.
+
+    Optionale Parameter:
+    - path (str): Zielfile. Default: None (neues temporäres File, das der Aufrufer selbst löschen muss)
+    - session (requests.Session): Session, über welche der Download laufen soll. Default: None (requests.get)
+    - verify (bool): SSL-Zertifikate prüfen? Default: False
+    - timeout (num): Timeout in Sekunden für den Verbindungsaufbau und zwischen zwei empfangenen Paketen. Default: 60
+    - retries (int): Anzahl Wiederholungen nach einem Abbruch. Default: 5
+    - parts (int): Anzahl paralleler Teil-Downloads. 1 schaltet das parallele Laden aus. Default: 4
+    - part_min_mb (num): Minimale Grösse der Datei in MB für paralleles Laden. Default: 8
+    - chunk_size (int): Blockgrösse beim Schreiben in Bytes. Default: 1 MB
+
+    Rückgabe:
+    - path (str): Pfad zum heruntergeladenen, dekodierten File.
+    """
+    session = kwargs.get('session', None)
+    verify = kwargs.get('verify', False)
+    timeout = kwargs.get('timeout', 60)
+    retries = kwargs.get('retries', 5)
+    parts = kwargs.get('parts', 4)
+    part_min_mb = kwargs.get('part_min_mb', 8)
+    chunk_size = kwargs.get('chunk_size', 1 << 20)
+
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix='.download')
+        os.close(fd)
+    part_path = path + '.part'
+    meta_path = part_path + '.json'
+    getter = session if session is not None else requests
+
+    # Ein Teil-Download eines früheren Aufrufs wird nur für die gleiche URL und mit Validator fortgesetzt
+    meta = _read_meta(meta_path)
+    if meta is None or meta.get('url') != url or not _validator(meta) or not os.path.exists(part_path):
+        meta = None
+    written = os.path.getsize(part_path) if meta is not None else 0
+    transferred = 0
+    retried = 0
+    total = meta.get('total') if meta is not None else None
+    parallel = False
+
+    with mypy_trace.phase('download') as p:
+        attempt = 0
+        while True:
+            headers = {'Accept-Encoding': accept_encoding()}
+            if written and meta is not None:
+                headers['Range'] = f'bytes={written}-'
+                headers['If-Range'] = _validator(meta)
+            try:
+                with getter.get(url, headers=headers, verify=verify, timeout=timeout, stream=True) as r:
+                    if attempt == 0:
+                        mypy_trace.record('http_headers', r.elapsed.total_seconds(), status=r.status_code)
+                    if r.status_code == 416 and total is not None and written >= total:
+                        break
+                    r.raise_for_status()
+                    if r.status_code != 206:
+                        # Neuer Download (oder der Server ignoriert Range bzw. die Datei hat sich geändert): von vorne
+                        written = 0
+                        meta = {'url': url, 'etag': r.headers.get('ETag'), 'last_modified': r.headers.get('Last-Modified'),
+                                'content_encoding': r.headers.get('Content-Encoding'),
+                                'ranges': r.headers.get('Accept-Ranges', '').lower() == 'bytes', 'total': _total_size(r)}
+                        total = meta['total']
+                        parallel = (parts > 1 and meta['ranges'] and bool(_validator(meta)) and not meta['content_encoding']
+                                    and bool(total) and total >= part_min_mb * 1024 * 1024)
+                        if parallel:
+                            break
+                        with open(part_path, 'wb'):
+                            pass
+                        _write_meta(meta_path, meta)
+                    else:
+                        meta['ranges'] = True
+                        total = _total_size(r) or total
+                    with open(part_path, 'ab') as f:
+                        for chunk in r.raw.stream(chunk_size, decode_content=False):
+                            f.write(chunk)
+                            written += len(chunk)
+                            transferred += len(chunk)
+                if total is None or written >= total:
+                    break
+                raise urllib3.exceptions.ProtocolError(f"Verbindung nach {written:,} von {total:,} Bytes beendet")
+            except (requests.RequestException, urllib3.exceptions.HTTPError, OSError) as e:
+                status = getattr(getattr(e, 'response', None), 'status_code', None)
+                if attempt >= retries or (status is not None and status < 500):
+                    raise
+                attempt += 1
+                retried += 1
+                if meta is None or not meta.get('ranges') or not _validator(meta):
+                    written = 0
+                print(f"download: Abbruch ({e}), Versuch {attempt} von {retries}, weiter ab Byte {written:,}")
+                time.sleep(min(0.5 * 2 ** (attempt - 1), 10))
+
+        if parallel:
+            # Parallel in gleich grossen Teilen in ein vorab angelegtes File
+            with open(part_path, 'wb') as f:
+                f.truncate(total)
+            bounds = [(i * total // parts, (i + 1) * total // parts - 1) for i in range(parts)]
+            with ThreadPoolExecutor(max_workers=parts) as pool:
+                sizes = list(pool.map(lambda b: _download_range(getter, url, part_path, b[0], b[1], _validator(meta),
+                                                                verify, timeout, retries, chunk_size), bounds))
+            written = transferred = sum(sizes)
+            p.set(parts=parts)
+        p.set(bytes=transferred, encoding=meta.get('content_encoding') if meta else None, retries=retried)
+
+    with mypy_trace.phase('decode') as p:
+        size = _decode(part_path, path, meta.get('content_encoding') if meta else None)
+        p.set(bytes=size)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    encoding = meta.get('content_encoding') if meta else None
+    print(f"download: {transferred:,.0f} Bytes übertragen" + (f" ({encoding}, {size:,.0f} Bytes entpackt)" if encoding else ""))
+    return path
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import my_py_cache_functions as mypy_cache
+
+
+# Konverter pro Worker-Prozess, werden im Initializer einmal geladen und danach wiederverwendet
+_vl_convert = None
+_plotly_io = None
+
+
+def _init_worker():
+    # Nur in den Prozessen des Pools: dort darf das Backend global auf Agg gestellt werden
+    import matplotlib
+    matplotlib.use('Agg')
+    _load_converters()
+
+
+def _load_converters():
+    global _vl_convert, _plotly_io
+    try:
+        import vl_convert
+        _vl_convert = vl_convert
+    except ImportError:
+        _vl_convert = None
+    try:
+        import plotly.io
+        _plotly_io = plotly.io
+    except ImportError:
+        _plotly_io = None
+
+
+def _serialize(chart):
+    # Liefert (Art, Payload, Hash) eines Chart-Objekts, der Payload kann an einen anderen Prozess geschickt werden
+    module = type(chart).__module__
+    if module.startswith('altair'):
+        import altair as alt
+        vl_version = 'v' + '_'.join(alt.SCHEMA_VERSION.lstrip('v').split('.')[:2])
+        payload = json.dumps({'spec': chart.to_dict(), 'vl_version': vl_version}, sort_keys=True, default=str)
+        return 'altair', payload, hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    if module.startswith('plotly'):
+        payload = chart.to_json()
+        return 'plotly', payload, hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    # seaborn (FacetGrid, catplot) oder matplotlib
+    figure = getattr(chart, 'figure', None) or getattr(chart, 'fig', None) or chart
+    return 'matplotlib', pickle.dumps(figure), _figure_fingerprint(figure)
+
+
+def _figure_fingerprint(figure):
+    # Pickles von Matplotlib-Figuren sind nicht stabil, daher Hash über den Inhalt der Achsen (Daten, Farben, Beschriftungen)
+    sha = hashlib.sha256(repr((tuple(figure.get_size_inches()), figure.dpi)).encode('utf-8'))
+    for text in figure.texts:
+        sha.update(text.get_text().encode('utf-8'))
+    for ax in figure.axes:
+        sha.update(repr((ax.get_title(), ax.get_xlabel(), ax.get_ylabel(), ax.get_xlim(), ax.get_ylim())).encode('utf-8'))
+        for line in ax.lines:
+            sha.update(line.get_xydata().tobytes())
+            sha.update(repr((line.get_color(), line.get_linewidth(), line.get_label())).encode('utf-8'))
+        for collection in ax.collections:
+            sha.update(collection.get_offsets().tobytes() if hasattr(collection.get_offsets(), 'tobytes') else repr(collection.get_offsets()).encode('utf-8'))
+        for patch in ax.patches:
+            sha.update(repr(patch.get_bbox().bounds).encode('utf-8'))
+        legend = ax.get_legend()
+        if legend is not None:
+            sha.update(repr([t.get_text() for t in legend.get_texts()]).encode('utf-8'))
+    return sha.hexdigest()
+
+
+def _render(kind, payload, path, fmt, scale):
+    # Läuft bei max_workers=1 im Prozess des Notebooks, darf also weder das Matplotlib-Backend umstellen noch Figuren offen lassen
+    if _vl_convert is None and _plotly_io is None:
+        _load_converters()
+    if kind == 'altair':
+        spec = json.loads(payload)
+        if fmt == 'svg':
+            data = _vl_convert.vegalite_to_svg(spec['spec'], vl_version=spec['vl_version']).encode('utf-8')
+        elif fmt == 'pdf':
+            data = _vl_convert.vegalite_to_pdf(spec['spec'], vl_version=spec['vl_version'], scale=scale)
+        else:
+            data = _vl_convert.vegalite_to_png(spec['spec'], vl_version=spec['vl_version'], scale=scale)
+        with open(path, 'wb') as f:
+            f.write(data)
+    elif kind == 'plotly':
+        fig = _plotly_io.from_json(payload)
+        _plotly_io.write_image(fig, path, format=fmt, scale=scale)
+    else:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        figure = pickle.loads(payload)
+        FigureCanvasAgg(figure)
+        figure.savefig(path, format=fmt, dpi=100 * scale)
+        # Eine entpickelte pyplot-Figur ist wieder bei pyplot registriert und würde sonst im Notebook angezeigt
+        if 'matplotlib.pyplot' in sys.modules:
+            sys.modules['matplotlib.pyplot'].close(figure)
+    return path
+
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def export_charts(charts, out_dir, **kwargs):
+    """
+    Diese Funktion speichert mehrere Grafiken gleichzeitig in einem Prozess-Pool, z.B. alle Test-Grafiken eines Datensatzes nach losd/grafiken_testing.
+    Unterstützt werden die Rückgaben von plot_altair_multiline_highlight (Altair, via vl-convert), plot_px_treemap (Plotly, via kaleido)
+    sowie plot_sns_facetgrid und andere Seaborn-/Matplotlib-Grafiken. Jeder Worker lädt die Konverter nur einmal.
+    Für jede Grafik wird ein Hash der Spezifikation im Manifest des Verzeichnisses festgehalten. Ist die Spezifikation unverändert
+    und das File vorhanden, wird die Grafik nicht erneut gerendert.
+
+    Parameter (zwingend):
+    - charts (dict oder list): {Filename: Grafik} oder Liste von (Filename, Grafik). Das Format ergibt sich aus der Endung (.png, .svg, .pdf).
+    - out_dir (str): Zielverzeichnis, z.B. '/content/colab/losd/grafiken_testing/'.
+
+    Optionale Parameter:
+    - max_workers (int): Anzahl Prozesse. Bei 1 wird ohne Prozess-Pool im aktuellen Prozess gerendert (z.B. in einem Batch-Worker). Default: Anzahl CPU-Kerne
+    - scale (num): Skalierungsfaktor der Rastergrafiken. Default: 1
+    - force (bool): Alle Grafiken neu rendern, auch wenn sie unverändert sind. Default: False
+
+    Rückgabe:
+    - status (dict): Filename -> 'rendered', 'skipped' oder die Fehlermeldung.
+    """
+    try:
+        max_workers = kwargs.get('max_workers', None) or os.cpu_count()
+        scale = kwargs.get('scale', 1)
+        force = kwargs.get('force', False)
+
+        items = list(charts.items()) if isinstance(charts, dict) else list(charts)
+        os.makedirs(out_dir, exist_ok=True)
+        manifest_path = os.path.join(out_dir, '.export_manifest.json')
+        manifest = _read_manifest(manifest_path)
+
+        status = {}
+        tasks = []
+        for file_name, chart in items:
+            path = os.path.join(out_dir, file_name)
+            fmt = os.path.splitext(file_name)[1].lstrip('.').lower() or 'png'
+            kind, payload, content_hash = _serialize(chart)
+            spec_hash = hashlib.sha256(f'{content_hash}|{kind}|{fmt}|{scale}'.encode('utf-8')).hexdigest()
+            if not force and manifest.get(file_name) == spec_hash and os.path.exists(path):
+                status[file_name] = 'skipped'
+                continue
+            tasks.append((file_name, kind, payload, path, fmt, spec_hash))
+
+        if tasks and max_workers == 1:
+            for file_name, kind, payload, path, fmt, spec_hash in tasks:
+                try:
+                    _render(kind, payload, path, fmt, scale)
+                    manifest[file_name] = spec_hash
+                    status[file_name] = 'rendered'
+                except Exception as e:
+                    status[file_name] = f'Fehler: {e}'
+        elif tasks:
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(tasks)), initializer=_init_worker) as executor:
+                futures = {executor.submit(_render, kind, payload, path, fmt, scale): (file_name, spec_hash)
+                           for file_name, kind, payload, path, fmt, spec_hash in tasks}
+                for future in as_completed(futures):
+                    file_name, spec_hash = futures[future]
+                    try:
+                        future.result()
+                        manifest[file_name] = spec_hash
+                        status[file_name] = 'rendered'
+                    except Exception as e:
+                        status[file_name] = f'Fehler: {e}'
+
+        # Manifest unter einem Lock neu lesen und ergänzen, damit parallele Exporte ins gleiche Verzeichnis keine Einträge verlieren
+        updates = {k: manifest[k] for k, v in status.items() if v == 'rendered'}
+        if updates:
+            with mypy_cache.file_lock(manifest_path):
+                manifest = _read_manifest(manifest_path)
+                manifest.update(updates)
+                tmp = f"{manifest_path}.{os.getpid()}.tmp"
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(manifest, f, indent=1, sort_keys=True)
+                os.replace(tmp, manifest_path)
+
+        n_rendered = sum(1 for v in status.values() if v == 'rendered')
+        n_skipped = sum(1 for v in status.values() if v == 'skipped')
+        print(f"export: {n_rendered} Grafiken gerendert, {n_skipped} unverändert, {len(status) - n_rendered - n_skipped} Fehler")
+        return status
+
+    except Exception as e:
+        print(f'Es ist ein Fehler aufgetreten: {str(e)}')
+        print("Error: %s" % e, file=sys.stderr)
+        print(file=sys.stderr)
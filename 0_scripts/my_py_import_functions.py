@@ -0,0 +1,32 @@
+import importlib
+import sys
+import types
+
+
+class _LazyModule(types.ModuleType):
+    # Platzhalter, der beim ersten Attributzugriff das eigentliche Modul importiert und sich danach wie dieses verhält
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+    def __dir__(self):
+        return dir(importlib.import_module(self.__name__))
+
+
+def lazy_import(name):
+    """
+    Diese Funktion importiert ein Modul verzögert. Zurückgegeben wird sofort ein Platzhalter, das eigentliche Laden passiert
+    erst beim ersten Zugriff auf ein Attribut (z.B. alt.Chart). Module, die nur für einzelne Funktionen gebraucht werden
+    (altair, plotly, seaborn, ...), kosten damit beim Import der Skripte keine Zeit.
+    Ist das Modul bereits geladen, wird es direkt zurückgegeben.
+
+    Parameter (zwingend):
+    - name (str): Name des Moduls, z.B. 'plotly.express'.
+
+    Rückgabe:
+    - module (module): Das Modul bzw. der Platzhalter.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return _LazyModule(name)
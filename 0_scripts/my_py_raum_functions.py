@@ -0,0 +1,245 @@
+import os
+import re
+import sys
+
+from my_py_import_functions import lazy_import
+import my_py_cache_functions as mypy_cache
+import my_py_snapshot_functions as mypy_snap
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+feather = lazy_import('pyarrow.feather')
+
+
+# Gebietsspalten der LOSD-Cubes von fein nach grob, mit der Ebene, welche die Spalte bezeichnet
+_HIERARCHIE = [('RAUM', None), ('QUARTIEREZH', 'quartier'), ('KREISEZH', 'kreis')]
+# Ebenen von grob nach fein, für die hierarchische Reihenfolge
+_EBENEN = ['kreis', 'quartier', 'zone', 'raum']
+_KREIS_NR = re.compile(r'Kreis (\d+)')
+
+
+def default_index_path():
+    """
+    Diese Funktion liefert den Pfad des Gebietsindex: losd/saved_data/raum_index.arrow.
+
+    Rückgabe:
+    - index_path (str): Pfad zum Index-File.
+    """
+    return os.path.join(mypy_snap.default_store_dir(), 'raum_index.arrow')
+
+
+def raum_sort(codes):
+    """
+    Diese Funktion liefert die Sortiernummer eines RAUM_CODE wie in den Notebooks (RAUM_CODE.str[-3:].astype(int)),
+    berechnet wird sie aber nur einmal pro verschiedenem Code.
+
+    Parameter (zwingend):
+    - codes (Series): Spalte mit den Codes, z.B. data['RAUM_CODE'].
+
+    Rückgabe:
+    - sort (Series): Sortiernummern.
+    """
+    cat = codes if isinstance(codes.dtype, pd.CategoricalDtype) else codes.astype('category')
+    sort = cat.cat.categories.astype(str).str[-3:].astype(int)
+    return pd.Series(sort.take(cat.cat.codes.to_numpy()), index=codes.index, name=codes.name)
+
+
+def _ebene_raum(present):
+    # Ebene der RAUM-Spalte: hat der Cube noch Quartiere darüber, sind es statistische Zonen
+    if 'QUARTIEREZH' in present:
+        return 'zone'
+    if 'KREISEZH' in present:
+        return 'quartier'
+    return 'raum'
+
+
+def build_raum_index(data):
+    """
+    Diese Funktion baut aus einem geladenen Cube die Gebietshierarchie, z.B. für od3241
+    statistische Zone (R3Z001) -> Quartier (R00011) -> Kreis (R10000).
+
+    Parameter (zwingend):
+    - data (DataFrame): Der Datensatz mit RAUM_CODE/RAUM_LANG und allfälligen QUARTIEREZH_*- und KREISEZH_*-Spalten.
+
+    Rückgabe:
+    - index (DataFrame): Eine Zeile pro Code mit lang, ebene und parent (Code der nächsthöheren Ebene).
+    """
+    present = [p for p, _ in _HIERARCHIE if f'{p}_CODE' in data.columns]
+    cols = [f'{p}_{s}' for p in present for s in ('CODE', 'LANG') if f'{p}_{s}' in data.columns]
+    pairs = data[cols].drop_duplicates()
+
+    parts = []
+    for i, p in enumerate(present):
+        parent = present[i + 1] if i + 1 < len(present) else None
+        part = pd.DataFrame({
+            'code': pairs[f'{p}_CODE'].astype(str).to_numpy(),
+            'lang': pairs[f'{p}_LANG'].astype(str).to_numpy() if f'{p}_LANG' in pairs.columns else None,
+            'ebene': dict(_HIERARCHIE)[p] or _ebene_raum(present),
+            'parent': pairs[f'{parent}_CODE'].astype(str).to_numpy() if parent else None,
+        })
+        parts.append(part.drop_duplicates('code', keep='last'))
+    return _finalize(pd.concat(parts, ignore_index=True))
+
+
+def _combine(index):
+    # Pro Code eine Zeile: bekannte Ebene vor 'raum', bekannter Parent vor keinem, sonst gewinnt der neuere Eintrag
+    index = index.assign(_rang=index['ebene'].map({'raum': 0}).fillna(1) + index['parent'].notna(), _pos=range(len(index)))
+    index = index.sort_values(['_rang', '_pos']).drop_duplicates('code', keep='last')
+    return index.drop(columns=['_rang', '_pos'])
+
+
+def _finalize(index):
+    # Sortiernummer, Vorfahren pro Ebene und hierarchische Reihenfolge für alle Codes auf einmal berechnen
+    index = _combine(index[['code', 'lang', 'ebene', 'parent']]).set_index('code')
+    codes = index.index.to_numpy()
+    ebenen = index['ebene'].to_numpy()
+
+    nr = index['lang'].astype(str).str.findall(_KREIS_NR).str[-1]
+    sort = pd.to_numeric(index.index.str[-3:], errors='coerce')
+    sort = np.where((ebenen == 'kreis') & nr.notna(), pd.to_numeric(nr, errors='coerce'), sort)
+    index['sort'] = pd.array(sort, dtype='Int64')
+
+    parent_pos = index.index.get_indexer(index['parent'].fillna(''))
+    for ebene in ('quartier', 'kreis'):
+        result = np.where(ebenen == ebene, codes, None)
+        pos = parent_pos
+        for _ in range(len(_HIERARCHIE)):
+            valid = pos >= 0
+            safe = np.where(valid, pos, 0)
+            hit = valid & pd.isna(result) & (ebenen[safe] == ebene)
+            result[hit] = codes[safe[hit]]
+            pos = np.where(valid, parent_pos[safe], -1)
+        index[ebene] = result
+
+    # Reihenfolge: Kreis, danach seine Quartiere, darunter deren Zonen, jeweils nach Sortiernummer
+    big = np.iinfo('int64').max
+    sort_of = pd.Series(index['sort'].astype('float64').to_numpy(), index=index.index)
+    kreis_sort = sort_of.reindex(index['kreis']).fillna(big).to_numpy()
+    quartier_sort = np.where(index['quartier'].isna(), -1, sort_of.reindex(index['quartier']).fillna(big).to_numpy())
+    rang = index['ebene'].map({e: i for i, e in enumerate(_EBENEN)}).to_numpy()
+    order = np.lexsort((codes, index['sort'].astype('float64').fillna(big).to_numpy(), rang, quartier_sort, kreis_sort))
+    index['order'] = pd.array(np.argsort(order), dtype='Int64')
+    return index.sort_values('order')
+
+
+def _same(left, right):
+    # Vergleich der Werte unabhängig vom Datentyp (nach dem Laden aus Arrow sind Strings z.B. nicht mehr object)
+    return bool((left.astype(object).fillna('').to_numpy() == right.astype(object).fillna('').to_numpy()).all())
+
+
+def load_raum_index(**kwargs):
+    """
+    Diese Funktion lädt den gespeicherten Gebietsindex.
+
+    Optionale Parameter:
+    - index_path (str): Pfad zum Index-File. Default: default_index_path()
+
+    Rückgabe:
+    - index (DataFrame): Der Index (leer, falls noch keiner gespeichert ist).
+    """
+    index_path = kwargs.get('index_path', None) or default_index_path()
+    if not os.path.exists(index_path):
+        return _finalize(pd.DataFrame({'code': [], 'lang': [], 'ebene': [], 'parent': []}, dtype=object))
+    return feather.read_table(index_path, memory_map=True).to_pandas().set_index('code')
+
+
+def update_raum_index(data, **kwargs):
+    """
+    Diese Funktion ergänzt den gespeicherten Gebietsindex um die Gebiete eines Cubes und speichert ihn, falls sich etwas geändert hat.
+    So wächst ein gemeinsamer Index über alle geladenen Datensätze (od3240, od3241, ...), statt dass jeder Datensatz
+    seine eigenen KREISEZH_*- und QUARTIEREZH_*-Spalten mitbringen muss.
+
+    Parameter (zwingend):
+    - data (DataFrame): Der Datensatz.
+
+    Optionale Parameter:
+    - index_path (str): Pfad zum Index-File. Default: default_index_path()
+
+    Rückgabe:
+    - index (DataFrame): Der ergänzte Index.
+    """
+    try:
+        index_path = kwargs.get('index_path', None) or default_index_path()
+
+        columns = ['lang', 'ebene', 'parent']
+        new = build_raum_index(data)
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        # Lesen, Ergänzen und Schreiben unter einem Lock, damit parallele Läufe (Batch-Runner) keinen Stand verlieren
+        with mypy_cache.file_lock(index_path):
+            current = load_raum_index(index_path=index_path)
+            merged = _finalize(pd.concat([current[columns], new[columns]]).reset_index())
+            if len(merged) == len(current) and _same(merged[columns], current[columns].reindex(merged.index)):
+                return current
+
+            tmp = f"{index_path}.{os.getpid()}.tmp"
+            feather.write_feather(merged.reset_index(), tmp, compression='uncompressed')
+            os.replace(tmp, index_path)
+        print(f"raum: Gebietsindex mit {len(merged):,.0f} Codes gespeichert ({len(merged) - len(current):+,.0f})")
+        return merged
+
+    except Exception as e:
+        print(f'Es ist ein Fehler aufgetreten: {str(e)}')
+        print("Error: %s" % e, file=sys.stderr)
+        print(file=sys.stderr)
+
+
+def raum_lookup(index, codes, field):
+    """
+    Diese Funktion schlägt für eine Spalte mit Codes ein Feld im Gebietsindex nach, z.B. den Kreis jeder statistischen Zone.
+    Nachgeschlagen wird nur einmal pro verschiedenem Code, danach wird über die Kategorien-Codes verteilt.
+
+    Parameter (zwingend):
+    - index (DataFrame): Der Gebietsindex.
+    - codes (Series): Spalte mit den Codes, z.B. data['RAUM_CODE'].
+    - field (str): 'lang', 'ebene', 'parent', 'sort', 'order', 'quartier' oder 'kreis'.
+
+    Rückgabe:
+    - values (Series): Die nachgeschlagenen Werte, für unbekannte Codes NaN.
+    """
+    cat = codes if isinstance(codes.dtype, pd.CategoricalDtype) else codes.astype('category')
+    pos = _positions(index, cat)
+    return pd.Series(index[field].array.take(pos, allow_fill=True), index=codes.index, name=field)
+
+
+def _positions(index, cat):
+    # Position jedes verschiedenen Codes im Index (einmal pro Kategorie), danach über die Kategorien-Codes auf die Zeilen verteilt.
+    # Das angehängte -1 steht für fehlende Werte (Kategorien-Code -1).
+    pos = np.append(index.index.get_indexer(cat.cat.categories.astype(str)), -1)
+    return pos[cat.cat.codes.to_numpy()]
+
+
+def add_raum_columns(data, index, **kwargs):
+    """
+    Diese Funktion ergänzt einen Datensatz über den Gebietsindex um übergeordnete Gebiete und eine einheitliche Sortierung,
+    z.B. für Rollups von statistischen Zonen auf Quartiere und Kreise ohne erneutes Joinen.
+
+    Parameter (zwingend):
+    - data (DataFrame): Der Datensatz.
+    - index (DataFrame): Der Gebietsindex aus update_raum_index() oder load_raum_index().
+
+    Optionale Parameter:
+    - code (str): Spalte mit den Codes. Default: 'RAUM_CODE'
+    - ebenen (list): Übergeordnete Ebenen, für die <EBENE>_CODE und <EBENE>_LANG ergänzt werden ('quartier' -> QUARTIEREZH_*, 'kreis' -> KREISEZH_*). Default: ['quartier', 'kreis']
+    - sort (bool): RAUM_my_sort und RAUM_order (hierarchische Reihenfolge) ergänzen? Default: True
+
+    Rückgabe:
+    - data (DataFrame): Kopie des Datensatzes mit den zusätzlichen Spalten.
+    """
+    code = kwargs.get('code', 'RAUM_CODE')
+    ebenen = kwargs.get('ebenen', ['quartier', 'kreis'])
+    sort = kwargs.get('sort', True)
+
+    prefix = {'quartier': 'QUARTIEREZH', 'kreis': 'KREISEZH'}
+    data = data.copy()
+    codes = data[code]
+    pos = _positions(index, codes if isinstance(codes.dtype, pd.CategoricalDtype) else codes.astype('category'))
+    # Zeile im Index -> Zeile des Vorfahren im Index, damit auch dessen Bezeichnung ohne weiteren Lookup pro Zeile verfügbar ist
+    for ebene in ebenen:
+        parent_pos = np.append(index.index.get_indexer(index[ebene].fillna('')), -1)[pos]
+        data[f'{prefix[ebene]}_CODE'] = index[ebene].array.take(pos, allow_fill=True)
+        data[f'{prefix[ebene]}_LANG'] = index['lang'].array.take(parent_pos, allow_fill=True)
+    if sort:
+        prefix_raum = code[:-len('_CODE')] if code.endswith('_CODE') else code
+        data[f'{prefix_raum}_my_sort'] = index['sort'].array.take(pos, allow_fill=True)
+        data[f'{prefix_raum}_order'] = index['order'].array.take(pos, allow_fill=True)
+    return data
@@ -0,0 +1,218 @@
+import datetime
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+from my_py_import_functions import lazy_import
+import my_py_cache_functions as mypy_cache
+import my_py_dataloading_functions as mypy_dl
+
+pd = lazy_import('pandas')
+feather = lazy_import('pyarrow.feather')
+
+
+def default_store_dir():
+    """
+    Diese Funktion liefert das Standardverzeichnis des Snapshot-Stores: losd/saved_data im geklonten Repository.
+
+    Rückgabe:
+    - store_dir (str): Pfad zum Snapshot-Verzeichnis.
+    """
+    return os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'losd', 'saved_data'))
+
+
+def _manifest_path(store_dir):
+    return os.path.join(store_dir, 'manifest.json')
+
+
+def _read_manifest(store_dir):
+    try:
+        with open(_manifest_path(store_dir), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def _replace_file(tmp, path):
+    # mkstemp legt Files nur für den Besitzer lesbar an, im Repo sollen sie normale Rechte haben
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(tmp, 0o666 & ~umask)
+    os.replace(tmp, path)
+
+
+def _write_manifest(store_dir, manifest):
+    fd, tmp = tempfile.mkstemp(dir=store_dir, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
+    _replace_file(tmp, _manifest_path(store_dir))
+
+
+def schema_hash(data):
+    """
+    Diese Funktion berechnet einen Hash über die Spaltennamen und Datentypen eines DataFrames.
+
+    Parameter (zwingend):
+    - data (DataFrame): Der Datensatz.
+
+    Rückgabe:
+    - hash (str): sha256 als Hex-String.
+    """
+    schema = [[str(col), str(dtype)] for col, dtype in data.dtypes.items()]
+    return hashlib.sha256(json.dumps(schema).encode('utf-8')).hexdigest()
+
+
+def content_hash(data):
+    """
+    Diese Funktion berechnet einen Hash über den Inhalt eines DataFrames (Werte, Spaltennamen und Index).
+    Zwei Datensätze mit den gleichen Werten ergeben den gleichen Hash, unabhängig davon ob eine Spalte als Text oder als category gespeichert ist.
+
+    Parameter (zwingend):
+    - data (DataFrame): Der Datensatz.
+
+    Rückgabe:
+    - hash (str): sha256 als Hex-String.
+    """
+    sha = hashlib.sha256()
+    sha.update(json.dumps([str(col) for col in data.columns]).encode('utf-8'))
+    sha.update(pd.util.hash_pandas_object(data, index=True, categorize=True).to_numpy().tobytes())
+    return sha.hexdigest()
+
+
+def save_snapshot(data, package_name, **kwargs):
+    """
+    Diese Funktion legt einen geprüften Datensatz als spaltenorientierten Snapshot (Arrow IPC / Feather) im Snapshot-Store ab.
+    Dimensionen werden als category gespeichert und damit im File dictionary-encoded.
+    Im Manifest (manifest.json) werden Package, Datum, Anzahl Zeilen, Schema-Hash und Inhalts-Hash festgehalten.
+    Ist ein inhaltlich identischer Snapshot des gleichen Packages bereits vorhanden, wird kein neues File geschrieben, sondern nur ein Manifest-Eintrag auf das bestehende File.
+
+    Parameter (zwingend):
+    - data (DataFrame): Der Datensatz, der gespeichert werden soll.
+    - package_name (str): Name des Packages, z.B. 'bau502od5022'.
+
+    Optionale Parameter:
+    - datum (str): Datum des Snapshots im Format 'JJJJ-MM-TT'. Default: heute
+    - store_dir (str): Verzeichnis des Snapshot-Stores. Default: losd/saved_data
+    - compression (str): 'uncompressed', 'lz4' oder 'zstd'. Nur unkomprimierte Files können ohne Kopie (memory-mapped) gelesen werden. Default: 'uncompressed'
+    - losd_dtypes (bool): Datentypen vor dem Speichern mit optimize_losd_dtypes optimieren? Default: True
+
+    Rückgabe:
+    - entry (dict): Der Manifest-Eintrag des Snapshots.
+    """
+    try:
+        datum = kwargs.get('datum', datetime.date.today().strftime("%Y-%m-%d"))
+        store_dir = kwargs.get('store_dir', None) or default_store_dir()
+        compression = kwargs.get('compression', 'uncompressed')
+        losd_dtypes = kwargs.get('losd_dtypes', True)
+
+        os.makedirs(store_dir, exist_ok=True)
+        if losd_dtypes:
+            data = mypy_dl.optimize_losd_dtypes(data)
+
+        c_hash = content_hash(data)
+        s_hash = schema_hash(data)
+        manifest = _read_manifest(store_dir)
+
+        file_name = None
+        for entry in manifest:
+            if entry['package'] == package_name and entry['content_hash'] == c_hash and os.path.exists(os.path.join(store_dir, entry['file'])):
+                file_name = entry['file']
+                break
+
+        if file_name is None:
+            file_name = f"{package_name}_{c_hash[:16]}.arrow"
+            fd, tmp = tempfile.mkstemp(dir=store_dir, suffix='.tmp')
+            os.close(fd)
+            feather.write_feather(data, tmp, compression=compression)
+            _replace_file(tmp, os.path.join(store_dir, file_name))
+            print(f"snapshot: {file_name} geschrieben")
+        else:
+            print(f"snapshot: Inhalt unverändert, verwende {file_name}")
+
+        entry = {
+            'package': package_name,
+            'datum': datum,
+            'rows': int(data.shape[0]),
+            'columns': int(data.shape[1]),
+            'schema_hash': s_hash,
+            'content_hash': c_hash,
+            'file': file_name,
+        }
+        # Lesen, Ergänzen und Schreiben unter einem Lock, damit parallele Prozesse (z.B. im Batch-Runner) keine Einträge verlieren
+        with mypy_cache.file_lock(_manifest_path(store_dir)):
+            manifest = _read_manifest(store_dir)
+            manifest = [e for e in manifest if not (e['package'] == package_name and e['datum'] == datum)]
+            manifest.append(entry)
+            manifest.sort(key=lambda e: (e['package'], e['datum']))
+            _write_manifest(store_dir, manifest)
+
+        return entry
+
+    except Exception as e:
+        print(f'Es ist ein Fehler aufgetreten: {str(e)}')
+        print("Error: %s" % e, file=sys.stderr)
+        print(file=sys.stderr)
+
+
+def list_snapshots(package_name=None, **kwargs):
+    """
+    Diese Funktion listet die Snapshots aus dem Manifest auf.
+
+    Optionale Parameter:
+    - package_name (str): Nur Snapshots dieses Packages anzeigen. Default: None (alle)
+    - store_dir (str): Verzeichnis des Snapshot-Stores. Default: losd/saved_data
+
+    Rückgabe:
+    - snapshots (DataFrame): Eine Zeile pro Snapshot, sortiert nach Package und Datum.
+    """
+    store_dir = kwargs.get('store_dir', None) or default_store_dir()
+    manifest = _read_manifest(store_dir)
+    snapshots = pd.DataFrame(manifest, columns=['package', 'datum', 'rows', 'columns', 'schema_hash', 'content_hash', 'file'])
+    if package_name is not None:
+        snapshots = snapshots[snapshots['package'] == package_name]
+    return snapshots.reset_index(drop=True)
+
+
+def load_snapshot(package_name, **kwargs):
+    """
+    Diese Funktion lädt einen Snapshot aus dem Snapshot-Store. Unkomprimierte Files werden memory-mapped gelesen,
+    die Daten werden also nicht zuerst in den Speicher kopiert.
+
+    Parameter (zwingend):
+    - package_name (str): Name des Packages, z.B. 'bau502od5022'.
+
+    Optionale Parameter:
+    - datum (str): Datum des Snapshots ('JJJJ-MM-TT'). Default: None (neuester Snapshot)
+    - offset (int): 0 = neuester, 1 = zweitneuester Snapshot usw. Wird nur verwendet, wenn kein datum angegeben ist. Default: 0
+    - store_dir (str): Verzeichnis des Snapshot-Stores. Default: losd/saved_data
+    - as_arrow (bool): pyarrow.Table statt DataFrame zurückgeben (ohne jede Kopie). Default: False
+
+    Rückgabe:
+    - data (DataFrame oder pyarrow.Table): Der gespeicherte Datensatz.
+    """
+    try:
+        datum = kwargs.get('datum', None)
+        offset = kwargs.get('offset', 0)
+        store_dir = kwargs.get('store_dir', None) or default_store_dir()
+        as_arrow = kwargs.get('as_arrow', False)
+
+        entries = [e for e in _read_manifest(store_dir) if e['package'] == package_name]
+        if datum is not None:
+            entries = [e for e in entries if e['datum'] == datum]
+        if not entries:
+            raise ValueError(f"Kein Snapshot für {package_name} {datum or ''} gefunden")
+        entries.sort(key=lambda e: e['datum'], reverse=True)
+        entry = entries[offset]
+
+        table = feather.read_table(os.path.join(store_dir, entry['file']), memory_map=True)
+        print(f"snapshot: {entry['file']} ({entry['datum']}, {entry['rows']:,.0f} Zeilen)")
+        if as_arrow:
+            return table
+        return table.to_pandas()
+
+    except Exception as e:
+        print(f'Es ist ein Fehler aufgetreten: {str(e)}')
+        print("Error: %s" % e, file=sys.stderr)
+        print(file=sys.stderr)
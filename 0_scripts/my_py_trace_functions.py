@@ -0,0 +1,245 @@
+import functools
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+
+from my_py_import_functions import lazy_import
+
+pd = lazy_import('pandas')
+
+try:
+    import resource
+except ImportError:  # Windows (Dropzone-Rechner)
+    resource = None
+
+
+# Ausgeschaltet kostet ein Aufruf von phase() bzw. einer mit traced() dekorierten Funktion nur eine Abfrage dieses Flags
+_enabled = os.environ.get('LOSD_TRACE', '') not in ('', '0')
+_records = []
+_local = threading.local()
+_sequence = itertools.count()
+
+
+def _peak_rss_mb():
+    # Maximales RSS des Prozesses, unter Linux in KB, unter macOS in Bytes
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+class _NullPhase:
+    # Wird zurückgegeben, wenn das Tracing ausgeschaltet ist
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **info):
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    def __init__(self, name, info):
+        self.name = name
+        self.info = info
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        # next() auf itertools.count ist atomar, die Nummern bleiben also auch bei mehreren Threads eindeutig
+        self.seq = next(_sequence)
+        self.call = stack[-1].call if stack else f'{self.name}#{self.seq}'
+        self.depth = len(stack)
+        stack.append(self)
+        self.rss = _peak_rss_mb()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        rss = _peak_rss_mb()
+        _local.stack.pop()
+        record = {
+            '_seq': self.seq,
+            'call': self.call,
+            'phase': self.name,
+            'depth': self.depth,
+            'seconds': seconds,
+            'bytes': None,
+            'rows': None,
+            'columns': None,
+            'rss_peak_delta_mb': rss - self.rss if rss is not None else None,
+        }
+        record.update(self.info)
+        if exc_type is not None:
+            record['error'] = str(exc)
+        _records.append(record)
+        return False
+
+    def set(self, **info):
+        self.info.update(info)
+
+
+def enable(reset=True):
+    """
+    Diese Funktion schaltet das Tracing von load_data und den plot_*-Funktionen ein.
+    Alternativ kann vor dem Import die Umgebungsvariable LOSD_TRACE=1 gesetzt werden.
+
+    Optionale Parameter:
+    - reset (bool): Bisher gesammelte Messungen löschen? Default: True
+    """
+    global _enabled
+    if reset:
+        reset_trace()
+    _enabled = True
+
+
+def disable():
+    """
+    Diese Funktion schaltet das Tracing aus. Die gesammelten Messungen bleiben erhalten.
+    """
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    """
+    Diese Funktion gibt an, ob das Tracing eingeschaltet ist.
+
+    Rückgabe:
+    - enabled (bool)
+    """
+    return _enabled
+
+
+def reset_trace():
+    """
+    Diese Funktion löscht alle gesammelten Messungen.
+    """
+    del _records[:]
+
+
+def phase(name, **info):
+    """
+    Diese Funktion misst einen Abschnitt als Context Manager: Dauer, Zunahme des maximalen RSS und frei wählbare Angaben
+    wie bytes, rows oder columns, die auch erst im Abschnitt mit .set() ergänzt werden können:
+
+        with mypy_trace.phase('read_csv') as p:
+            data = pd.read_csv(...)
+            p.set(rows=len(data), columns=data.shape[1])
+
+    Ist das Tracing ausgeschaltet, wird ein leerer Context Manager zurückgegeben und nichts gemessen.
+
+    Parameter (zwingend):
+    - name (str): Name des Abschnitts, z.B. 'download'.
+
+    Optionale Parameter:
+    - beliebige Angaben (z.B. bytes=..., rows=...), die in die Messung übernommen werden.
+
+    Rückgabe:
+    - phase (Context Manager): Mit der Methode set(**info).
+    """
+    if not _enabled:
+        return _NULL_PHASE
+    return _Phase(name, info)
+
+
+def record(name, seconds, **info):
+    """
+    Diese Funktion trägt eine bereits gemessene Dauer als Abschnitt ein, z.B. die Zeit bis zu den HTTP-Headern aus response.elapsed.
+
+    Parameter (zwingend):
+    - name (str): Name des Abschnitts.
+    - seconds (num): Dauer in Sekunden.
+
+    Optionale Parameter:
+    - beliebige Angaben (z.B. bytes=...).
+    """
+    if not _enabled:
+        return
+    stack = getattr(_local, 'stack', None) or []
+    entry = {'_seq': next(_sequence), 'call': stack[-1].call if stack else name, 'phase': name, 'depth': len(stack),
+             'seconds': seconds, 'bytes': None, 'rows': None, 'columns': None, 'rss_peak_delta_mb': None}
+    entry.update(info)
+    _records.append(entry)
+
+
+def traced(name=None):
+    """
+    Dieser Decorator misst jeden Aufruf einer Funktion als Abschnitt. Die Abschnitte innerhalb der Funktion werden dem Aufruf zugeordnet.
+
+    Optionale Parameter:
+    - name (str): Name des Abschnitts. Default: Name der Funktion
+    """
+    def decorator(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Phase(label, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_report():
+    """
+    Diese Funktion liefert die gesammelten Messungen als Tabelle, in der Reihenfolge, in der die Abschnitte begonnen haben.
+
+    Rückgabe:
+    - report (DataFrame): Eine Zeile pro Abschnitt mit call, phase, depth, seconds, bytes, rows, columns, rss_peak_delta_mb
+      und allfälligen weiteren Angaben.
+    """
+    report = pd.DataFrame(list(_records))
+    if report.empty:
+        return report
+    # Ein Abschnitt wird erst an seinem Ende eingetragen, angezeigt wird er an seinem Beginn
+    report = report.sort_values('_seq').drop(columns=['_seq']).reset_index(drop=True)
+    for col in report.columns:
+        values = report[col].dropna()
+        if col != 'seconds' and len(values) and pd.api.types.is_numeric_dtype(values) and (values % 1 == 0).all():
+            report[col] = report[col].astype('Int64')
+    return report
+
+
+def print_trace():
+    """
+    Diese Funktion gibt die gesammelten Messungen als eingerückte Tabelle aus.
+    """
+    report = trace_report()
+    if report.empty:
+        print("trace: keine Messungen (mypy_trace.enable() aufrufen)")
+        return
+    shown = report.copy()
+    phases = ['  ' * d + p for d, p in zip(shown['depth'], shown['phase'])]
+    width = max(len(p) for p in phases)
+    shown['phase'] = [p.ljust(width) for p in phases]
+    shown = shown.drop(columns=['depth'])
+    with pd.option_context('display.max_columns', None, 'display.width', 200, 'display.float_format', '{:,.4f}'.format):
+        print(shown.to_string(index=False))
+
+
+def export_trace(path):
+    """
+    Diese Funktion speichert die gesammelten Messungen als JSON oder CSV (je nach Endung).
+
+    Parameter (zwingend):
+    - path (str): Zielfile, z.B. 'trace.json' oder 'trace.csv'.
+    """
+    if path.endswith('.csv'):
+        trace_report().to_csv(path, index=False)
+    else:
+        records = sorted(_records, key=lambda r: r['_seq'])
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump([{k: v for k, v in r.items() if k != '_seq'} for r in records], f, indent=1, default=str)
@@ -0,0 +1,69 @@
+import glob
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAVED_DATA = os.path.join(SCRIPTS_DIR, '..', 'losd', 'saved_data')
+sys.path.insert(0, SCRIPTS_DIR)
+
+
+@pytest.fixture
+def saved_data():
+    # Lädt eine Fixture aus losd/saved_data über den Package-Namen, z.B. saved_data('bev324od3241')
+    def load(package_name):
+        path = glob.glob(os.path.join(SAVED_DATA, f'{package_name}_*.csv'))[0]
+        return pd.read_csv(path)
+    return load
+
+
+class StubResponse:
+    # Minimaler Ersatz für requests.Response mit den Attributen, welche die Download-Funktionen verwenden
+    def __init__(self, status_code, body=b'', headers=None):
+        import datetime
+        import requests
+        self.status_code = status_code
+        self.headers = requests.structures.CaseInsensitiveDict(headers or {})
+        self.body = body
+        self.elapsed = datetime.timedelta(0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        pass
+
+    def raise_for_status(self):
+        import requests
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code}', response=self)
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+
+class StubSession:
+    # Gibt die vorbereiteten Antworten der Reihe nach zurück und merkt sich die Request-Header
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append(dict(headers or {}))
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def stub_session():
+    return StubSession
+
+
+@pytest.fixture
+def stub_response():
+    return StubResponse
@@ -0,0 +1,64 @@
+import json
+import os
+import sys
+
+import pytest
+
+import my_py_batch_runner as mypy_batch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmark'))
+import losd_standin  # noqa: E402
+
+
+@pytest.fixture
+def ld(tmp_path, saved_data):
+    losd_standin.write_fixture(str(tmp_path / 'www'), 'bev324od3240', 'bev324od3240.csv', saved_data('bev324od3240'))
+    server, base_url = losd_standin.start(str(tmp_path / 'www'))
+    yield base_url
+    server.shutdown()
+
+
+def _spec(base_url, package_name='bev324od3240'):
+    return {'name': package_name, 'measures': ['BEW'], 'chart_dims': ['KREISEZH_LANG'],
+            'load': {'status': 'int', 'data_source': 'ld', 'package_name': package_name, 'dataset_name': package_name,
+                     'datums_attr': ['ZEIT_LANG'], 'ld_integ_url': f'{base_url}/statistics/view/'}}
+
+
+def _settings(tmp_path, **extra):
+    return {'cache_dir': str(tmp_path / 'cache'), 'out_dir': str(tmp_path / 'out'), 'store_dir': str(tmp_path / 'store'),
+            'datum': '2024-06-26', **extra}
+
+
+def test_run_dataset(ld, tmp_path, saved_data):
+    spec = _spec(ld)
+    spec['reference'] = {'status': 'int', 'data_source': 'ld', 'package_name': 'bev324od3240', 'dataset_name': 'bev324od3240',
+                         'datums_attr': ['ZEIT_LANG'], 'ld_integ_url': f'{ld}/statistics/view/',
+                         'reconcile_keys': ['ZEIT_LANG', 'RAUM_CODE'], 'reconcile_measures': ['BEW']}
+    summary = mypy_batch.run_dataset(spec, _settings(tmp_path))
+    assert summary['status'] == 'ok', summary.get('error')
+    expected = saved_data('bev324od3240')
+    assert summary['rows'] == len(expected)
+    assert summary['max_jahr'] == expected['Jahr'].max()
+    assert summary['charts_rendered'] == 2
+    assert summary['reconcile_ok']
+    assert os.path.exists(tmp_path / 'store' / summary['snapshot'])
+    assert os.path.exists(tmp_path / 'store' / 'raum_index.arrow')
+
+    again = mypy_batch.run_dataset(spec, _settings(tmp_path))
+    assert (again['charts_rendered'], again['charts_skipped']) == (0, 2)
+
+
+def test_failed_dataset_is_reported(ld, tmp_path):
+    summary = mypy_batch.run_dataset(_spec(ld, 'gibtesnicht'), _settings(tmp_path, charts=False, snapshot=False))
+    assert summary['status'] == 'error'
+    assert summary['error']
+
+
+def test_main_exit_code(ld, tmp_path):
+    config = {'max_workers': 2, 'charts': False, 'snapshot': False, 'datasets': [_spec(ld), _spec(ld, 'gibtesnicht')],
+              **{k: v for k, v in _settings(tmp_path).items() if k != 'datum'}}
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps(config), encoding='utf-8')
+    assert mypy_batch.main([str(path), '--only', 'bev324od3240', '--report', str(tmp_path / 'report.json')]) == 0
+    assert json.loads((tmp_path / 'report.json').read_text(encoding='utf-8'))[0]['status'] == 'ok'
+    assert mypy_batch.main([str(path)]) == 1
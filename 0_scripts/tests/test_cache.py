@@ -0,0 +1,69 @@
+import gzip
+import os
+
+import pytest
+import requests
+
+import my_py_cache_functions as mypy_cache
+
+URL = 'https://example.org/od5022.csv'
+BODY = b'Jahr,WHG\n2023,1\n2024,2\n'
+
+
+def _get(cache_dir, session):
+    return mypy_cache.cached_download(URL, cache_dir=str(cache_dir), session=session)
+
+
+def test_revalidation_uses_cached_object(tmp_path, stub_session, stub_response):
+    session = stub_session(stub_response(200, BODY, {'ETag': '"v1"', 'Last-Modified': 'Thu, 04 Jul 2024 00:00:00 GMT'}),
+                           stub_response(304))
+    first = _get(tmp_path, session)
+    second = _get(tmp_path, session)
+    assert first == second
+    with gzip.open(second, 'rb') as f:
+        assert f.read() == BODY
+    assert session.requests[0] == {}
+    assert session.requests[1] == {'If-None-Match': '"v1"', 'If-Modified-Since': 'Thu, 04 Jul 2024 00:00:00 GMT'}
+
+
+def test_changed_file_is_downloaded_again(tmp_path, stub_session, stub_response):
+    session = stub_session(stub_response(200, BODY, {'ETag': '"v1"'}), stub_response(200, BODY + b'2025,3\n', {'ETag': '"v2"'}))
+    first = _get(tmp_path, session)
+    second = _get(tmp_path, session)
+    assert first != second
+    with gzip.open(second, 'rb') as f:
+        assert f.read().endswith(b'2025,3\n')
+
+
+def test_evicted_object_is_not_revalidated(tmp_path, stub_session, stub_response):
+    session = stub_session(stub_response(200, BODY, {'ETag': '"v1"'}), stub_response(200, BODY, {'ETag': '"v1"'}))
+    os.remove(_get(tmp_path, session))
+    path = _get(tmp_path, session)
+    assert session.requests[1] == {}
+    with gzip.open(path, 'rb') as f:
+        assert f.read() == BODY
+
+
+def test_304_after_eviction_retries_unconditionally(tmp_path, stub_session, stub_response, monkeypatch):
+    session = stub_session(stub_response(200, BODY, {'ETag': '"v1"'}), stub_response(304), stub_response(200, BODY, {'ETag': '"v1"'}))
+    object_path = _get(tmp_path, session)
+    # Das Objekt verschwindet zwischen der Prüfung im Cache und der Antwort des Servers (paralleles cache_evict)
+    original = session.get
+
+    def get_and_evict(url, headers=None, **kwargs):
+        if headers and os.path.exists(object_path):
+            os.remove(object_path)
+        return original(url, headers=headers, **kwargs)
+
+    monkeypatch.setattr(session, 'get', get_and_evict)
+    path = _get(tmp_path, session)
+    assert session.requests[1] == {'If-None-Match': '"v1"'}
+    assert session.requests[2] == {}
+    with gzip.open(path, 'rb') as f:
+        assert f.read() == BODY
+
+
+def test_unconditional_304_raises(tmp_path, stub_session, stub_response):
+    with pytest.raises(requests.HTTPError):
+        _get(tmp_path, stub_session(stub_response(304)))
+    assert not (tmp_path / 'objects').exists()
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import my_py_datacheck_functions as mypy_dc
+
+
+def _series(dates, n_series=2):
+    rng = np.random.default_rng(0)
+    rows = []
+    for s in range(n_series):
+        for i, d in enumerate(dates):
+            rows.append({'RAUM_CODE': f'R{s}', 'ZEIT_LANG': d, 'BEW': 1000 + 10 * i + rng.normal()})
+    return pd.DataFrame(rows)
+
+
+def _counts(result):
+    return result['pruefung'].value_counts().to_dict()
+
+
+@pytest.mark.parametrize('freq', ['QE', '6ME'])
+def test_regular_steps_have_no_gaps(freq):
+    data = _series(pd.date_range('2019-03-31', periods=20, freq=freq).strftime('%Y-%m-%d'))
+    result = mypy_dc.check_timeseries(data, ['RAUM_CODE'], ['BEW'], zeit='ZEIT_LANG')
+    assert 'fehlende_perioden' not in _counts(result)
+
+
+@pytest.mark.parametrize('freq, drop, missing', [('QE', 7, 1), ('6ME', 4, 1)])
+def test_real_gap_is_found(freq, drop, missing):
+    dates = pd.date_range('2019-03-31', periods=20, freq=freq).strftime('%Y-%m-%d')
+    data = _series(dates)
+    data = data[~((data['RAUM_CODE'] == 'R0') & (data['ZEIT_LANG'] == dates[drop]))]
+    result = mypy_dc.check_timeseries(data, ['RAUM_CODE'], ['BEW'], zeit='ZEIT_LANG')
+    gaps = result[result['pruefung'] == 'fehlende_perioden']
+    assert len(gaps) == 1
+    assert gaps['RAUM_CODE'].iloc[0] == 'R0'
+    assert gaps['n_fehlend'].iloc[0] == missing
+
+
+def test_duplicate_end_and_jump():
+    data = _series(pd.date_range('2000-12-31', periods=20, freq='YE').strftime('%Y-%m-%d'), n_series=3)
+    data.loc[(data['RAUM_CODE'] == 'R1') & (data['ZEIT_LANG'] == '2010-12-31'), 'BEW'] += 500
+    data = data[~((data['RAUM_CODE'] == 'R2') & (data['ZEIT_LANG'] == '2019-12-31'))]
+    data = pd.concat([data, data.iloc[[0]]], ignore_index=True)
+    result = mypy_dc.check_timeseries(data, ['RAUM_CODE'], ['BEW'], zeit='ZEIT_LANG')
+    assert list(result['pruefung'].iloc[:2]) == ['doppelter_stichtag', 'fehlt_am_ende']
+    jumps = result[result['pruefung'] == 'sprung']
+    assert set(jumps['RAUM_CODE']) == {'R1'}
+    assert jumps['score'].is_monotonic_decreasing
+
+
+def test_missing_stichtag_is_reported_without_warning(recwarn):
+    data = _series(pd.date_range('2000-12-31', periods=10, freq='YE').strftime('%Y-%m-%d'))
+    data.loc[3, 'ZEIT_LANG'] = None
+    result = mypy_dc.check_timeseries(data, ['RAUM_CODE'], ['BEW'], zeit='ZEIT_LANG')
+    assert _counts(result).get('fehlender_stichtag') == 1
+    assert _counts(result).get('fehlende_perioden') == 1
+    assert not [w for w in recwarn if issubclass(w.category, RuntimeWarning)]
+
+
+def test_fixture_has_no_structural_findings(saved_data):
+    data = saved_data('bev324od3241')
+    result = mypy_dc.check_timeseries(data, ['RAUM_CODE'], ['BEW'], zeit='ZEIT_LANG')
+    assert not set(_counts(result)) & {'fehlender_stichtag', 'doppelter_stichtag', 'fehlende_perioden'}
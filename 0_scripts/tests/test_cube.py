@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+
+import my_py_cube_functions as mypy_cube
+
+DIMS = ['StichtagDatJahr', 'Jahr', 'QUARTIEREZH_LANG', 'KREISEZH_LANG']
+
+
+@pytest.fixture
+def bevoelkerung(saved_data):
+    data = saved_data('bev324od3241')
+    data['StichtagDatJahr'] = pd.to_datetime(data['StichtagDatJahr'])
+    return data
+
+
+def _expected(data, by, aggs):
+    named = {f'{agg}_BEW': ('BEW', agg) for agg in aggs}
+    return data.groupby(by, observed=True).agg(**named)
+
+
+def _compare(result, expected):
+    result = result.reset_index().sort_values(list(expected.index.names)).reset_index(drop=True)
+    expected = expected.reset_index().sort_values(list(expected.index.names)).reset_index(drop=True)
+    pd.testing.assert_frame_equal(result[expected.columns], expected, check_dtype=False)
+
+
+@pytest.mark.parametrize('by', [['Jahr'], ['KREISEZH_LANG'], ['StichtagDatJahr', 'KREISEZH_LANG'], ['QUARTIEREZH_LANG', 'Jahr']])
+def test_rollup_matches_groupby(bevoelkerung, by):
+    cube = mypy_cube.build_cube(bevoelkerung, DIMS, ['BEW'])
+    aggs = ['sum', 'count', 'min', 'max', 'mean']
+    _compare(mypy_cube.rollup(cube, by, aggs=aggs), _expected(bevoelkerung, by, aggs))
+
+
+def test_rollup_from_cached_coarser_aggregate(bevoelkerung):
+    cube = mypy_cube.build_cube(bevoelkerung, DIMS, ['BEW'])
+    mypy_cube.rollup(cube, ['StichtagDatJahr', 'KREISEZH_LANG'])
+    # Wird aus dem gecachten Aggregat nach StichtagDatJahr und KREISEZH_LANG abgeleitet
+    _compare(mypy_cube.rollup(cube, ['KREISEZH_LANG']), _expected(bevoelkerung, ['KREISEZH_LANG'], ['sum']))
+
+
+def test_rollup_date_slice(bevoelkerung):
+    cube = mypy_cube.build_cube(bevoelkerung, DIMS, ['BEW'])
+    sliced = bevoelkerung[(bevoelkerung['StichtagDatJahr'] >= '2010-01-01') & (bevoelkerung['StichtagDatJahr'] <= '2015-12-31')]
+    _compare(mypy_cube.rollup(cube, ['KREISEZH_LANG'], date_from='2010', date_to='2015'),
+             _expected(sliced, ['KREISEZH_LANG'], ['sum']))
+
+
+def test_unknown_dimension_raises(bevoelkerung):
+    cube = mypy_cube.build_cube(bevoelkerung, DIMS, ['BEW'])
+    with pytest.raises(ValueError):
+        mypy_cube.rollup(cube, ['SEX_LANG'])
+
+
+def test_chunked_matches_build_cube(bevoelkerung):
+    chunks = [bevoelkerung.iloc[i:i + 5000] for i in range(0, len(bevoelkerung), 5000)]
+    cube = mypy_cube.build_cube_chunked(iter(chunks), DIMS, ['BEW'])
+    by = ['StichtagDatJahr', 'KREISEZH_LANG']
+    _compare(mypy_cube.rollup(cube, by, aggs=['sum', 'min', 'max', 'mean']), _expected(bevoelkerung, by, ['sum', 'min', 'max', 'mean']))
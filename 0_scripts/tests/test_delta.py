@@ -0,0 +1,69 @@
+import pandas as pd
+import pyarrow.feather as feather
+import pytest
+
+import my_py_dataloading_functions as mypy_dl
+import my_py_delta_functions as mypy_delta
+
+KEYS = ['ZEIT_CODE', 'RAUM_CODE', 'ZIM_CODE', 'ARA_CODE', 'PST_CODE']
+MEASURES = ['WHG']
+
+
+@pytest.fixture
+def wohnungen(saved_data):
+    return saved_data('bau502od5022')[KEYS + MEASURES + ['ZEIT_LANG']]
+
+
+def _delta(data, tmp_path, **kwargs):
+    return mypy_delta.detect_delta(data, 'bau502od5022', KEYS, MEASURES, index_dir=str(tmp_path), **kwargs)
+
+
+def test_first_run_inserts_everything(wohnungen, tmp_path):
+    delta = _delta(wohnungen, tmp_path)
+    assert delta['n_inserted'] == len(wohnungen)
+    assert delta['n_deleted'] == delta['n_changed'] == delta['n_unchanged'] == 0
+
+
+def test_inserted_deleted_changed(wohnungen, tmp_path):
+    _delta(wohnungen, tmp_path)
+    new = wohnungen.drop(index=[0, 1]).copy()
+    new.loc[2, 'WHG'] = new.loc[2, 'WHG'] + 1
+    extra = wohnungen.loc[[3]].assign(ZEIT_CODE='Z31122030')
+    new = pd.concat([new, extra], ignore_index=True)
+    delta = _delta(new, tmp_path)
+    assert (delta['n_inserted'], delta['n_deleted'], delta['n_changed']) == (1, 2, 1)
+    assert delta['n_unchanged'] == len(wohnungen) - 3
+    assert delta['changed']['WHG_alt'].iloc[0] == wohnungen.loc[2, 'WHG']
+    assert 'Z31122030' in delta['affected_zeit']
+
+
+def test_hash_independent_of_dtypes(wohnungen, tmp_path):
+    _delta(wohnungen, tmp_path)
+    # Gleicher Stand, aber mit kompakten Datentypen und ZEIT_CODE als Datum geladen
+    compact = wohnungen.astype({c: 'category' for c in KEYS[1:]}).astype({'WHG': 'float32'})
+    compact['ZEIT_CODE'] = mypy_dl.parse_zeit_code(compact['ZEIT_CODE'])
+    delta = _delta(compact, tmp_path)
+    assert delta['n_unchanged'] == len(wohnungen)
+
+
+def test_old_index_format_is_migrated(wohnungen, tmp_path):
+    _delta(wohnungen, tmp_path)
+    path = mypy_delta._index_path(str(tmp_path), 'bau502od5022')
+    table = feather.read_table(path)
+    meta = dict(table.schema.metadata)
+    meta[b'delta_format'] = b'0'
+    # Ein Index im alten Format: andere Hashes, gleiche Schlüssel und Kennzahlen
+    table = table.replace_schema_metadata(meta).set_column(table.schema.get_field_index('key_hash'), 'key_hash',
+                                                              table['value_hash'])
+    feather.write_feather(table, path)
+    delta = _delta(wohnungen, tmp_path)
+    assert delta['n_unchanged'] == len(wohnungen)
+    assert feather.read_table(path).schema.metadata[b'delta_format'] == mypy_delta._INDEX_FORMAT.encode()
+
+
+def test_index_without_key_columns_needs_previous(wohnungen, tmp_path):
+    _delta(wohnungen, tmp_path)
+    other_keys = KEYS + ['ZEIT_LANG']
+    assert mypy_delta.detect_delta(wohnungen, 'bau502od5022', ['KREIS_CODE'], MEASURES, index_dir=str(tmp_path)) is None
+    delta = mypy_delta.detect_delta(wohnungen, 'bau502od5022', other_keys, MEASURES, index_dir=str(tmp_path), previous=wohnungen)
+    assert delta['n_unchanged'] == len(wohnungen)
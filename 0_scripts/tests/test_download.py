@@ -0,0 +1,63 @@
+import os
+import sys
+
+import pytest
+
+import my_py_download_functions as mypy_dl
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmark'))
+import losd_standin  # noqa: E402
+
+
+@pytest.fixture
+def standin(tmp_path, saved_data):
+    # Startet den Ersatz-Server mit den gewünschten Optionen, die Antworten sind die Bytes des CKAN-Files
+    paths = losd_standin.write_fixture(str(tmp_path / 'www'), 'bau502od5022', 'bau502od5022.csv', saved_data('bau502od5022'))
+    with open(paths['ckan'], 'rb') as f:
+        expected = f.read()
+    servers = []
+
+    def start(**options):
+        server, base_url = losd_standin.start(str(tmp_path / 'www'), **options)
+        servers.append(server)
+        return f'{base_url}/dataset/bau502od5022/download/bau502od5022.csv', expected
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_gzip_is_decoded(standin, tmp_path):
+    url, expected = standin(gzip=True)
+    path = mypy_dl.download_file(url, str(tmp_path / 'out.csv'))
+    assert _read(path) == expected
+    assert not os.path.exists(path + '.part')
+
+
+def test_dropped_connection_resumes_with_range(standin, tmp_path):
+    url, expected = standin(ranges=True, drop_after=100_000)
+    path = mypy_dl.download_file(url, str(tmp_path / 'out.csv'), parts=1)
+    assert _read(path) == expected
+
+
+def test_dropped_gzip_connection_resumes(standin, tmp_path):
+    url, expected = standin(gzip=True, ranges=True, drop_after=20_000)
+    path = mypy_dl.download_file(url, str(tmp_path / 'out.csv'), parts=1)
+    assert _read(path) == expected
+
+
+def test_parallel_parts(standin, tmp_path):
+    url, expected = standin(ranges=True)
+    path = mypy_dl.download_file(url, str(tmp_path / 'out.csv'), parts=4, part_min_mb=0.01)
+    assert _read(path) == expected
+
+
+def test_without_ranges_restarts_after_drop(standin, tmp_path):
+    url, expected = standin(drop_after=100_000)
+    path = mypy_dl.download_file(url, str(tmp_path / 'out.csv'), parts=1)
+    assert _read(path) == expected
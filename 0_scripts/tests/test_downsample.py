@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import my_py_dataviz_functions as mypy_dv
+
+
+def _lttb_reference(xs, ys, n_out):
+    # Direkte Umsetzung von Steinarsson (2013) mit gleich langen Buckets über die Punkte zwischen dem ersten und dem letzten
+    length = len(xs)
+    edges = np.linspace(1, length - 1, n_out - 1).astype(int)
+    keep = [0]
+    for i in range(n_out - 2):
+        following = slice(edges[i + 1], edges[i + 2] if i + 2 < len(edges) else length)
+        avg_x, avg_y = xs[following].mean(), ys[following].mean()
+        a = keep[-1]
+        best, best_area = None, -1
+        for j in range(edges[i], edges[i + 1]):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        keep.append(best)
+    return np.array(keep + [length - 1])
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    xs = np.arange(1000, dtype=float)
+    return xs, np.cumsum(rng.normal(size=1000))
+
+
+@pytest.mark.parametrize('n_out', [3, 10, 101, 500])
+def test_lttb_matches_reference(series, n_out):
+    xs, ys = series
+    np.testing.assert_array_equal(mypy_dv._lttb_indices(xs, ys, n_out), _lttb_reference(xs, ys, n_out))
+
+
+def test_lttb_short_series_unchanged(series):
+    xs, ys = series
+    np.testing.assert_array_equal(mypy_dv._lttb_indices(xs[:50], ys[:50], 100), np.arange(50))
+
+
+def test_minmax_keeps_extremes(series):
+    _, ys = series
+    keep = mypy_dv._minmax_indices(ys, 102)
+    assert len(keep) <= 102
+    assert keep[0] == 0 and keep[-1] == len(ys) - 1
+    bin_id = np.arange(len(ys)) * 50 // len(ys)
+    for b in range(50):
+        in_bin = np.flatnonzero(bin_id == b)
+        assert ys[in_bin].max() in ys[keep] and ys[in_bin].min() in ys[keep]
+
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+def test_downsample_per_category(saved_data, method):
+    data = saved_data('bev324od3241')
+    data['StichtagDatJahr'] = pd.to_datetime(data['StichtagDatJahr'])
+    result = mypy_dv._downsample_chart_data(data, 'StichtagDatJahr:T', 'BEW', 'KREISEZH_LANG', 200, method)
+    sizes = result.groupby('KREISEZH_LANG').size()
+    assert (sizes <= 200).all()
+    assert set(sizes.index) == set(data['KREISEZH_LANG'])
+    # Behaltene Zeilen sind unveränderte Originalzeilen
+    pd.testing.assert_frame_equal(result, data.loc[result.index])
+    for _, group in data.groupby('KREISEZH_LANG'):
+        kept = result.loc[result['KREISEZH_LANG'] == group['KREISEZH_LANG'].iloc[0], 'StichtagDatJahr']
+        assert kept.min() == group['StichtagDatJahr'].min() and kept.max() == group['StichtagDatJahr'].max()
@@ -0,0 +1,57 @@
+import json
+
+import matplotlib
+import pytest
+
+import my_py_export_functions as mypy_export
+
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt  # noqa: E402
+
+
+def _figure(values):
+    figure, ax = plt.subplots(figsize=(3, 2))
+    ax.plot(range(len(values)), values)
+    ax.set_title('BEW')
+    plt.close(figure)
+    return figure
+
+
+def _manifest(out_dir):
+    with open(out_dir / '.export_manifest.json', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def charts():
+    return {'a.svg': _figure([1, 2, 3]), 'b.png': _figure([3, 2, 1])}
+
+
+def test_unchanged_charts_are_skipped(tmp_path, charts):
+    assert mypy_export.export_charts(charts, str(tmp_path), max_workers=1) == {'a.svg': 'rendered', 'b.png': 'rendered'}
+    assert set(_manifest(tmp_path)) == {'a.svg', 'b.png'}
+    assert mypy_export.export_charts(charts, str(tmp_path), max_workers=1) == {'a.svg': 'skipped', 'b.png': 'skipped'}
+
+
+def test_changed_missing_or_forced_charts_are_rendered(tmp_path, charts):
+    mypy_export.export_charts(charts, str(tmp_path), max_workers=1)
+    before = _manifest(tmp_path)
+    charts['a.svg'] = _figure([1, 2, 4])
+    (tmp_path / 'b.png').unlink()
+    assert mypy_export.export_charts(charts, str(tmp_path), max_workers=1) == {'a.svg': 'rendered', 'b.png': 'rendered'}
+    assert _manifest(tmp_path)['a.svg'] != before['a.svg']
+    assert _manifest(tmp_path)['b.png'] == before['b.png']
+    assert set(mypy_export.export_charts(charts, str(tmp_path), max_workers=1, force=True).values()) == {'rendered'}
+
+
+def test_manifest_keeps_entries_of_other_exports(tmp_path, charts):
+    mypy_export.export_charts({'a.svg': charts['a.svg']}, str(tmp_path), max_workers=1)
+    mypy_export.export_charts({'b.png': charts['b.png']}, str(tmp_path), max_workers=1)
+    assert set(_manifest(tmp_path)) == {'a.svg', 'b.png'}
+
+
+def test_process_pool(tmp_path, charts):
+    status = mypy_export.export_charts(charts, str(tmp_path), max_workers=2)
+    assert status == {'a.svg': 'rendered', 'b.png': 'rendered'}
+    assert (tmp_path / 'a.svg').read_text(encoding='utf-8').lstrip().startswith('<?xml')
+    assert (tmp_path / 'b.png').read_bytes()[:4] == b'\x89PNG'
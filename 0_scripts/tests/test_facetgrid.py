@@ -0,0 +1,62 @@
+import matplotlib
+import numpy as np
+import pandas as pd
+import pytest
+import seaborn as sns
+
+import my_py_dataviz_functions as mypy_dv
+
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt  # noqa: E402
+
+
+@pytest.fixture
+def quartiere(saved_data):
+    data = saved_data('bev324od3240')
+    data['StichtagDatJahr'] = pd.to_datetime(data['StichtagDatJahr'])
+    yield data
+    plt.close('all')
+
+
+def _plot(data, **kwargs):
+    return mypy_dv.plot_sns_facetgrid(data, 'KREISEZH_LANG', 'RAUM_LANG', 4, 2, 'StichtagDatJahr', 'BEW', grafiktyp=sns.lineplot, **kwargs)
+
+
+def _panels(grid):
+    # Pro sichtbarem Panel der Titel und die gezeichneten Linien, nach Linienlabel sortiert
+    panels = {}
+    for ax in grid.axes.flat:
+        if ax.get_visible() and ax.get_title():
+            panels[ax.get_title()] = sorted((line.get_label(), line.get_xydata().tolist()) for line in ax.lines)
+    return panels
+
+
+def test_fast_draws_same_lines(quartiere):
+    slow = _panels(_plot(quartiere))
+    fast = _panels(_plot(quartiere, fast=True))
+    assert list(fast) == list(slow)
+    for title in slow:
+        assert [x for _, x in fast[title]] == [x for _, x in slow[title]], title
+
+
+def test_fast_mean_per_x(quartiere):
+    doppelt = pd.concat([quartiere, quartiere.assign(BEW=quartiere['BEW'] + 2)], ignore_index=True)
+    fast = _panels(_plot(doppelt, fast=True))
+    base = _panels(_plot(quartiere.assign(BEW=quartiere['BEW'] + 1), fast=True))
+    assert fast == base
+
+
+def test_paging(quartiere):
+    first = _plot(quartiere, fast=True, page_size=4)
+    n_panels = quartiere['KREISEZH_LANG'].nunique()
+    assert first.pages == -(-n_panels // 4)
+    last = _plot(quartiere, fast=True, page_size=4, page=first.pages - 1, reuse=first)
+    assert last.figure is first.figure
+    assert len(last.panels) == n_panels - 4 * (first.pages - 1)
+    assert sum(ax.get_visible() for ax in last.axes.flat) == len(last.panels)
+    assert np.all([len(ax.lines) > 0 for ax in last.axes.flat if ax.get_visible()])
+
+
+def test_fast_rejects_other_plot_types(quartiere):
+    assert mypy_dv.plot_sns_facetgrid(quartiere, 'KREISEZH_LANG', 'RAUM_LANG', 4, 2, 'StichtagDatJahr', 'BEW',
+                                      grafiktyp=sns.violinplot, fast=True) is None
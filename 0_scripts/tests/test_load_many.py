@@ -0,0 +1,54 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+import my_py_dataloading_functions as mypy_dl
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmark'))
+import losd_standin  # noqa: E402
+
+PACKAGES = ['bev324od3240', 'bev324od3241']
+
+
+@pytest.fixture
+def ckan(tmp_path, saved_data):
+    # Ersatz-Server mit beiden Bevölkerungs-Fixtures unter den CKAN-Pfaden
+    expected = {}
+    for package_name in PACKAGES:
+        expected[package_name] = saved_data(package_name)
+        losd_standin.write_fixture(str(tmp_path), package_name, package_name + '.csv', expected[package_name])
+    server, base_url = losd_standin.start(str(tmp_path))
+    yield f'{base_url}/dataset/', expected
+    server.shutdown()
+
+
+def _specs(**extra):
+    return [dict(status='prod', data_source='web', package_name=p, dataset_name=p, **extra) for p in PACKAGES]
+
+
+def test_load_many_matches_read_csv(ckan):
+    url, expected = ckan
+    datasets = mypy_dl.load_many(_specs(), ckan_prod_url=url, datums_attr=[], max_workers=2)
+    assert list(datasets) == [f'prod_web_{p}' for p in PACKAGES]
+    for package_name in PACKAGES:
+        pd.testing.assert_frame_equal(datasets[f'prod_web_{package_name}'], expected[package_name])
+
+
+def test_spec_overrides_shared_kwargs(ckan):
+    url, expected = ckan
+    specs = _specs()
+    specs[0]['name'] = 'quartiere'
+    specs[0]['datums_attr'] = ['StichtagDatJahr']
+    datasets = mypy_dl.load_many(specs, ckan_prod_url=url, datums_attr=[])
+    assert pd.api.types.is_datetime64_any_dtype(datasets['quartiere']['StichtagDatJahr'])
+    assert not pd.api.types.is_datetime64_any_dtype(datasets['prod_web_bev324od3241']['StichtagDatJahr'])
+
+
+def test_failed_dataset_is_none(ckan):
+    url, _ = ckan
+    specs = _specs() + [dict(status='prod', data_source='web', package_name='gibtesnicht', dataset_name='gibtesnicht')]
+    datasets = mypy_dl.load_many(specs, ckan_prod_url=url, datums_attr=[], retries=0)
+    assert datasets['prod_web_gibtesnicht'] is None
+    assert datasets['prod_web_bev324od3240'] is not None
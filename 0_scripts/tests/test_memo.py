@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+import my_py_dataviz_functions as mypy_dv
+
+
+@pytest.fixture(autouse=True)
+def leerer_cache():
+    mypy_dv._chart_cache.clear()
+    yield
+    mypy_dv._chart_cache.clear()
+
+
+@pytest.fixture
+def kreise(saved_data):
+    data = saved_data('bev324od3240')
+    return data.groupby(['StichtagDatJahr', 'KREISEZH_LANG'], as_index=False).agg(BEW=('BEW', 'sum'), Jahr=('Jahr', 'first'))
+
+
+def _plot(data, **kwargs):
+    return mypy_dv.plot_altair_multiline_highlight(data, 'StichtagDatJahr:T', 'BEW', category='KREISEZH_LANG', memo=True, **kwargs)
+
+
+def test_unchanged_data_returns_cached_chart(kreise):
+    chart = _plot(kreise)
+    assert _plot(kreise.copy()) is chart
+    assert _plot(kreise, myTitle='anders') is not chart
+
+
+def test_only_used_columns_count_with_slim_data(kreise):
+    chart = _plot(kreise, slim_data=True)
+    changed = kreise.assign(Jahr=0)
+    assert _plot(changed, slim_data=True) is chart
+    changed = kreise.assign(BEW=kreise['BEW'] + 1)
+    assert _plot(changed, slim_data=True) is not chart
+
+
+def test_all_columns_count_without_slim_data(kreise):
+    chart = _plot(kreise)
+    assert _plot(kreise.assign(Jahr=0)) is not chart
+
+
+def test_memo_dir_survives_restart(kreise, tmp_path):
+    chart = _plot(kreise, memo_dir=str(tmp_path))
+    assert len([f for f in os.listdir(tmp_path) if f.endswith('.pkl')]) == 1
+    mypy_dv._chart_cache.clear()
+    again = _plot(kreise, memo_dir=str(tmp_path))
+    assert again is not chart
+    assert again.to_dict() == chart.to_dict()
+
+
+def test_memo_size(kreise):
+    for title in 'abc':
+        _plot(kreise, myTitle=title, memo_size=2)
+    assert len(mypy_dv._chart_cache) == 2
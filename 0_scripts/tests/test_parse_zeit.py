@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import my_py_dataloading_functions as mypy_dl  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def empty_lookup():
+    mypy_dl._zeit_lookup.clear()
+    yield
+    mypy_dl._zeit_lookup.clear()
+
+
+def test_dd_mm_yyyy_like_read_csv():
+    # Der erste Wert bestimmt das Format, nicht der kleinste (sortierte) Wert
+    values = pd.Series(['13.02.2021', '01.02.2021', '31.12.2020'])
+    result = mypy_dl.parse_zeit(values)
+    assert list(result) == list(pd.to_datetime(values, format='%d.%m.%Y'))
+
+
+def test_dd_mm_yyyy_in_parse_dates():
+    df = mypy_dl._parse_dates(pd.DataFrame({'StichtagDatJahr': ['13.02.2021', '01.02.2021']}), ['StichtagDatJahr'])
+    assert pd.api.types.is_datetime64_any_dtype(df['StichtagDatJahr'])
+    assert df['StichtagDatJahr'].iloc[1] == pd.Timestamp('2021-02-01')
+
+
+def test_same_value_independent_of_earlier_calls():
+    # '01.02.2021' ist in der ersten Spalte (wie bei pd.to_datetime) der 2. Januar, in der zweiten der 1. Februar
+    first = mypy_dl.parse_zeit(pd.Series(['01.02.2021', '03.04.2021']))
+    second = mypy_dl.parse_zeit(pd.Series(['13.02.2021', '01.02.2021']))
+    again = mypy_dl.parse_zeit(pd.Series(['01.02.2021', '03.04.2021']))
+    assert first.iloc[0] == pd.Timestamp('2021-01-02')
+    assert second.iloc[1] == pd.Timestamp('2021-02-01')
+    assert list(again) == list(first)
+
+
+def test_lookup_overflow_keeps_known_values(monkeypatch):
+    monkeypatch.setattr(mypy_dl, '_ZEIT_LOOKUP_MAX', 5)
+    mypy_dl.parse_zeit(pd.Series(['2020-12-31', '2021-12-31', '2022-12-31', '2023-12-31']))
+    result = mypy_dl.parse_zeit(pd.Series(['2020-12-31', '2024-12-31', '2025-12-31']))
+    assert result.notna().all()
+    assert len(mypy_dl._zeit_lookup) <= 5
+
+
+def test_zeit_code_and_missing_values():
+    result = mypy_dl.parse_zeit_code(pd.Series(['Z31122023', None, 'Z31122022']))
+    assert result.iloc[0] == pd.Timestamp('2023-12-31')
+    assert pd.isna(result.iloc[1])
@@ -0,0 +1,58 @@
+import os
+
+import pandas as pd
+import pytest
+
+import my_py_raum_functions as mypy_raum
+
+
+@pytest.fixture
+def zonen(saved_data):
+    return saved_data('bev324od3241')
+
+
+def test_raum_sort_matches_notebook(zonen):
+    expected = zonen['RAUM_CODE'].str[-3:].astype(int)
+    assert mypy_raum.raum_sort(zonen['RAUM_CODE']).tolist() == expected.tolist()
+
+
+def test_hierarchy_of_statistical_zones(zonen):
+    index = mypy_raum.build_raum_index(zonen)
+    assert index.loc['R3Z001', 'ebene'] == 'zone'
+    quartier = index.loc['R3Z001', 'parent']
+    assert index.loc[quartier, 'ebene'] == 'quartier'
+    assert index.loc['R3Z001', 'kreis'] == index.loc[quartier, 'parent'] == 'R10000'
+    # Jeder Kreis steht vor seinen Quartieren, jedes Quartier vor seinen Zonen
+    order = index['order']
+    children = index[index['parent'].notna()]
+    assert (order.loc[children.index].to_numpy() > order.loc[children['parent']].to_numpy()).all()
+
+
+def test_add_raum_columns_restores_hierarchy(zonen):
+    index = mypy_raum.build_raum_index(zonen)
+    stripped = zonen.drop(columns=['QUARTIEREZH_CODE', 'QUARTIEREZH_LANG', 'KREISEZH_CODE', 'KREISEZH_LANG'])
+    result = mypy_raum.add_raum_columns(stripped, index)
+    for column in ['QUARTIEREZH_CODE', 'QUARTIEREZH_LANG', 'KREISEZH_CODE', 'KREISEZH_LANG']:
+        assert result[column].astype(str).tolist() == zonen[column].astype(str).tolist(), column
+    assert result['RAUM_my_sort'].tolist() == zonen['RAUM_my_sort'].tolist()
+
+
+def test_raum_lookup_unknown_code(zonen):
+    index = mypy_raum.build_raum_index(zonen)
+    values = mypy_raum.raum_lookup(index, pd.Series(['R3Z001', 'R99999', None]), 'kreis')
+    assert values.iloc[0] == 'R10000'
+    assert values.iloc[1:].isna().all()
+
+
+def test_update_merges_datasets(tmp_path, saved_data, zonen):
+    path = str(tmp_path / 'raum_index.arrow')
+    quartiere = saved_data('bev324od3240')
+    first = mypy_raum.update_raum_index(quartiere, index_path=path)
+    merged = mypy_raum.update_raum_index(zonen, index_path=path)
+    assert set(first.index) < set(merged.index)
+    assert set(mypy_raum.build_raum_index(zonen).index) <= set(merged.index)
+    # Ein unveränderter Index wird nicht neu geschrieben
+    mtime = os.stat(path).st_mtime_ns
+    again = mypy_raum.update_raum_index(zonen, index_path=path)
+    assert os.stat(path).st_mtime_ns == mtime
+    assert list(again.index) == list(mypy_raum.load_raum_index(index_path=path).index)
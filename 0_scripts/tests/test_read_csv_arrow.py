@@ -0,0 +1,53 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import my_py_dataloading_functions as mypy_dl  # noqa: E402
+
+pytest.importorskip('pyarrow')
+
+N_ROWS = 400000
+CHUNKSIZE = 100000
+
+
+@pytest.mark.parametrize('column, bad', [('ZEIT_LANG', 'kaputt'), ('BEW', 'x')])
+def test_chunks_fall_back_after_first_block(tmp_path, column, bad):
+    # Der ungültige Wert liegt weit hinter dem ersten Block, nach dem pyarrow die Spaltentypen festlegt
+    data = pd.DataFrame({'ZEIT_LANG': np.tile(['2020-12-31', '2021-12-31'], N_ROWS // 2), 'RAUM': 'Kreis 1',
+                         'BEW': np.arange(N_ROWS).astype(str)})
+    data.loc[N_ROWS - 5, column] = bad
+    path = tmp_path / 'bad.csv'
+    data.to_csv(path, index=False)
+
+    chunks = list(mypy_dl._read_csv_arrow(str(path), ',', 'utf-8', ['', 'NA'], ['ZEIT_LANG'], 'category', CHUNKSIZE))
+
+    result = pd.concat([c.astype(str) for c in chunks], ignore_index=True)
+    assert len(result) == N_ROWS
+    assert result.loc[N_ROWS - 5, column] == bad
+    assert (result['BEW'].to_numpy() == pd.read_csv(path, dtype=str)['BEW'].to_numpy()).all()
+
+
+@pytest.mark.parametrize('arrow_columns', ['category', 'pyarrow'])
+def test_fixture_matches_c_parser(saved_data, arrow_columns):
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '..', 'losd', 'saved_data',
+                        'bau502od5022_2024-07-04.csv')
+    expected = pd.read_csv(path, parse_dates=['StichtagDatJahr'])
+    result = mypy_dl._read_csv_arrow(path, ',', 'utf-8', ['', 'NA'], ['StichtagDatJahr'], arrow_columns, None)
+    assert list(result.columns) == list(expected.columns)
+    assert (result['StichtagDatJahr'].to_numpy('datetime64[ns]') == expected['StichtagDatJahr'].to_numpy('datetime64[ns]')).all()
+    for column in expected.columns.drop('StichtagDatJahr'):
+        np.testing.assert_array_equal(result[column].astype(object).to_numpy(), expected[column].astype(object).to_numpy(), err_msg=column)
+
+
+def test_chunks_match_single_read(tmp_path):
+    data = pd.DataFrame({'ZEIT_LANG': np.tile(['2020-12-31', '2021-12-31'], N_ROWS // 2), 'BEW': np.arange(N_ROWS)})
+    path = tmp_path / 'ok.csv'
+    data.to_csv(path, index=False)
+    whole = mypy_dl._read_csv_arrow(str(path), ',', 'utf-8', [''], ['ZEIT_LANG'], 'category', None)
+    chunks = list(mypy_dl._read_csv_arrow(str(path), ',', 'utf-8', [''], ['ZEIT_LANG'], 'category', CHUNKSIZE))
+    assert [len(c) for c in chunks] == [CHUNKSIZE] * (N_ROWS // CHUNKSIZE)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), whole)
@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+import my_py_datacheck_functions as mypy_dc
+
+
+@pytest.fixture
+def cube(saved_data):
+    return saved_data('bev324od3240')[['ZEIT_LANG', 'ZEIT_CODE', 'RAUM_CODE', 'BEW']]
+
+
+def test_identical_cubes(cube):
+    result = mypy_dc.reconcile(cube, cube.copy(), ['ZEIT_LANG', 'RAUM_CODE'], ['BEW'])
+    assert result['ok']
+    assert result['n_matched'] == len(cube)
+
+
+@pytest.mark.parametrize('left_key', ['ZEIT_LANG', 'ZEIT_CODE'])
+def test_date_key_as_text_and_datetime(cube, left_key):
+    # SASA liefert das Datum als Text, LD nach load_data als datetime64 und RAUM_CODE als category
+    right = cube.assign(ZEIT_LANG=pd.to_datetime(cube['ZEIT_LANG']), RAUM_CODE=cube['RAUM_CODE'].astype('category'))
+    right.loc[5, 'BEW'] += 1
+    right = right.drop(index=[7])
+    result = mypy_dc.reconcile(cube, right, {left_key: 'ZEIT_LANG', 'RAUM_CODE': 'RAUM_CODE'}, ['BEW'])
+    assert result is not None
+    assert not result['ok']
+    assert result['n_matched'] == len(cube) - 1
+    assert result['n_missing'] == 1
+    assert result['n_extra'] == 0
+    assert result['measures']['n_diff'].iloc[0] == 1
+
+
+def test_duplicate_keys_are_summed(cube):
+    left = pd.concat([cube, cube.iloc[[0]].assign(BEW=0)], ignore_index=True)
+    result = mypy_dc.reconcile(left, cube, ['ZEIT_LANG', 'RAUM_CODE'], ['BEW'])
+    assert result['dup_keys_left'] == 1
+    assert result['ok']
@@ -0,0 +1,38 @@
+import pytest
+
+import my_py_dataviz_functions as mypy_dv
+
+
+@pytest.fixture
+def bevoelkerung(saved_data):
+    return saved_data('bev324od3241')
+
+
+def _encoding(chart):
+    spec = chart.to_dict()
+    return [layer['encoding'] for layer in spec['layer']]
+
+
+def test_projection_keeps_only_encoded_columns(bevoelkerung):
+    slim = mypy_dv._slim_chart_data(bevoelkerung, 'StichtagDatJahr:T', 'BEW', 'KREISEZH_LANG', None, ['RAUM_CODE'])
+    assert list(slim.columns) == ['StichtagDatJahr', 'KREISEZH_LANG', 'BEW', 'RAUM_CODE']
+    assert not slim.duplicated().any()
+
+
+def test_missing_column_raises(bevoelkerung):
+    with pytest.raises(ValueError, match='KREIS_LANG'):
+        mypy_dv._slim_chart_data(bevoelkerung, 'StichtagDatJahr:T', 'BEW', 'KREIS_LANG', None, [])
+    with pytest.raises(ValueError, match='TOOLTIP'):
+        mypy_dv._slim_chart_data(bevoelkerung, 'StichtagDatJahr:T', 'BEW', 'KREISEZH_LANG', None, ['TOOLTIP'])
+
+
+def test_slim_chart_has_same_spec(bevoelkerung):
+    data = bevoelkerung.groupby(['StichtagDatJahr', 'KREISEZH_LANG'], as_index=False)['BEW'].sum()
+    data['RAUM_CODE'] = 0
+    kwargs = dict(category='KREISEZH_LANG', myTitle='Bevölkerung')
+    full = mypy_dv.plot_altair_multiline_highlight(data, 'StichtagDatJahr:T', 'BEW', **kwargs)
+    slim = mypy_dv.plot_altair_multiline_highlight(data, 'StichtagDatJahr:T', 'BEW', slim_data=True, **kwargs)
+    assert _encoding(slim) == _encoding(full)
+    rows = next(iter(slim.to_dict()['datasets'].values()))
+    assert set(rows[0]) == {'StichtagDatJahr', 'KREISEZH_LANG', 'BEW'}
+    assert len(rows) == len(data)
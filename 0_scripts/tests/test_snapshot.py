@@ -0,0 +1,38 @@
+import os
+
+import pandas as pd
+import pytest
+
+import my_py_dataloading_functions as mypy_dl
+import my_py_snapshot_functions as mypy_snap
+
+
+@pytest.fixture
+def wohnungen(saved_data):
+    return saved_data('bau502od5022')
+
+
+def test_roundtrip(tmp_path, wohnungen):
+    entry = mypy_snap.save_snapshot(wohnungen, 'bau502od5022', datum='2024-07-04', store_dir=str(tmp_path))
+    assert entry['rows'] == len(wohnungen)
+    loaded = mypy_snap.load_snapshot('bau502od5022', store_dir=str(tmp_path))
+    pd.testing.assert_frame_equal(loaded, mypy_dl.optimize_losd_dtypes(wohnungen), check_categorical=False)
+    assert mypy_snap.content_hash(loaded) == entry['content_hash']
+
+
+def test_identical_content_reuses_file(tmp_path, wohnungen):
+    first = mypy_snap.save_snapshot(wohnungen, 'bau502od5022', datum='2024-07-04', store_dir=str(tmp_path))
+    second = mypy_snap.save_snapshot(wohnungen, 'bau502od5022', datum='2024-07-05', store_dir=str(tmp_path))
+    assert first['file'] == second['file']
+    assert len([f for f in os.listdir(tmp_path) if f.endswith('.arrow')]) == 1
+    assert mypy_snap.list_snapshots('bau502od5022', store_dir=str(tmp_path))['datum'].tolist() == ['2024-07-04', '2024-07-05']
+
+
+def test_load_by_datum_and_offset(tmp_path, wohnungen):
+    older = wohnungen[wohnungen['Jahr'] < wohnungen['Jahr'].max()]
+    mypy_snap.save_snapshot(older, 'bau502od5022', datum='2023-07-04', store_dir=str(tmp_path))
+    mypy_snap.save_snapshot(wohnungen, 'bau502od5022', datum='2024-07-04', store_dir=str(tmp_path))
+    assert len(mypy_snap.load_snapshot('bau502od5022', store_dir=str(tmp_path))) == len(wohnungen)
+    assert len(mypy_snap.load_snapshot('bau502od5022', offset=1, store_dir=str(tmp_path))) == len(older)
+    assert len(mypy_snap.load_snapshot('bau502od5022', datum='2023-07-04', store_dir=str(tmp_path))) == len(older)
+    assert mypy_snap.load_snapshot('bau502od5022', datum='2020-01-01', store_dir=str(tmp_path)) is None
@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+import my_py_trace_functions as mypy_trace
+
+
+@pytest.fixture
+def tracing():
+    mypy_trace.enable()
+    yield
+    mypy_trace.disable()
+    mypy_trace.reset_trace()
+
+
+@mypy_trace.traced()
+def _laden():
+    with mypy_trace.phase('read_csv', rows=10) as p:
+        p.set(columns=3)
+    mypy_trace.record('http_headers', 0.5, status=200)
+
+
+def test_disabled_records_nothing():
+    mypy_trace.reset_trace()
+    _laden()
+    assert mypy_trace.trace_report().empty
+
+
+def test_nested_phases_belong_to_call(tracing):
+    _laden()
+    _laden()
+    report = mypy_trace.trace_report()
+    assert report['phase'].tolist() == ['_laden', 'read_csv', 'http_headers'] * 2
+    assert report['depth'].tolist() == [0, 1, 1] * 2
+    calls = report['call'].unique()
+    assert len(calls) == 2 and all(c.startswith('_laden#') for c in calls)
+    assert report.loc[1, ['rows', 'columns']].tolist() == [10, 3]
+    assert report.loc[2, 'status'] == 200
+
+
+def test_call_ids_unique_across_threads(tracing):
+    def work():
+        for _ in range(500):
+            _laden()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    report = mypy_trace.trace_report()
+    top = report[report['depth'] == 0]
+    assert len(top) == 8 * 500
+    assert top['call'].is_unique
+    assert (report.groupby('call').size() == 3).all()
+
+
+def test_export(tracing, tmp_path):
+    _laden()
+    mypy_trace.export_trace(str(tmp_path / 'trace.csv'))
+    mypy_trace.export_trace(str(tmp_path / 'trace.json'))
+    assert (tmp_path / 'trace.csv').read_text(encoding='utf-8').startswith('call,phase,depth')
+    assert '"phase": "read_csv"' in (tmp_path / 'trace.json').read_text(encoding='utf-8')
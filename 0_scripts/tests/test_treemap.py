@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import my_py_dataviz_functions as mypy_dv
+
+
+def _nodes(fig):
+    trace = fig.data[0]
+    colors = trace.marker.colors
+    frame = pd.DataFrame({'id': list(trace.ids), 'parent': list(trace.parents), 'value': np.asarray(trace.values, dtype='float64'),
+                          'color': list(colors) if colors is not None else None})
+    return frame.sort_values('id').reset_index(drop=True)
+
+
+@pytest.fixture
+def wohnungen(saved_data):
+    data = saved_data('bau502od5022')
+    return data[data['Jahr'] == data['Jahr'].max()]
+
+
+@pytest.mark.parametrize('color', ['ARA_LANG', 'WHG'])
+def test_fast_matches_px(wohnungen, color):
+    kwargs = dict(levels=['KREISEZH_LANG', 'RAUM_LANG', 'ZIM_LANG'], values='WHG', color=color, myHeaderTitle='Stadt Zürich')
+    fast = _nodes(mypy_dv.plot_px_treemap(wohnungen, fast=True, **kwargs))
+    slow = _nodes(mypy_dv.plot_px_treemap(wohnungen, fast=False, **kwargs))
+    assert fast['id'].tolist() == slow['id'].tolist()
+    assert fast['parent'].tolist() == slow['parent'].tolist()
+    np.testing.assert_allclose(fast['value'], slow['value'])
+    if color == 'WHG':
+        np.testing.assert_allclose(fast['color'].astype(float), slow['color'].astype(float))
+    else:
+        assert fast['color'].str.lower().tolist() == slow['color'].str.lower().tolist()
+
+
+def test_empty_level_is_not_dropped(wohnungen):
+    # Mit leeren Levels verhält sich fast=True wie px.treemap statt die Zeilen wegzulassen
+    data = wohnungen.copy()
+    data.loc[data.index[0], 'ZIM_LANG'] = None
+    kwargs = dict(levels=['KREISEZH_LANG', 'RAUM_LANG', 'ZIM_LANG'], values='WHG', color='ARA_LANG')
+    assert mypy_dv.plot_px_treemap(data, fast=True, **kwargs) is None
+    assert mypy_dv.plot_px_treemap(data, fast=False, **kwargs) is None